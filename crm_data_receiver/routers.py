@@ -0,0 +1,83 @@
+"""
+Read replica routing.
+
+Reads of the apps in DATABASE_REPLICA_APPS go to one of DATABASE_REPLICAS,
+but only while serving a safe (GET/HEAD/OPTIONS) request. Everything else,
+writes, unsafe requests, management commands and workers, uses 'default',
+so signal handlers and batch jobs never read stale rows.
+
+A client that just wrote gets a short-lived pin cookie; while it is valid
+that client's reads also use 'default', so it sees its own review right
+away despite replication lag (read-your-writes).
+"""
+import random
+import time
+from contextvars import ContextVar
+from django.conf import settings
+
+
+PIN_COOKIE = 'replica_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Set by ReplicaPinMiddleware for the duration of a request that may read from a replica
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or not settings.DATABASE_REPLICAS:
+            return 'default'
+        if model._meta.app_label not in settings.DATABASE_REPLICA_APPS:
+            return 'default'
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {'default', *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary through replication
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaPinMiddleware:
+    """
+    Decide per request whether reads may use a replica, and pin clients to
+    the primary for DATABASE_REPLICA_PIN_SECONDS after a successful (2xx/3xx)
+    unsafe request
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        writing = request.method not in SAFE_METHODS
+        token = _replica_reads.set(not writing and not self.pinned(request))
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica_reads.reset(token)
+
+        # Failed requests (4xx/5xx) wrote nothing, so there is nothing to read back
+        if writing and settings.DATABASE_REPLICAS and response.status_code < 400:
+            pin_seconds = settings.DATABASE_REPLICA_PIN_SECONDS
+            response.set_cookie(
+                PIN_COOKIE, str(int(time.time() + pin_seconds)),
+                max_age=pin_seconds, httponly=True, samesite='Lax'
+            )
+        return response
+
+    @staticmethod
+    def pinned(request):
+        try:
+            return int(request.COOKIES.get(PIN_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'reports',
     'django_filters',
     'stockmanagement',
+    'rattingapp',
 ]
 
 MIDDLEWARE = [
@@ -52,6 +53,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'crm_data_receiver.routers.ReplicaPinMiddleware',
 ]
 
 ROOT_URLCONF = 'crm_data_receiver.urls'
@@ -86,9 +88,30 @@ DATABASES = {
         'PASSWORD':"22LOKI",
         'HOST':'localhost',
         'PORT':'3306'  
-    }
+    },
+    # Read replica, listed in DATABASE_REPLICAS below. In tests it mirrors
+    # 'default'; locally a second SQLite file works for trying the routing.
+    # 'replica': {
+    #     'ENGINE': 'django.db.backends.mysql',
+    #     'NAME': 'stock',
+    #     'USER': 'readonly',
+    #     'PASSWORD': '',
+    #     'HOST': 'replica.internal',
+    #     'PORT': '3306',
+    #     'TEST': {'MIRROR': 'default'},
+    # },
 }
 
+# Safe (GET/HEAD/OPTIONS) requests read the DATABASE_REPLICA_APPS models from
+# one of DATABASE_REPLICAS; writes, unsafe requests and management commands
+# always use 'default'. A client that wrote reads from 'default' for
+# DATABASE_REPLICA_PIN_SECONDS (keep it above the replication lag) so it
+# sees its own writes. With no replicas everything uses 'default'.
+DATABASE_ROUTERS = ['crm_data_receiver.routers.ReplicaRouter']
+DATABASE_REPLICAS = []
+DATABASE_REPLICA_APPS = ['rattingapp']
+DATABASE_REPLICA_PIN_SECONDS = 15
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
@@ -133,6 +156,66 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
 
+# Stock management settings
+# Movements older than this many days are moved to the archive table by
+# `manage.py archive_stock_movements` and hidden from the default list endpoint.
+STOCK_MOVEMENT_HOT_DAYS = 90
+STOCK_MOVEMENT_ARCHIVE_BATCH_SIZE = 5000
+
+
+# Review analytics settings
+# 'inline' applies counter deltas during the review write; 'deferred' only marks
+# the restaurant dirty and leaves recomputation to `manage.py process_analytics_queue`.
+REVIEW_ANALYTICS_MODE = 'inline'
+# Upper bound on how stale deferred analytics may get (worker polling interval).
+REVIEW_ANALYTICS_MAX_STALENESS_SECONDS = 30
+REVIEW_ANALYTICS_BATCH_SIZE = 500
+
+# Sentiment scorer used for review comments (any rattingapp.sentiment.SentimentScorer).
+# Use 'rattingapp.sentiment.TextBlobScorer' for the slower TextBlob analyzer.
+REVIEW_SENTIMENT_SCORER = 'rattingapp.sentiment.LexiconScorer'
+# Scores of recently seen comments kept per process, keyed by normalized text.
+REVIEW_SENTIMENT_CACHE_SIZE = 10000
+# When True reviews are stored with a 'pending' sentiment and scored by
+# `manage.py score_pending_sentiment` instead of during the request.
+REVIEW_SENTIMENT_ASYNC = False
+# Restaurant summary payloads are cached and dropped on every review write;
+# the timeout only bounds how long an entry survives a missed invalidation.
+REVIEW_SUMMARY_CACHE_SECONDS = 300
+# Same for the analytics endpoint, whose responses also carry an ETag and
+# Last-Modified so polling clients get 304s while nothing changed.
+REVIEW_ANALYTICS_CACHE_SECONDS = 300
+# Trending leaderboard windows (days) accepted by the trending endpoint, the
+# default window and list size, and how long each computed top-N is cached.
+REVIEW_TRENDING_WINDOWS = (7, 30, 90)
+REVIEW_TRENDING_DEFAULT_DAYS = 30
+REVIEW_TRENDING_DEFAULT_LIMIT = 10
+REVIEW_TRENDING_MAX_LIMIT = 50
+REVIEW_TRENDING_CACHE_SECONDS = 60
+# Keywords kept per restaurant, month and sentiment bucket by
+# `manage.py extract_review_keywords`.
+REVIEW_KEYWORDS_TOP_N = 20
+# Spam screening of new reviews: a session may post REVIEW_SPAM_SESSION_LIMIT
+# reviews per REVIEW_SPAM_SESSION_WINDOW_SECONDS, and a comment whose word
+# shingles overlap a comment from the last REVIEW_DUPLICATE_WINDOW_DAYS by at
+# least REVIEW_DUPLICATE_SIMILARITY (Jaccard) is a near-duplicate. Reviews
+# that fail a check are quarantined and kept out of analytics.
+REVIEW_SPAM_SESSION_LIMIT = 5
+REVIEW_SPAM_SESSION_WINDOW_SECONDS = 3600
+REVIEW_DUPLICATE_SIMILARITY = 0.8
+REVIEW_DUPLICATE_WINDOW_DAYS = 30
+
+
+# Cache
+# Per-process memory cache by default; point this at Redis/Memcached in
+# production so invalidations reach every worker.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
@@ -0,0 +1,73 @@
+import time
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rattingapp.models import Review
+from stockmanagement.models import Category
+from .routers import PIN_COOKIE, ReplicaPinMiddleware, ReplicaRouter
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_REPLICA_APPS=['rattingapp'], DATABASE_REPLICA_PIN_SECONDS=15)
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.router = ReplicaRouter()
+
+    def serve(self, request, status=200):
+        """Run a request through the middleware; returns (response, databases read during it)"""
+        reads = {}
+
+        def view(request):
+            reads['review'] = self.router.db_for_read(Review)
+            reads['category'] = self.router.db_for_read(Category)
+            return HttpResponse(status=status)
+
+        response = ReplicaPinMiddleware(view)(request)
+        return response, reads
+
+    def test_safe_requests_read_replica_apps_from_a_replica(self):
+        response, reads = self.serve(self.factory.get('/ratings/reviews/'))
+
+        self.assertEqual(reads, {'review': 'replica', 'category': 'default'})
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_writes_use_the_primary_and_pin_the_client(self):
+        response, reads = self.serve(self.factory.post('/ratings/reviews/create/'))
+
+        self.assertEqual(reads['review'], 'default')
+        self.assertEqual(self.router.db_for_write(Review), 'default')
+        cookie = response.cookies[PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 15)
+        self.assertGreater(int(cookie.value), time.time())
+
+    def test_failed_writes_do_not_pin_the_client(self):
+        for status in (400, 403, 500):
+            response, reads = self.serve(self.factory.post('/ratings/reviews/create/'), status=status)
+            self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        response, reads = self.serve(self.factory.post('/ratings/reviews/create/'), status=302)
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_replicas_are_never_migrated(self):
+        self.assertIs(self.router.allow_migrate('replica', 'rattingapp'), False)
+        self.assertIsNone(self.router.allow_migrate('default', 'rattingapp'))
+
+    def test_pinned_clients_read_their_writes_from_the_primary(self):
+        request = self.factory.get('/ratings/reviews/')
+        request.COOKIES[PIN_COOKIE] = str(int(time.time()) + 10)
+        self.assertEqual(self.serve(request)[1]['review'], 'default')
+
+        for expired in (str(int(time.time()) - 1), 'garbage'):
+            request = self.factory.get('/ratings/reviews/')
+            request.COOKIES[PIN_COOKIE] = expired
+            self.assertEqual(self.serve(request)[1]['review'], 'replica')
+
+    def test_reads_outside_a_request_use_the_primary(self):
+        self.assertEqual(self.router.db_for_read(Review), 'default')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas_nothing_is_routed_or_pinned(self):
+        response, reads = self.serve(self.factory.post('/ratings/reviews/create/'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+        response, reads = self.serve(self.factory.get('/ratings/reviews/'))
+        self.assertEqual(reads['review'], 'default')
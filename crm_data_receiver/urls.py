@@ -17,6 +17,7 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path,include
 from receiver.views import receiver_list
+from rattingapp.urls import restful_urlpatterns as ratings_api_urlpatterns
 
 urlpatterns = [
    path('admin/', admin.site.urls),
@@ -28,6 +29,10 @@ urlpatterns = [
     
     # this api is testing for pratice level in 
     path('api/', include('reports.urls')),
+
+    # Restaurant reviews and ratings: ratings/reviews/... and ratings/api/v1/...
+    path('ratings/', include('rattingapp.urls')),
+    path('ratings/', include(ratings_api_urlpatterns)),
     
     
 ]
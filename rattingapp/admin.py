@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.db.models import Avg, Count
 from django.utils.html import format_html
 from .models import Review, ItemReview, ReviewAnalytics
+from .moderation import set_moderation_status
 
 
 @admin.register(Review)
@@ -11,16 +12,21 @@ class ReviewAdmin(admin.ModelAdmin):
     """
     list_display = [
         'id', 'restaurant_id', 'overall_rating', 'sentiment_display',
-        'is_anonymous', 'created_at'
+        'moderation_status', 'is_anonymous', 'created_at'
     ]
     list_filter = [
-        'overall_rating', 'is_anonymous', 'created_at',
+        'moderation_status', 'moderation_reason',
+        'overall_rating', 'is_anonymous', 'sentiment_status', 'created_at',
         'food_rating', 'service_rating', 'ambiance_rating'
     ]
     search_fields = ['restaurant_id', 'comment', 'order_id']
-    readonly_fields = ['id', 'sentiment_score', 'created_at', 'updated_at']
+    readonly_fields = [
+        'id', 'sentiment_score', 'sentiment_status', 'moderation_status', 'moderation_reason',
+        'created_at', 'updated_at'
+    ]
     date_hierarchy = 'created_at'
     ordering = ['-created_at']
+    actions = ['approve_reviews', 'reject_reviews']
     
     fieldsets = (
         ('Basic Information', {
@@ -30,7 +36,10 @@ class ReviewAdmin(admin.ModelAdmin):
             'fields': ('overall_rating', 'food_rating', 'service_rating', 'ambiance_rating')
         }),
         ('Review Content', {
-            'fields': ('comment', 'is_anonymous', 'sentiment_score')
+            'fields': ('comment', 'is_anonymous', 'sentiment_score', 'sentiment_status')
+        }),
+        ('Moderation', {
+            'fields': ('moderation_status', 'moderation_reason')
         }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
@@ -50,6 +59,20 @@ class ReviewAdmin(admin.ModelAdmin):
             return format_html('<span style="color: orange;">Neutral ({:.2f})</span>', obj.sentiment_score)
     
     sentiment_display.short_description = 'Sentiment'
+
+    def approve_reviews(self, request, queryset):
+        """Release reviews from quarantine into analytics"""
+        changed = set_moderation_status(queryset, Review.ModerationStatus.APPROVED)
+        self.message_user(request, f"Approved {changed} reviews")
+
+    approve_reviews.short_description = 'Approve selected reviews'
+
+    def reject_reviews(self, request, queryset):
+        """Keep reviews out of analytics for good"""
+        changed = set_moderation_status(queryset, Review.ModerationStatus.REJECTED)
+        self.message_user(request, f"Rejected {changed} reviews")
+
+    reject_reviews.short_description = 'Reject selected reviews'
     
     def get_queryset(self, request):
         """Optimize queryset with prefetch_related"""
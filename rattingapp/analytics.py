@@ -0,0 +1,411 @@
+"""
+Restaurant analytics service: the only code that writes ReviewAnalytics.
+
+Review writes go through record_review_saved / record_review_deleted,
+which apply one counter delta (inline mode) or queue the restaurant
+(deferred mode). recompute_restaurant_analytics rebuilds rows from the
+reviews for drift repair, bulk writes and the deferred worker. Every
+delta and recomputation is counted in `stats` and logged at debug level.
+"""
+import logging
+import time
+from collections import Counter
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum, Case, When, IntegerField, F
+from django.utils import timezone
+from .cache import invalidate_restaurants
+from .models import Review, ItemReview, ReviewAnalytics, DirtyRestaurant, DirtyRestaurantDay
+from .trending import (
+    review_day, daily_contribution, apply_daily_delta, rebuild_daily_stats, rebuild_daily_buckets
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Per-process counts of analytics work, for benchmarks and debugging
+stats = Counter()
+
+
+def reset_stats():
+    stats.clear()
+
+
+REVIEW_DIMENSIONS = ('overall', 'food', 'service', 'ambiance')
+
+# Star histogram counters per rating dimension; item ratings come from item reviews
+HISTOGRAM_COUNTERS = [
+    f'{dimension}_rating_{rating}_count'
+    for dimension in REVIEW_DIMENSIONS
+    for rating in range(1, 6)
+]
+ITEM_HISTOGRAM_COUNTERS = [f'item_rating_{rating}_count' for rating in range(1, 6)]
+
+# Running counters on ReviewAnalytics that a single review contributes to
+ANALYTICS_COUNTERS = [
+    'total_reviews',
+    'overall_rating_sum',
+    'food_rating_sum', 'food_rating_count',
+    'service_rating_sum', 'service_rating_count',
+    'ambiance_rating_sum', 'ambiance_rating_count',
+    *HISTOGRAM_COUNTERS,
+    'positive_sentiment_count', 'neutral_sentiment_count', 'negative_sentiment_count',
+]
+
+
+def sentiment_bucket(score):
+    """
+    Map a sentiment score to its analytics bucket (None when not analyzed)
+    """
+    if score is None:
+        return None
+    if score >= 0.1:
+        return 'positive'
+    if score <= -0.1:
+        return 'negative'
+    return 'neutral'
+
+
+def review_contribution(review):
+    """
+    Counter values a single review adds to its restaurant's analytics
+    (nothing while it is quarantined or rejected)
+    """
+    if not review.is_approved:
+        return {}
+    contribution = {
+        'total_reviews': 1,
+        'overall_rating_sum': review.overall_rating,
+        f'overall_rating_{review.overall_rating}_count': 1,
+    }
+    for dimension in ('food', 'service', 'ambiance'):
+        rating = getattr(review, f'{dimension}_rating')
+        if rating is not None:
+            contribution[f'{dimension}_rating_sum'] = rating
+            contribution[f'{dimension}_rating_count'] = 1
+            contribution[f'{dimension}_rating_{rating}_count'] = 1
+
+    bucket = sentiment_bucket(review.sentiment_score)
+    if bucket:
+        contribution[f'{bucket}_sentiment_count'] = 1
+    return contribution
+
+
+def apply_analytics_delta(restaurant_id, delta):
+    """
+    Add a counter delta to a restaurant's analytics row with a single
+    UPDATE ... SET x = x + n, creating the row on the first review. A delta
+    that takes counts out of a missing row recomputes the row instead.
+    """
+    delta = {field: value for field, value in delta.items() if value}
+    if not delta:
+        return
+
+    # update() skips auto_now; last_updated drives the analytics ETag
+    updates = {field: F(field) + value for field, value in delta.items()}
+    updates['last_updated'] = timezone.now()
+    stats['deltas_applied'] += 1
+    logger.debug('Analytics delta for restaurant %s: %s', restaurant_id, delta)
+    if ReviewAnalytics.objects.filter(restaurant_id=restaurant_id).update(**updates):
+        return
+
+    if any(value < 0 for value in delta.values()):
+        # Taking a review out of a restaurant without analytics means the
+        # row drifted; creating it would store negative counters
+        logger.debug('No analytics row to subtract from for restaurant %s, recomputing', restaurant_id)
+        recompute_restaurant_analytics([restaurant_id], rebuild_daily=False)
+        return
+
+    try:
+        with transaction.atomic():
+            ReviewAnalytics.objects.create(restaurant_id=restaurant_id, **delta)
+            stats['rows_created'] += 1
+    except IntegrityError:
+        # Another writer created the row first
+        ReviewAnalytics.objects.filter(restaurant_id=restaurant_id).update(**updates)
+
+
+def subtract(contribution):
+    return {field: -value for field, value in contribution.items()}
+
+
+def analytics_deferred():
+    return settings.REVIEW_ANALYTICS_MODE == 'deferred'
+
+
+def invalidate_after_commit(restaurant_ids):
+    """
+    Drop cached restaurant payloads once the write is committed, so a reader
+    cannot cache the pre-write state in between
+    """
+    restaurant_ids = [restaurant_id for restaurant_id in restaurant_ids if restaurant_id is not None]
+    if restaurant_ids:
+        transaction.on_commit(lambda: invalidate_restaurants(restaurant_ids))
+
+
+def mark_restaurants_dirty(restaurant_ids, days=()):
+    """
+    Queue restaurants, and the (restaurant_id, day) buckets that changed,
+    for the analytics worker with one upsert each; no lock is taken on the
+    analytics rows themselves
+    """
+    now = timezone.now()
+    restaurant_ids = set(restaurant_ids)
+    days = set(days)
+    stats['restaurants_marked_dirty'] += len(restaurant_ids)
+    DirtyRestaurant.objects.bulk_create(
+        [DirtyRestaurant(restaurant_id=restaurant_id, marked_at=now) for restaurant_id in restaurant_ids],
+        update_conflicts=True,
+        unique_fields=['restaurant_id'],
+        update_fields=['marked_at'],
+    )
+    if days:
+        DirtyRestaurantDay.objects.bulk_create(
+            [DirtyRestaurantDay(restaurant_id=restaurant_id, day=day, marked_at=now) for restaurant_id, day in days],
+            update_conflicts=True,
+            unique_fields=['restaurant_id', 'day'],
+            update_fields=['marked_at'],
+        )
+
+
+def stored_contribution(review):
+    """
+    (restaurant_id, contribution) of the stored version of a review that is
+    about to be saved, or None for a new review. Deferred mode only needs the
+    restaurant, so the contribution is None there.
+    """
+    if review._state.adding:
+        return None
+    if analytics_deferred():
+        return (
+            Review.objects.filter(pk=review.pk).values_list('restaurant_id', flat=True).first(),
+            None
+        )
+    previous = Review.objects.filter(pk=review.pk).only(
+        'restaurant_id', 'overall_rating', 'food_rating', 'service_rating',
+        'ambiance_rating', 'sentiment_score', 'moderation_status'
+    ).first()
+    if previous is None:
+        return None
+    return previous.restaurant_id, review_contribution(previous)
+
+
+def record_review_saved(review, previous=None):
+    """
+    Account for a saved review: one delta against what the stored version
+    contributed (`previous`, from stored_contribution), applied to the
+    analytics row and the daily bucket, or a dirty mark in deferred mode
+    """
+    restaurant_ids = [review.restaurant_id]
+    if previous is not None and previous[0] is not None:
+        restaurant_ids.append(previous[0])
+    invalidate_after_commit(restaurant_ids)
+
+    day = review_day(review)
+    if analytics_deferred():
+        mark_restaurants_dirty(restaurant_ids, [(restaurant_id, day) for restaurant_id in restaurant_ids])
+        return
+
+    current = review_contribution(review)
+
+    if previous is None:
+        apply_analytics_delta(review.restaurant_id, current)
+        apply_daily_delta(review.restaurant_id, day, daily_contribution(current))
+        return
+
+    previous_restaurant_id, previous_contribution = previous
+    if previous_restaurant_id != review.restaurant_id:
+        apply_analytics_delta(previous_restaurant_id, subtract(previous_contribution))
+        apply_analytics_delta(review.restaurant_id, current)
+        apply_daily_delta(previous_restaurant_id, day, subtract(daily_contribution(previous_contribution)))
+        apply_daily_delta(review.restaurant_id, day, daily_contribution(current))
+        return
+
+    delta = {
+        field: current.get(field, 0) - previous_contribution.get(field, 0)
+        for field in ANALYTICS_COUNTERS
+    }
+    apply_analytics_delta(review.restaurant_id, delta)
+    apply_daily_delta(review.restaurant_id, day, daily_contribution(delta))
+
+
+def record_item_rating(restaurant_id, added=None, removed=None):
+    """
+    Move one item rating into (`added`) and/or out of (`removed`) the
+    restaurant's item rating histogram
+    """
+    if restaurant_id is None or added == removed:
+        return
+    if analytics_deferred():
+        mark_restaurants_dirty([restaurant_id])
+        return
+    delta = Counter()
+    if added is not None:
+        delta[f'item_rating_{added}_count'] += 1
+    if removed is not None:
+        delta[f'item_rating_{removed}_count'] -= 1
+    apply_analytics_delta(restaurant_id, delta)
+
+
+def record_review_deleted(review):
+    """Take a deleted review back out of analytics and its daily bucket"""
+    invalidate_after_commit([review.restaurant_id])
+    if analytics_deferred():
+        mark_restaurants_dirty([review.restaurant_id], [(review.restaurant_id, review_day(review))])
+        return
+    removed = subtract(review_contribution(review))
+    apply_analytics_delta(review.restaurant_id, removed)
+    apply_daily_delta(review.restaurant_id, review_day(review), daily_contribution(removed))
+
+
+def aggregate_analytics(reviews):
+    """
+    Counter values for a review queryset, grouped per restaurant in one query
+    """
+    return reviews.values('restaurant_id').annotate(
+        total_reviews=Count('id'),
+        overall_rating_sum=Sum('overall_rating'),
+        food_rating_sum=Sum('food_rating'),
+        food_rating_count=Count('food_rating'),
+        service_rating_sum=Sum('service_rating'),
+        service_rating_count=Count('service_rating'),
+        ambiance_rating_sum=Sum('ambiance_rating'),
+        ambiance_rating_count=Count('ambiance_rating'),
+        **{
+            f'{dimension}_rating_{rating}_count': Count(Case(
+                When(**{f'{dimension}_rating': rating}, then=1),
+                output_field=IntegerField()
+            ))
+            for dimension in REVIEW_DIMENSIONS
+            for rating in range(1, 6)
+        },
+        positive_sentiment_count=Count(Case(
+            When(sentiment_score__gte=0.1, then=1),
+            output_field=IntegerField()
+        )),
+        neutral_sentiment_count=Count(Case(
+            When(sentiment_score__lt=0.1, sentiment_score__gt=-0.1, then=1),
+            output_field=IntegerField()
+        )),
+        negative_sentiment_count=Count(Case(
+            When(sentiment_score__lte=-0.1, then=1),
+            output_field=IntegerField()
+        ))
+    ).order_by()
+
+
+def aggregate_item_histograms(reviews):
+    """{restaurant_id: item histogram counters} for the item reviews of a review queryset"""
+    rows = ItemReview.objects.filter(review__in=reviews).values('review__restaurant_id').annotate(**{
+        f'item_rating_{rating}_count': Count(Case(
+            When(rating=rating, then=1),
+            output_field=IntegerField()
+        ))
+        for rating in range(1, 6)
+    }).order_by()
+    return {row.pop('review__restaurant_id'): row for row in rows}
+
+
+def recompute_restaurant_analytics(restaurant_ids=None, batch_size=1000, rebuild_daily=True):
+    """
+    Rebuild analytics and (unless rebuild_daily is False) daily buckets from
+    the reviews themselves (drift repair). Restaurants that no longer have
+    reviews lose their analytics row. Returns the number of analytics rows
+    written.
+    """
+    started = time.perf_counter()
+    reviews = Review.objects.filter(moderation_status=Review.ModerationStatus.APPROVED)
+    stale = ReviewAnalytics.objects.all()
+    if restaurant_ids is not None:
+        reviews = reviews.filter(restaurant_id__in=restaurant_ids)
+        stale = stale.filter(restaurant_id__in=restaurant_ids)
+
+    item_histograms = aggregate_item_histograms(reviews)
+    rows = [
+        ReviewAnalytics(
+            **{field: row[field] or 0 for field in ANALYTICS_COUNTERS},
+            **item_histograms.get(row['restaurant_id'], {}),
+            restaurant_id=row['restaurant_id']
+        )
+        for row in aggregate_analytics(reviews)
+    ]
+
+    with transaction.atomic():
+        touched = set(stale.values_list('restaurant_id', flat=True) if restaurant_ids is None else restaurant_ids)
+        invalidate_after_commit(touched | {row.restaurant_id for row in rows})
+        stale.exclude(restaurant_id__in=[row.restaurant_id for row in rows]).delete()
+        ReviewAnalytics.objects.bulk_create(
+            rows,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=['restaurant_id'],
+            update_fields=ANALYTICS_COUNTERS + ITEM_HISTOGRAM_COUNTERS + ['last_updated'],
+        )
+        if rebuild_daily:
+            rebuild_daily_stats(restaurant_ids, batch_size=batch_size)
+
+    stats['recomputations'] += 1
+    stats['restaurants_recomputed'] += len(rows)
+    logger.debug(
+        'Recomputed analytics for %d restaurants in %.3fs',
+        len(rows), time.perf_counter() - started
+    )
+    return len(rows)
+
+
+def update_restaurant_analytics(restaurant_id):
+    """
+    Fully recompute analytics for the specified restaurant
+    """
+    recompute_restaurant_analytics([restaurant_id])
+
+
+def refresh_restaurant_analytics(restaurant_ids, days=None):
+    """
+    Bring analytics up to date after bulk writes that bypass the review
+    signals: queue the restaurants in deferred mode, otherwise recompute them
+    in one grouped query. `days` lists the (restaurant_id, day) buckets the
+    writes touched; without it every daily bucket of the restaurants is
+    rebuilt inline, and none by the deferred worker.
+    """
+    restaurant_ids = list(restaurant_ids)
+    if not restaurant_ids:
+        return
+    if analytics_deferred():
+        mark_restaurants_dirty(restaurant_ids, days or ())
+        invalidate_after_commit(restaurant_ids)
+    elif days is None:
+        recompute_restaurant_analytics(restaurant_ids)
+    else:
+        recompute_restaurant_analytics(restaurant_ids, rebuild_daily=False)
+        rebuild_daily_buckets(days)
+
+
+def process_dirty_restaurants(batch_size=None):
+    """
+    Recompute analytics for up to `batch_size` dirty restaurants in one
+    grouped query and bulk upsert, and rebuild only the daily buckets marked
+    with them. Restaurants and days re-marked while the batch was being
+    processed stay queued. Returns the number of restaurants processed.
+    """
+    batch_size = batch_size or settings.REVIEW_ANALYTICS_BATCH_SIZE
+    batch = list(
+        DirtyRestaurant.objects.order_by('marked_at').values_list('restaurant_id', 'marked_at')[:batch_size]
+    )
+    if not batch:
+        return 0
+
+    restaurant_ids = [restaurant_id for restaurant_id, marked_at in batch]
+    claimed_until = max(marked_at for restaurant_id, marked_at in batch)
+    dirty_days = DirtyRestaurantDay.objects.filter(restaurant_id__in=restaurant_ids, marked_at__lte=claimed_until)
+    days = list(dirty_days.values_list('restaurant_id', 'day'))
+
+    recompute_restaurant_analytics(restaurant_ids, rebuild_daily=False)
+    rebuild_daily_buckets(days)
+
+    dirty_days.delete()
+    DirtyRestaurant.objects.filter(
+        restaurant_id__in=restaurant_ids, marked_at__lte=claimed_until
+    ).delete()
+    return len(batch)
+
@@ -0,0 +1,50 @@
+from django.conf import settings
+from django.core.cache import cache
+
+
+def summary_cache_key(restaurant_id):
+    return f'rattingapp:summary:{restaurant_id}'
+
+
+def analytics_cache_key(restaurant_id):
+    return f'rattingapp:analytics:{restaurant_id}'
+
+
+def get_cached_summary(restaurant_id):
+    return cache.get(summary_cache_key(restaurant_id))
+
+
+def set_cached_summary(restaurant_id, data):
+    cache.set(summary_cache_key(restaurant_id), data, settings.REVIEW_SUMMARY_CACHE_SECONDS)
+
+
+def get_cached_analytics(restaurant_id):
+    return cache.get(analytics_cache_key(restaurant_id))
+
+
+def set_cached_analytics(restaurant_id, entry):
+    cache.set(analytics_cache_key(restaurant_id), entry, settings.REVIEW_ANALYTICS_CACHE_SECONDS)
+
+
+def get_many_cached_analytics(restaurant_ids):
+    """{restaurant_id: entry} for the restaurants whose analytics are cached"""
+    keys = {analytics_cache_key(restaurant_id): restaurant_id for restaurant_id in restaurant_ids}
+    return {keys[key]: entry for key, entry in cache.get_many(list(keys)).items()}
+
+
+def set_many_cached_analytics(entries):
+    cache.set_many(
+        {analytics_cache_key(restaurant_id): entry for restaurant_id, entry in entries.items()},
+        settings.REVIEW_ANALYTICS_CACHE_SECONDS
+    )
+
+
+def invalidate_restaurants(restaurant_ids):
+    """
+    Drop cached per-restaurant payloads after review writes
+    """
+    cache.delete_many([
+        key(restaurant_id)
+        for restaurant_id in set(restaurant_ids)
+        for key in (summary_cache_key, analytics_cache_key)
+    ])
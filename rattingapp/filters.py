@@ -0,0 +1,20 @@
+from rest_framework import filters
+from .search import matching_review_ids
+
+
+class IndexedCommentSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that resolves ?search= through the ReviewTerm index instead
+    of LIKE '%term%' over every comment. A restaurant_id query parameter
+    scopes the index lookup as well.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        review_ids = matching_review_ids(query, request.query_params.get('restaurant_id') or view.kwargs.get('restaurant_id'))
+        if review_ids is None:
+            # Only stop words: nothing to search for
+            return queryset
+        return queryset.filter(pk__in=review_ids)
@@ -0,0 +1,58 @@
+"""
+Statistics of 1-5 star rating histograms, given as a list of counts per
+star. Everything is derived from the five counters, never from reviews.
+"""
+import math
+from decimal import Decimal
+
+
+RATINGS = range(1, 6)
+
+
+def _rating_at_rank(counts, rank):
+    """Rating of the rank-th (1-based) rating in ascending order"""
+    running = 0
+    for rating, count in zip(RATINGS, counts):
+        running += count
+        if running >= rank:
+            return rating
+    return None
+
+
+def percentile(counts, q):
+    """Nearest-rank percentile (q from 0 to 100); None for an empty histogram"""
+    total = sum(counts)
+    if not total:
+        return None
+    return _rating_at_rank(counts, max(1, math.ceil(q / 100 * total)))
+
+
+def median(counts):
+    """Median rating, averaging the two middle ratings of an even count"""
+    total = sum(counts)
+    if not total:
+        return None
+    if total % 2:
+        return Decimal(_rating_at_rank(counts, total // 2 + 1))
+    middle = _rating_at_rank(counts, total // 2) + _rating_at_rank(counts, total // 2 + 1)
+    return Decimal(middle) / 2
+
+
+def mean(counts):
+    total = sum(counts)
+    if not total:
+        return None
+    weighted = sum(rating * count for rating, count in zip(RATINGS, counts))
+    return (Decimal(weighted) / Decimal(total)).quantize(Decimal('0.01'))
+
+
+def summarize(counts):
+    return {
+        'counts': dict(zip(RATINGS, counts)),
+        'total': sum(counts),
+        'average': mean(counts),
+        'median': median(counts),
+        'p25': percentile(counts, 25),
+        'p75': percentile(counts, 75),
+        'p90': percentile(counts, 90),
+    }
@@ -0,0 +1,203 @@
+import json
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.exceptions import ValidationError
+from .item_ratings import rebuild_item_ratings
+from .models import Review, ItemReview, CommentFingerprint
+from .moderation import shingles, lsh_buckets, fingerprints
+from .search import index_new_reviews
+from .sentiment import initial_sentiment
+from .serializers import ReviewCreateSerializer
+from .trending import review_day
+from .analytics import refresh_restaurant_analytics
+
+
+# Errors reported back per import; the count of rejected rows is always complete
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportResult:
+    def __init__(self):
+        self.imported = 0
+        self.item_reviews = 0
+        self.rejected = 0
+        self.errors = []
+        self.restaurant_ids = set()
+        # (restaurant_id, day) daily buckets the imported reviews fall into
+        self.days = set()
+        self.menu_item_ids = set()
+
+    def reject(self, line_number, error):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_number, 'error': error})
+
+    def as_dict(self):
+        return {
+            'imported': self.imported,
+            'item_reviews': self.item_reviews,
+            'rejected': self.rejected,
+            'restaurants': len(self.restaurant_ids),
+            'errors': self.errors,
+        }
+
+
+def _parsed_lines(lines, result):
+    """(line number, payload) for every non-blank NDJSON line that parses as an object"""
+    for line_number, line in enumerate(lines, start=1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        if not line.strip():
+            continue
+        try:
+            payload = json.loads(line)
+        except ValueError as e:
+            result.reject(line_number, f'Invalid JSON: {e}')
+            continue
+        if not isinstance(payload, dict):
+            result.reject(line_number, 'Each line must be a JSON object')
+            continue
+        yield line_number, payload
+
+
+_timestamp_field = serializers.DateTimeField()
+
+
+def _import_timestamps(payload):
+    """
+    Original created_at / updated_at of an imported review, so migrated
+    reviews keep their dates in the daily stats, trends and keyword months.
+    Both are optional (the import time is used); updated_at defaults to
+    created_at.
+    """
+    timestamps = {}
+    errors = {}
+    for field in ('created_at', 'updated_at'):
+        if payload.get(field) in (None, ''):
+            continue
+        try:
+            timestamps[field] = _timestamp_field.run_validation(payload[field])
+        except ValidationError as e:
+            errors[field] = e.detail
+    if errors:
+        raise ValidationError(errors)
+
+    created_at = timestamps.get('created_at')
+    if created_at is None:
+        if timestamps:
+            raise ValidationError({'updated_at': ['updated_at requires created_at']})
+        return timestamps
+    if created_at > timezone.now():
+        raise ValidationError({'created_at': ['created_at cannot be in the future']})
+    timestamps.setdefault('updated_at', created_at)
+    if timestamps['updated_at'] < created_at:
+        raise ValidationError({'updated_at': ['updated_at cannot be before created_at']})
+    return timestamps
+
+
+def _chunks(rows, chunk_size):
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _import_chunk(chunk, result, defer_sentiment):
+    # One serializer validates the whole chunk, like ListSerializer does, but
+    # a bad row only rejects itself
+    validator = ReviewCreateSerializer()
+
+    reviews = []
+    item_reviews = []
+    dated = {}
+    for line_number, payload in chunk:
+        try:
+            data = validator.run_validation(payload)
+            timestamps = _import_timestamps(payload)
+        except ValidationError as e:
+            result.reject(line_number, e.detail)
+            continue
+
+        items = data.pop('item_reviews', [])
+        if defer_sentiment and data.get('comment') and data['comment'].strip():
+            data.update(sentiment_score=None, sentiment_status=Review.SentimentStatus.PENDING)
+        else:
+            data.update(initial_sentiment(data.get('comment')))
+
+        review = Review(**data)
+        review.sync_has_comment()
+        reviews.append(review)
+        if timestamps:
+            dated[review] = timestamps
+        item_reviews.extend(ItemReview(review=review, **item) for item in items)
+
+    # Plain bulk inserts: no per-row signals, analytics are refreshed once at the end
+    with transaction.atomic():
+        Review.objects.bulk_create(reviews)
+        if dated:
+            # bulk_create stamps auto_now_add fields with the current time
+            # even when they are set, but bulk_update writes them as given
+            for review, timestamps in dated.items():
+                for field, value in timestamps.items():
+                    setattr(review, field, value)
+            Review.objects.bulk_update(list(dated), ['created_at', 'updated_at'])
+        ItemReview.objects.bulk_create(item_reviews)
+        index_new_reviews([review for review in reviews if review.has_comment])
+        # Imported comments are fingerprinted like new ones, so later reviews
+        # repeating them are caught as near-duplicates
+        CommentFingerprint.objects.bulk_create([
+            fingerprint
+            for review in reviews if review.has_comment
+            for fingerprint in fingerprints(review, lsh_buckets(shingles(review.comment)))
+        ])
+
+    result.imported += len(reviews)
+    result.item_reviews += len(item_reviews)
+    result.restaurant_ids.update(review.restaurant_id for review in reviews)
+    result.days.update((review.restaurant_id, review_day(review)) for review in reviews)
+    result.menu_item_ids.update(item.menu_item_id for item in item_reviews)
+
+
+def _batches(values, size):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def import_reviews(lines, chunk_size=1000, defer_sentiment=False, progress=None):
+    """
+    Import reviews (with nested item_reviews) from NDJSON lines, one review
+    object per line in the same shape as the create endpoint, plus optional
+    original created_at / updated_at timestamps.
+
+    Rows are validated and bulk inserted a chunk at a time, each chunk in its
+    own transaction; invalid rows are skipped and reported. Review signals do
+    not fire, so analytics and menu item rollups are rebuilt once per
+    affected restaurant and item after the last chunk, and daily buckets
+    only for the days the imported reviews fall on. Comments
+    are added to the search index with each chunk. If an import
+    dies half way, `manage.py rebuild_review_analytics` repairs them.
+
+    With defer_sentiment comments are stored as pending for
+    `manage.py score_pending_sentiment` instead of being scored inline.
+    Returns an ImportResult.
+    """
+    result = ImportResult()
+    for chunk in _chunks(_parsed_lines(lines, result), chunk_size):
+        _import_chunk(chunk, result, defer_sentiment)
+        if progress:
+            progress(result)
+
+    for restaurant_ids in _batches(result.restaurant_ids, chunk_size):
+        batch = set(restaurant_ids)
+        refresh_restaurant_analytics(
+            restaurant_ids, days=[day for day in result.days if day[0] in batch]
+        )
+    for menu_item_ids in _batches(result.menu_item_ids, chunk_size):
+        rebuild_item_ratings(menu_item_ids)
+    return result
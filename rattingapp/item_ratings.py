@@ -0,0 +1,82 @@
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum, Max, Case, When, IntegerField, F, FloatField, ExpressionWrapper
+from .models import Review, ItemReview, MenuItemRating
+
+
+ITEM_COUNTERS = ['rating_count', 'rating_sum'] + [f'rating_{rating}_count' for rating in range(1, 6)]
+
+AVERAGE_RATING = ExpressionWrapper(F('rating_sum') * 1.0 / F('rating_count'), output_field=FloatField())
+
+
+def item_contribution(rating):
+    return {'rating_count': 1, 'rating_sum': rating, f'rating_{rating}_count': 1}
+
+
+def apply_item_delta(menu_item_id, restaurant_id, delta):
+    """
+    Add a counter delta to a menu item's rollup with a single
+    UPDATE ... SET x = x + n, creating the rollup on the item's first rating
+    """
+    delta = {field: value for field, value in delta.items() if value}
+    if not delta:
+        return
+
+    updates = {field: F(field) + value for field, value in delta.items()}
+    rollups = MenuItemRating.objects.filter(menu_item_id=menu_item_id)
+    if rollups.update(**updates):
+        return
+
+    try:
+        with transaction.atomic():
+            MenuItemRating.objects.create(menu_item_id=menu_item_id, restaurant_id=restaurant_id, **delta)
+    except IntegrityError:
+        # Another writer created the rollup first
+        rollups.update(**updates)
+
+
+def rebuild_item_ratings(menu_item_ids=None, batch_size=1000):
+    """
+    Rebuild menu item rollups from the item reviews, for every item or only
+    the given ones (drift repair, bulk imports). Returns the number of
+    rollups written.
+    """
+    item_reviews = ItemReview.objects.filter(review__moderation_status=Review.ModerationStatus.APPROVED)
+    stale = MenuItemRating.objects.all()
+    if menu_item_ids is not None:
+        item_reviews = item_reviews.filter(menu_item_id__in=menu_item_ids)
+        stale = stale.filter(menu_item_id__in=menu_item_ids)
+
+    rows = item_reviews.values('menu_item_id').annotate(
+        restaurant_id=Max('review__restaurant_id'),
+        rating_count=Count('id'),
+        rating_sum=Sum('rating'),
+        **{
+            f'rating_{rating}_count': Count(Case(
+                When(rating=rating, then=1),
+                output_field=IntegerField()
+            ))
+            for rating in range(1, 6)
+        },
+    ).order_by()
+
+    written = 0
+    with transaction.atomic():
+        stale.delete()
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(MenuItemRating(**row))
+            if len(batch) >= batch_size:
+                MenuItemRating.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            MenuItemRating.objects.bulk_create(batch)
+            written += len(batch)
+    return written
+
+
+def top_items(restaurant_id, limit=5, min_ratings=2):
+    """Best rated menu items of a restaurant, read from the rollups"""
+    return MenuItemRating.objects.filter(
+        restaurant_id=restaurant_id, rating_count__gte=min_ratings
+    ).annotate(avg_rating=AVERAGE_RATING).order_by('-avg_rating', '-rating_count')[:limit]
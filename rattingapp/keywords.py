@@ -0,0 +1,215 @@
+import operator
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from functools import reduce
+from itertools import groupby
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+from .lexicon import STOP_WORDS
+from .models import Review, RestaurantKeyword, JobCheckpoint
+from .search import words
+from .analytics import sentiment_bucket
+
+
+KEYWORDS_JOB = 'review_keywords'
+MIN_KEYWORD_LENGTH = 3
+# Changed restaurant-months read per query by incremental runs
+MONTHS_PER_QUERY = 100
+
+
+def month_start(moment):
+    day = timezone.localdate(moment) if isinstance(moment, datetime) else moment
+    return date(day.year, day.month, 1)
+
+
+def keywords(text):
+    """Words of a comment worth counting (unstemmed, so owners can read them)"""
+    return [word for word in words(text) if len(word) >= MIN_KEYWORD_LENGTH and word not in STOP_WORDS]
+
+
+def _month_rows(restaurant_id, month, reviews, top_n):
+    """
+    Keyword rows for one restaurant and month. Counting goes through
+    Counter.update, which tallies a whole comment per C-level call.
+    """
+    term_counts = {}
+    review_counts = {}
+    for created_at, score, comment in reviews:
+        bucket = sentiment_bucket(score)
+        if bucket is None:
+            continue
+        comment_words = keywords(comment)
+        term_counts.setdefault(bucket, Counter()).update(comment_words)
+        review_counts.setdefault(bucket, Counter()).update(set(comment_words))
+
+    return [
+        RestaurantKeyword(
+            restaurant_id=restaurant_id, month=month, bucket=bucket, term=term,
+            count=count, review_count=review_counts[bucket][term]
+        )
+        for bucket, counts in term_counts.items()
+        for term, count in counts.most_common(top_n)
+    ]
+
+
+def _replace_months(restaurant_id, months, rows):
+    """Swap in a restaurant's new keyword rows for the given months (all months when None)"""
+    stale = RestaurantKeyword.objects.filter(restaurant_id=restaurant_id)
+    if months is not None:
+        stale = stale.filter(month__in=months)
+    with transaction.atomic():
+        stale.delete()
+        RestaurantKeyword.objects.bulk_create(rows, batch_size=1000)
+
+
+def _changed_months(since):
+    """
+    {restaurant_id: {month, ...}} for reviews written after `since`; the
+    sentiment scoring jobs bump updated_at too, so rescored reviews count
+    """
+    changed = {}
+    rows = Review.objects.filter(updated_at__gt=since).annotate(
+        month=TruncMonth('created_at')
+    ).values_list('restaurant_id', 'month').distinct().order_by()
+    for restaurant_id, month in rows.iterator():
+        changed.setdefault(restaurant_id, set()).add(month_start(month))
+    return changed
+
+
+def _month_bounds(month):
+    """Aware [start, end) datetimes of a month in the current time zone"""
+    next_month = (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return (
+        timezone.make_aware(datetime.combine(month, time.min)),
+        timezone.make_aware(datetime.combine(next_month, time.min)),
+    )
+
+
+def _changed_batches(changed, batch_size):
+    """
+    Split {restaurant_id: months} into batches of whole restaurants holding
+    about `batch_size` restaurant-months each
+    """
+    batch = {}
+    size = 0
+    for restaurant_id in sorted(changed):
+        batch[restaurant_id] = changed[restaurant_id]
+        size += len(changed[restaurant_id])
+        if size >= batch_size:
+            yield batch
+            batch = {}
+            size = 0
+    if batch:
+        yield batch
+
+
+def _months_filter(changed):
+    """
+    Reviews of the given restaurant-months only: one created_at range per
+    (restaurant, month), each served by the (restaurant_id, has_comment,
+    -created_at) index
+    """
+    return reduce(operator.or_, (
+        Q(restaurant_id=restaurant_id, created_at__gte=start, created_at__lt=end)
+        for restaurant_id, months in changed.items()
+        for start, end in map(_month_bounds, sorted(months))
+    ))
+
+
+def _write_keywords(reviews, changed, top_n, chunk_size):
+    """
+    Stream comments ordered by restaurant and date and replace each
+    restaurant's keyword rows, one restaurant-month in memory at a time.
+    Yields (restaurant_id, months written) per restaurant seen.
+    """
+    # Newest first matches the (restaurant_id, has_comment, -created_at) index
+    stream = reviews.order_by('restaurant_id', '-created_at').values_list(
+        'restaurant_id', 'created_at', 'sentiment_score', 'comment'
+    ).iterator(chunk_size=chunk_size)
+
+    for restaurant_id, restaurant_reviews in groupby(stream, key=lambda row: row[0]):
+        wanted = changed.get(restaurant_id) if changed is not None else None
+        rows = []
+        months = set()
+        for month, month_reviews in groupby(restaurant_reviews, key=lambda row: month_start(row[1])):
+            months.add(month)
+            rows.extend(_month_rows(restaurant_id, month, (row[1:] for row in month_reviews), top_n))
+        # Changed months may have lost every comment or score; a full run replaces all months
+        _replace_months(restaurant_id, months | wanted if wanted is not None else None, rows)
+        yield restaurant_id, len(months)
+
+
+def extract_keywords(full=False, top_n=None, chunk_size=2000, progress=None):
+    """
+    Recompute the top keywords per restaurant, month and sentiment bucket.
+
+    Comments are streamed ordered by restaurant and date, so only one
+    restaurant-month is held in memory at a time. The incremental mode (the
+    default after a first full run) only reads and recomputes the
+    restaurant-months that received or changed reviews since the last run;
+    deleted reviews are picked up by the next full run. Returns the number
+    of restaurant-months written.
+    """
+    top_n = top_n or settings.REVIEW_KEYWORDS_TOP_N
+    started_at = timezone.now()
+    checkpoint, _ = JobCheckpoint.objects.get_or_create(name=KEYWORDS_JOB)
+    since = None if full or not checkpoint.position else datetime.fromisoformat(checkpoint.position)
+
+    reviews = Review.objects.filter(
+        has_comment=True, sentiment_score__isnull=False, moderation_status=Review.ModerationStatus.APPROVED
+    )
+    if since is None:
+        changed = None
+        passes = [(reviews, None)]
+    else:
+        changed = _changed_months(since)
+        passes = (
+            (reviews.filter(_months_filter(batch)), batch)
+            for batch in _changed_batches(changed, MONTHS_PER_QUERY)
+        )
+
+    written = 0
+    seen = set()
+    for batch_reviews, batch in passes:
+        for restaurant_id, months in _write_keywords(batch_reviews, batch, top_n, chunk_size):
+            seen.add(restaurant_id)
+            written += months
+            if progress:
+                progress(written)
+
+    # Restaurants without any scored comment left
+    if changed is not None:
+        for restaurant_id in changed.keys() - seen:
+            _replace_months(restaurant_id, changed[restaurant_id], [])
+    else:
+        gone = set(RestaurantKeyword.objects.values_list('restaurant_id', flat=True).distinct()) - seen
+        for restaurant_id in gone:
+            _replace_months(restaurant_id, None, [])
+
+    checkpoint.position = started_at.isoformat()
+    checkpoint.processed += written
+    checkpoint.save(update_fields=['position', 'processed', 'updated_at'])
+    return written
+
+
+def restaurant_keywords(restaurant_id, month=None, bucket=None):
+    """
+    Stored keywords for a restaurant: {'month', 'keywords': {bucket: [...]}}
+    for the given month, or the latest month with keywords
+    """
+    stored = RestaurantKeyword.objects.filter(restaurant_id=restaurant_id)
+    if month is None:
+        month = stored.order_by('-month').values_list('month', flat=True).first()
+        if month is None:
+            return {'month': None, 'keywords': {}}
+    stored = stored.filter(month=month)
+    if bucket:
+        stored = stored.filter(bucket=bucket)
+
+    result = {}
+    for row in stored.order_by('bucket', '-count', 'term').values('bucket', 'term', 'count', 'review_count'):
+        result.setdefault(row.pop('bucket'), []).append(row)
+    return {'month': month, 'keywords': result}
@@ -0,0 +1,63 @@
+"""
+Sentiment vocabulary for the lexicon scorer.
+
+Polarities are on TextBlob's -1..1 scale and lean towards restaurant review
+language. Intensifiers scale the next sentiment word, negations flip it.
+"""
+
+POLARITY = {
+    # Positive
+    'amazing': 0.6, 'attentive': 0.5, 'authentic': 0.4, 'awesome': 1.0,
+    'beautiful': 0.85, 'best': 1.0, 'better': 0.5, 'brilliant': 0.9,
+    'charming': 0.5, 'clean': 0.37, 'cozy': 0.5, 'cosy': 0.5, 'crispy': 0.4,
+    'delicious': 1.0, 'delightful': 0.9, 'enjoy': 0.4, 'enjoyed': 0.4,
+    'excellent': 1.0, 'exceptional': 0.67, 'fabulous': 0.4, 'fantastic': 0.4,
+    'fast': 0.2, 'favorite': 0.5, 'favourite': 0.5, 'fine': 0.42, 'flavorful': 0.6,
+    'flavourful': 0.6, 'fresh': 0.3, 'friendly': 0.38, 'generous': 0.5,
+    'good': 0.7, 'gorgeous': 0.7, 'great': 0.8, 'happy': 0.8, 'helpful': 0.5,
+    'hot': 0.25, 'impressive': 1.0, 'incredible': 0.9, 'juicy': 0.5, 'kind': 0.6,
+    'love': 0.5, 'loved': 0.7, 'lovely': 0.5, 'nice': 0.6, 'perfect': 1.0,
+    'perfectly': 1.0, 'pleasant': 0.73, 'polite': 0.5, 'professional': 0.4,
+    'prompt': 0.3, 'quick': 0.33, 'recommend': 0.5, 'recommended': 0.5,
+    'reasonable': 0.2, 'relaxing': 0.5, 'satisfied': 0.5, 'superb': 1.0,
+    'tasty': 0.8, 'tender': 0.4, 'terrific': 1.0, 'thanks': 0.2, 'warm': 0.6,
+    'welcoming': 0.6, 'wonderful': 1.0, 'worth': 0.3, 'yummy': 0.8,
+
+    # Negative
+    'awful': -1.0, 'bad': -0.7, 'bland': -0.5, 'bitter': -0.1, 'boring': -1.0,
+    'broken': -0.4, 'burnt': -0.6, 'careless': -0.5, 'cold': -0.6, 'complain': -0.4,
+    'dirty': -0.6, 'disappointed': -0.75, 'disappointing': -0.6, 'disgusting': -1.0,
+    'dry': -0.2, 'expensive': -0.5, 'greasy': -0.5, 'gross': -0.8, 'hate': -0.8,
+    'hated': -0.9, 'horrible': -1.0, 'inedible': -0.9, 'lukewarm': -0.4,
+    'mediocre': -0.3, 'mess': -0.4, 'messy': -0.4, 'noisy': -0.4, 'overcooked': -0.5,
+    'overpriced': -0.6, 'poor': -0.4, 'raw': -0.23, 'rude': -0.3, 'salty': -0.3,
+    'slow': -0.3, 'smelly': -0.6, 'soggy': -0.5, 'stale': -0.5, 'sick': -0.71,
+    'terrible': -1.0, 'undercooked': -0.5, 'unfriendly': -0.5, 'unhappy': -0.6,
+    'unprofessional': -0.6, 'worse': -0.4, 'worst': -1.0, 'wrong': -0.5,
+}
+
+# Multipliers applied to the next sentiment word
+INTENSIFIERS = {
+    'absolutely': 1.5, 'extremely': 1.5, 'incredibly': 1.4, 'really': 1.3,
+    'so': 1.3, 'super': 1.4, 'too': 1.2, 'totally': 1.4, 'very': 1.3,
+    'quite': 1.1, 'pretty': 1.1, 'slightly': 0.6, 'somewhat': 0.7, 'bit': 0.7,
+}
+
+# Words that flip (and soften) the polarity of the next sentiment word
+NEGATIONS = frozenset({
+    'not', 'no', 'never', 'nothing', 'neither', 'nor', 'hardly', 'barely',
+    'isnt', 'wasnt', 'arent', 'werent', 'dont', 'didnt', 'doesnt', 'cant',
+    'couldnt', 'wont', 'wouldnt', 'shouldnt', 'aint', 'without',
+})
+
+# Words too common to be worth indexing or searching for
+STOP_WORDS = frozenset({
+    'a', 'about', 'after', 'again', 'all', 'also', 'am', 'an', 'and', 'any', 'are',
+    'as', 'at', 'be', 'been', 'before', 'being', 'but', 'by', 'can', 'could', 'did',
+    'do', 'does', 'for', 'from', 'had', 'has', 'have', 'he', 'her', 'here', 'him',
+    'his', 'how', 'i', 'if', 'in', 'into', 'is', 'it', 'its', 'just', 'me', 'my',
+    'of', 'on', 'or', 'our', 'out', 'over', 'she', 'so', 'some', 'than', 'that',
+    'the', 'their', 'them', 'then', 'there', 'these', 'they', 'this', 'those', 'to',
+    'up', 'us', 'was', 'we', 'were', 'what', 'when', 'where', 'which', 'while',
+    'who', 'will', 'with', 'would', 'you', 'your',
+})
@@ -0,0 +1,49 @@
+import os
+from django.core.management.base import BaseCommand
+from rattingapp.sentiment import backfill_sentiment, reset_backfill_checkpoint
+
+
+class Command(BaseCommand):
+    help = 'Score sentiment for all reviews without a score, in parallel chunks, resuming from the last checkpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Scoring processes (defaults to the number of CPUs)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Reviews read, scored and written per chunk',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=None,
+            help='Stop after this many reviews; rerun to continue from the checkpoint',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore the stored checkpoint and start from the beginning',
+        )
+
+    def handle(self, *args, **options):
+        if options['restart']:
+            reset_backfill_checkpoint()
+
+        def progress(updated):
+            self.stdout.write(f'Scored {updated} reviews so far')
+
+        updated = backfill_sentiment(
+            workers=options['workers'],
+            chunk_size=options['chunk_size'],
+            limit=options['limit'],
+            progress=progress,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated sentiment analysis for {updated} reviews')
+        )
@@ -0,0 +1,147 @@
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from http.client import HTTPConnection
+from django.core.management.base import BaseCommand, CommandError
+
+
+# What a WSGI worker does before serving its first request: build the
+# application (django.setup(), app registry, signals) and load the URLconf,
+# which imports every view module
+BOOT_SCRIPT = """
+import time
+started = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+application = get_wsgi_application()
+from django.urls import get_resolver
+get_resolver().url_patterns
+elapsed = time.perf_counter() - started
+import sys
+heavy = sorted(name for name in ('nltk', 'textblob', 'concurrent.futures.process') if name in sys.modules)
+print(f'{elapsed:.6f} {",".join(heavy) or "-"}')
+"""
+
+# Unrouted path: answering it (404) needs the application and the full URLconf
+PROBE_PATH = '/__boot_probe__/'
+GUNICORN_START_TIMEOUT = 60
+
+IMPORT_TIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def answered(port):
+    connection = HTTPConnection('127.0.0.1', port, timeout=1)
+    try:
+        connection.request('GET', PROBE_PATH)
+        connection.getresponse().read()
+        return True
+    except OSError:
+        return False
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Measure cold worker boot time: a gunicorn worker up to its first response, or the bare WSGI boot'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--runs',
+            type=int,
+            default=10,
+            help='Cold starts measured',
+        )
+        parser.add_argument(
+            '--server',
+            choices=['gunicorn', 'wsgi'],
+            default='gunicorn',
+            help='gunicorn: start crm_data_receiver.wsgi under gunicorn (one worker) and time it until it '
+                 'answers a request; wsgi: time the application and URLconf load in a fresh interpreter',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=0,
+            help='Also list the N slowest top-level imports of this project (python -X importtime)',
+        )
+
+    def handle(self, *args, **options):
+        env = dict(os.environ)
+        env.setdefault('DJANGO_SETTINGS_MODULE', 'crm_data_receiver.settings')
+
+        measure = self._gunicorn_boot if options['server'] == 'gunicorn' else self._wsgi_boot
+        timings = [measure(env) for _ in range(options['runs'])]
+
+        self.stdout.write(
+            f'{options["server"]} worker boot over {len(timings)} runs: '
+            f'median {statistics.median(timings) * 1000:.1f} ms, '
+            f'min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms'
+        )
+        # The worker imports exactly what the bare WSGI boot does
+        heavy = self._run_boot_script(env)[1]
+        self.stdout.write(f'heavy modules loaded at boot: {heavy}')
+
+        if options['top']:
+            self._report_imports(env, options['top'])
+
+    def _run_boot_script(self, env):
+        output = subprocess.run(
+            [sys.executable, '-c', BOOT_SCRIPT], env=env, capture_output=True, text=True, check=True
+        ).stdout.split()
+        return float(output[0]), output[1]
+
+    def _wsgi_boot(self, env):
+        return self._run_boot_script(env)[0]
+
+    def _gunicorn_boot(self, env):
+        """
+        Seconds from launching gunicorn (arbiter plus one synchronous worker,
+        the application loaded in the worker as in production) until the
+        worker answers its first request
+        """
+        port = free_port()
+        started = time.perf_counter()
+        try:
+            server = subprocess.Popen(
+                [
+                    sys.executable, '-m', 'gunicorn', 'crm_data_receiver.wsgi:application',
+                    '--workers', '1', '--bind', f'127.0.0.1:{port}', '--log-level', 'warning',
+                ],
+                env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True
+            )
+        except OSError as exc:
+            raise CommandError(f'Could not start gunicorn: {exc}')
+        try:
+            while not answered(port):
+                if server.poll() is not None:
+                    raise CommandError(f'gunicorn exited before answering:\n{server.stderr.read()}')
+                if time.perf_counter() - started > GUNICORN_START_TIMEOUT:
+                    raise CommandError(f'gunicorn did not answer within {GUNICORN_START_TIMEOUT} s')
+                time.sleep(0.005)
+            return time.perf_counter() - started
+        finally:
+            server.terminate()
+            server.wait()
+
+    def _report_imports(self, env, top):
+        stderr = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', BOOT_SCRIPT], env=env, capture_output=True, text=True, check=True
+        ).stderr
+        project_apps = {'rattingapp', 'receiver', 'reports', 'stockmanagement', 'crm_data_receiver'}
+        rows = []
+        for line in stderr.splitlines():
+            match = IMPORT_TIME_RE.match(line)
+            if match and match.group(4).split('.')[0] in project_apps:
+                rows.append((int(match.group(2)), match.group(4)))
+        self.stdout.write('slowest project imports (cumulative):')
+        for microseconds, module in sorted(rows, reverse=True)[:top]:
+            self.stdout.write(f'  {microseconds / 1000:>8.1f} ms  {module}')
@@ -0,0 +1,61 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from rattingapp.sentiment import LexiconScorer, TextBlobScorer, analyze_sentiment, get_cache
+
+
+SAMPLE_COMMENTS = [
+    "Great food", "great food!", "The service was really slow and the soup was cold",
+    "Absolutely delicious, will recommend to friends", "Not good, overpriced and bland",
+    "Lovely place, friendly staff", "Terrible experience, the waiter was rude",
+    "Food was ok but nothing special", "Best burger in town", "Very noisy but tasty dishes",
+]
+
+
+class Command(BaseCommand):
+    help = 'Compare sentiment scorer throughput (lexicon vs TextBlob, with and without the comment cache)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=20000,
+            help='Comments scored per scenario',
+        )
+        parser.add_argument(
+            '--unique',
+            type=float,
+            default=0.3,
+            help='Fraction of comments that are unique (the rest repeat sample comments)',
+        )
+
+    def handle(self, *args, **options):
+        count = options['count']
+        rng = random.Random(42)
+        comments = [
+            f"{rng.choice(SAMPLE_COMMENTS)} {''.join(rng.choices('abcdefghijklmnopqrstuvwxyz', k=8))}"
+            if rng.random() < options['unique'] else rng.choice(SAMPLE_COMMENTS)
+            for i in range(count)
+        ]
+
+        scenarios = [('lexicon', LexiconScorer())]
+        try:
+            scenarios.append(('textblob', TextBlobScorer()))
+        except ImportError:
+            self.stdout.write(self.style.WARNING('textblob is not installed; skipping TextBlob scenario'))
+
+        for name, scorer in scenarios:
+            self._report(name, count, lambda: [scorer.score(comment) for comment in comments])
+
+        cache = get_cache()
+        cache.clear()
+        self._report('configured scorer + cache', count, lambda: [analyze_sentiment(comment) for comment in comments])
+        self.stdout.write(f'  cache hits: {cache.hits}, misses: {cache.misses}')
+
+    def _report(self, name, count, run):
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{name:<28} {count / elapsed:>12,.0f} comments/s  ({elapsed * 1000 / count:.4f} ms per comment)'
+        )
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from rattingapp.keywords import extract_keywords
+
+
+class Command(BaseCommand):
+    help = 'Precompute top comment keywords per restaurant, month and sentiment bucket (incremental after the first run)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Recompute every restaurant and month instead of only those with reviews written since the last run',
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=None,
+            help='Keywords kept per restaurant, month and bucket (defaults to REVIEW_KEYWORDS_TOP_N)',
+        )
+
+    def handle(self, *args, **options):
+        written = extract_keywords(full=options['full'], top_n=options['top'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Extracted keywords for {written} restaurant-months')
+        )
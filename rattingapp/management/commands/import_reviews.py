@@ -0,0 +1,47 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from rattingapp.importer import import_reviews
+
+
+class Command(BaseCommand):
+    help = 'Bulk import reviews with nested item reviews from an NDJSON file (one review per line)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="NDJSON file to import, or '-' for stdin")
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=1000,
+            help='Reviews validated and inserted per transaction',
+        )
+        parser.add_argument(
+            '--defer-sentiment',
+            action='store_true',
+            help='Store comments as pending for score_pending_sentiment instead of scoring them during the import',
+        )
+
+    def handle(self, *args, **options):
+        def progress(result):
+            self.stdout.write(f'Imported {result.imported} reviews so far ({result.rejected} rejected)')
+
+        try:
+            source = sys.stdin if options['path'] == '-' else open(options['path'], encoding='utf-8')
+        except OSError as e:
+            raise CommandError(f'Cannot open {options["path"]}: {e}')
+
+        with source:
+            result = import_reviews(
+                source,
+                chunk_size=options['chunk_size'],
+                defer_sentiment=options['defer_sentiment'],
+                progress=progress,
+            )
+
+        for error in result.errors:
+            self.stderr.write(f'Line {error["line"]}: {error["error"]}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Imported {result.imported} reviews and {result.item_reviews} item reviews '
+                f'for {len(result.restaurant_ids)} restaurants; {result.rejected} rows rejected'
+            )
+        )
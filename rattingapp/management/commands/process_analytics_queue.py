@@ -0,0 +1,45 @@
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from rattingapp.analytics import process_dirty_restaurants
+
+
+class Command(BaseCommand):
+    help = 'Recompute ReviewAnalytics for restaurants marked dirty by review writes (deferred analytics mode)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the queue once and exit instead of polling',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=settings.REVIEW_ANALYTICS_MAX_STALENESS_SECONDS,
+            help='Seconds to sleep between polls; bounds analytics staleness',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.REVIEW_ANALYTICS_BATCH_SIZE,
+            help='Restaurants recomputed per grouped query',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = 0
+            while True:
+                batch = process_dirty_restaurants(options['batch_size'])
+                if not batch:
+                    break
+                processed += batch
+
+            if processed:
+                self.stdout.write(f'Recomputed analytics for {processed} restaurants')
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('Analytics queue drained'))
@@ -0,0 +1,35 @@
+import uuid
+from django.core.management.base import BaseCommand, CommandError
+from rattingapp.item_ratings import rebuild_item_ratings
+from rattingapp.analytics import recompute_restaurant_analytics
+
+
+class Command(BaseCommand):
+    help = 'Recompute ReviewAnalytics, the daily trending buckets and menu item rollups from the reviews table to repair drift in the running counters'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--restaurant',
+            action='append',
+            dest='restaurants',
+            help='Restaurant id to rebuild (repeatable); rebuilds every restaurant and menu item rollup when omitted',
+        )
+
+    def handle(self, *args, **options):
+        restaurant_ids = None
+        if options.get('restaurants'):
+            try:
+                restaurant_ids = [uuid.UUID(value) for value in options['restaurants']]
+            except ValueError:
+                raise CommandError('Restaurant ids must be UUIDs')
+
+        rebuilt = recompute_restaurant_analytics(restaurant_ids)
+        self.stdout.write(
+            self.style.SUCCESS(f'Rebuilt analytics for {rebuilt} restaurants')
+        )
+
+        if restaurant_ids is None:
+            items = rebuild_item_ratings()
+            self.stdout.write(
+                self.style.SUCCESS(f'Rebuilt rating rollups for {items} menu items')
+            )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from rattingapp.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the review comment search index and has_comment flags from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of index rows inserted per query',
+        )
+
+    def handle(self, *args, **options):
+        count = rebuild_index(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed comments of {count} reviews')
+        )
@@ -0,0 +1,44 @@
+import time
+from django.core.management.base import BaseCommand
+from rattingapp.sentiment import score_pending_reviews
+
+
+class Command(BaseCommand):
+    help = 'Score reviews stored with a pending sentiment (REVIEW_SENTIMENT_ASYNC) and update analytics'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain pending reviews once and exit instead of polling',
+        )
+        parser.add_argument(
+            '--interval',
+            type=int,
+            default=5,
+            help='Seconds to sleep when nothing is pending',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Reviews scored per batch',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = 0
+            while True:
+                batch = score_pending_reviews(options['batch_size'])
+                if not batch:
+                    break
+                processed += batch
+
+            if processed:
+                self.stdout.write(f'Scored {processed} pending reviews')
+
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS('No pending reviews left'))
@@ -0,0 +1,224 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:55
+
+import django.core.validators
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('position', models.CharField(blank=True, max_length=100)),
+                ('processed', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'job_checkpoints',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewAnalytics',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('restaurant_id', models.UUIDField(unique=True)),
+                ('total_reviews', models.PositiveIntegerField(default=0)),
+                ('overall_rating_sum', models.BigIntegerField(default=0)),
+                ('food_rating_sum', models.BigIntegerField(default=0)),
+                ('food_rating_count', models.PositiveIntegerField(default=0)),
+                ('service_rating_sum', models.BigIntegerField(default=0)),
+                ('service_rating_count', models.PositiveIntegerField(default=0)),
+                ('ambiance_rating_sum', models.BigIntegerField(default=0)),
+                ('ambiance_rating_count', models.PositiveIntegerField(default=0)),
+                ('overall_rating_1_count', models.PositiveIntegerField(default=0)),
+                ('overall_rating_2_count', models.PositiveIntegerField(default=0)),
+                ('overall_rating_3_count', models.PositiveIntegerField(default=0)),
+                ('overall_rating_4_count', models.PositiveIntegerField(default=0)),
+                ('overall_rating_5_count', models.PositiveIntegerField(default=0)),
+                ('food_rating_1_count', models.PositiveIntegerField(default=0)),
+                ('food_rating_2_count', models.PositiveIntegerField(default=0)),
+                ('food_rating_3_count', models.PositiveIntegerField(default=0)),
+                ('food_rating_4_count', models.PositiveIntegerField(default=0)),
+                ('food_rating_5_count', models.PositiveIntegerField(default=0)),
+                ('service_rating_1_count', models.PositiveIntegerField(default=0)),
+                ('service_rating_2_count', models.PositiveIntegerField(default=0)),
+                ('service_rating_3_count', models.PositiveIntegerField(default=0)),
+                ('service_rating_4_count', models.PositiveIntegerField(default=0)),
+                ('service_rating_5_count', models.PositiveIntegerField(default=0)),
+                ('ambiance_rating_1_count', models.PositiveIntegerField(default=0)),
+                ('ambiance_rating_2_count', models.PositiveIntegerField(default=0)),
+                ('ambiance_rating_3_count', models.PositiveIntegerField(default=0)),
+                ('ambiance_rating_4_count', models.PositiveIntegerField(default=0)),
+                ('ambiance_rating_5_count', models.PositiveIntegerField(default=0)),
+                ('item_rating_1_count', models.PositiveIntegerField(default=0)),
+                ('item_rating_2_count', models.PositiveIntegerField(default=0)),
+                ('item_rating_3_count', models.PositiveIntegerField(default=0)),
+                ('item_rating_4_count', models.PositiveIntegerField(default=0)),
+                ('item_rating_5_count', models.PositiveIntegerField(default=0)),
+                ('positive_sentiment_count', models.PositiveIntegerField(default=0)),
+                ('neutral_sentiment_count', models.PositiveIntegerField(default=0)),
+                ('negative_sentiment_count', models.PositiveIntegerField(default=0)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Review analytics',
+                'db_table': 'review_analytics',
+            },
+        ),
+        migrations.CreateModel(
+            name='DirtyRestaurant',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('restaurant_id', models.UUIDField(unique=True)),
+                ('marked_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'review_analytics_dirty',
+                'indexes': [models.Index(fields=['marked_at'], name='review_anal_marked__bfed17_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MenuItemRating',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('menu_item_id', models.UUIDField(unique=True)),
+                ('restaurant_id', models.UUIDField()),
+                ('rating_count', models.PositiveIntegerField(default=0)),
+                ('rating_sum', models.PositiveIntegerField(default=0)),
+                ('rating_1_count', models.PositiveIntegerField(default=0)),
+                ('rating_2_count', models.PositiveIntegerField(default=0)),
+                ('rating_3_count', models.PositiveIntegerField(default=0)),
+                ('rating_4_count', models.PositiveIntegerField(default=0)),
+                ('rating_5_count', models.PositiveIntegerField(default=0)),
+                ('last_updated', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'menu_item_ratings',
+                'indexes': [models.Index(fields=['restaurant_id', 'rating_count'], name='menu_item_r_restaur_468827_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RestaurantDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('restaurant_id', models.UUIDField()),
+                ('day', models.DateField()),
+                ('total_reviews', models.PositiveIntegerField(default=0)),
+                ('overall_rating_sum', models.PositiveIntegerField(default=0)),
+                ('food_rating_sum', models.PositiveIntegerField(default=0)),
+                ('food_rating_count', models.PositiveIntegerField(default=0)),
+                ('service_rating_sum', models.PositiveIntegerField(default=0)),
+                ('service_rating_count', models.PositiveIntegerField(default=0)),
+                ('ambiance_rating_sum', models.PositiveIntegerField(default=0)),
+                ('ambiance_rating_count', models.PositiveIntegerField(default=0)),
+                ('positive_sentiment_count', models.PositiveIntegerField(default=0)),
+                ('neutral_sentiment_count', models.PositiveIntegerField(default=0)),
+                ('negative_sentiment_count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'verbose_name_plural': 'Restaurant daily stats',
+                'db_table': 'restaurant_daily_stats',
+                'indexes': [models.Index(fields=['day', 'restaurant_id'], name='restaurant__day_fb6df6_idx')],
+                'constraints': [models.UniqueConstraint(fields=('restaurant_id', 'day'), name='unique_restaurant_day')],
+            },
+        ),
+        migrations.CreateModel(
+            name='RestaurantKeyword',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('restaurant_id', models.UUIDField()),
+                ('month', models.DateField(help_text='First day of the month')),
+                ('bucket', models.CharField(choices=[('positive', 'Positive'), ('neutral', 'Neutral'), ('negative', 'Negative')], max_length=10)),
+                ('term', models.CharField(max_length=64)),
+                ('count', models.PositiveIntegerField()),
+                ('review_count', models.PositiveIntegerField(help_text='Reviews in the bucket that use the term')),
+            ],
+            options={
+                'db_table': 'restaurant_keywords',
+                'ordering': ['restaurant_id', '-month', 'bucket', '-count'],
+                'constraints': [models.UniqueConstraint(fields=('restaurant_id', 'month', 'bucket', 'term'), name='unique_restaurant_keyword')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Review',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('order_id', models.UUIDField()),
+                ('session_id', models.UUIDField()),
+                ('restaurant_id', models.UUIDField()),
+                ('overall_rating', models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('food_rating', models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('service_rating', models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('ambiance_rating', models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('comment', models.TextField(blank=True, null=True)),
+                ('has_comment', models.BooleanField(default=False)),
+                ('is_anonymous', models.BooleanField(default=False)),
+                ('sentiment_score', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True, validators=[django.core.validators.MinValueValidator(-1.0), django.core.validators.MaxValueValidator(1.0)])),
+                ('sentiment_status', models.CharField(choices=[('none', 'No comment'), ('pending', 'Pending'), ('scored', 'Scored'), ('failed', 'Failed')], default='none', max_length=10)),
+                ('moderation_status', models.CharField(choices=[('approved', 'Approved'), ('quarantined', 'Quarantined'), ('rejected', 'Rejected')], default='approved', max_length=12)),
+                ('moderation_reason', models.CharField(blank=True, choices=[('duplicate_order', 'Order already reviewed'), ('session_rate', 'Too many reviews from the session'), ('near_duplicate', 'Comment duplicates a recent review')], max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'reviews',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['restaurant_id', '-created_at'], name='reviews_restaur_9f23fa_idx'), models.Index(fields=['restaurant_id', 'overall_rating', '-created_at'], name='reviews_restaur_b8d874_idx'), models.Index(fields=['restaurant_id', 'has_comment', '-created_at'], name='reviews_restaur_c7a6e8_idx'), models.Index(fields=['order_id'], name='reviews_order_i_afe312_idx'), models.Index(fields=['created_at'], name='reviews_created_53b5d6_idx'), models.Index(fields=['overall_rating'], name='reviews_overall_fa1e40_idx'), models.Index(fields=['sentiment_status', 'updated_at'], name='reviews_sentime_df6e1f_idx'), models.Index(fields=['session_id', 'created_at'], name='reviews_session_7361f9_idx'), models.Index(fields=['moderation_status', 'created_at'], name='reviews_moderat_5dafbe_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ItemReview',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('menu_item_id', models.UUIDField()),
+                ('rating', models.IntegerField(validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(5)])),
+                ('comment', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now_add=True)),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='item_reviews', to='rattingapp.review')),
+            ],
+            options={
+                'db_table': 'item_reviews',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['menu_item_id', '-created_at'], name='item_review_menu_it_ca544d_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='CommentFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('band', models.PositiveSmallIntegerField()),
+                ('bucket', models.BigIntegerField()),
+                ('created_at', models.DateTimeField()),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fingerprints', to='rattingapp.review')),
+            ],
+            options={
+                'db_table': 'review_comment_fingerprints',
+                'indexes': [models.Index(fields=['band', 'bucket', 'created_at'], name='review_comm_band_d5ddb2_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('restaurant_id', models.UUIDField()),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('review', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='rattingapp.review')),
+            ],
+            options={
+                'db_table': 'review_terms',
+                'indexes': [models.Index(fields=['term', 'restaurant_id'], name='review_term_term_a694dd_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-18 23:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('rattingapp', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DirtyRestaurantDay',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('restaurant_id', models.UUIDField()),
+                ('day', models.DateField()),
+                ('marked_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'review_daily_stats_dirty',
+                'constraints': [models.UniqueConstraint(fields=('restaurant_id', 'day'), name='unique_dirty_restaurant_day')],
+            },
+        ),
+    ]
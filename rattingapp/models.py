@@ -1,4 +1,5 @@
 import uuid
+from decimal import Decimal
 from django.db import models
 from django.core.validators import MinValueValidator, MaxValueValidator
 
@@ -6,6 +7,22 @@ class Review(models.Model):
     """
     Model for restaurant reviews with overall and specific ratings.
     """
+    class SentimentStatus(models.TextChoices):
+        NONE = 'none', 'No comment'
+        PENDING = 'pending', 'Pending'
+        SCORED = 'scored', 'Scored'
+        FAILED = 'failed', 'Failed'
+
+    class ModerationStatus(models.TextChoices):
+        APPROVED = 'approved', 'Approved'
+        QUARANTINED = 'quarantined', 'Quarantined'
+        REJECTED = 'rejected', 'Rejected'
+
+    class ModerationReason(models.TextChoices):
+        DUPLICATE_ORDER = 'duplicate_order', 'Order already reviewed'
+        SESSION_RATE = 'session_rate', 'Too many reviews from the session'
+        NEAR_DUPLICATE = 'near_duplicate', 'Comment duplicates a recent review'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     order_id = models.UUIDField()
     session_id = models.UUIDField()
@@ -30,6 +47,8 @@ class Review(models.Model):
 
     # Review content
     comment = models.TextField(blank=True, null=True)
+    # Stored so "with/without comment" filters use an index; kept in sync by save()
+    has_comment = models.BooleanField(default=False)
     is_anonymous = models.BooleanField(default=False)
 
     # AI sentiment analysis result (-1 to 1, where -1 is negative, 0 is neutral, 1 is positive)
@@ -38,6 +57,17 @@ class Review(models.Model):
         null=True, blank=True,
         validators=[MinValueValidator(-1.0), MaxValueValidator(1.0)]
     )
+    # 'pending' while the comment waits for the sentiment worker (async scoring)
+    sentiment_status = models.CharField(
+        max_length=10, choices=SentimentStatus.choices, default=SentimentStatus.NONE
+    )
+
+    # Only approved reviews count towards analytics and rollups; reviews
+    # caught by the spam checks wait in quarantine for a moderator
+    moderation_status = models.CharField(
+        max_length=12, choices=ModerationStatus.choices, default=ModerationStatus.APPROVED
+    )
+    moderation_reason = models.CharField(max_length=20, choices=ModerationReason.choices, blank=True)
 
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)   # changed to DateTimeField
@@ -47,15 +77,35 @@ class Review(models.Model):
         db_table = 'reviews'
         ordering = ['-created_at']
         indexes = [
-            models.Index(fields=['restaurant_id']),
+            # Restaurant review pages: newest first, or by rating
+            models.Index(fields=['restaurant_id', '-created_at']),
+            models.Index(fields=['restaurant_id', 'overall_rating', '-created_at']),
+            models.Index(fields=['restaurant_id', 'has_comment', '-created_at']),
             models.Index(fields=['order_id']),
             models.Index(fields=['created_at']),
             models.Index(fields=['overall_rating']),
+            models.Index(fields=['sentiment_status', 'updated_at']),
+            models.Index(fields=['session_id', 'created_at']),
+            models.Index(fields=['moderation_status', 'created_at']),
         ]
 
     def __str__(self):
         return f"Review {self.id} - Rating: {self.overall_rating}/5"
 
+    def save(self, *args, **kwargs):
+        self.sync_has_comment()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'comment' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'has_comment'}
+        super().save(*args, **kwargs)
+
+    def sync_has_comment(self):
+        self.has_comment = bool(self.comment and self.comment.strip())
+
+    @property
+    def is_approved(self):
+        return self.moderation_status == self.ModerationStatus.APPROVED
+
     @property
     def average_specific_rating(self):
         """
@@ -66,11 +116,13 @@ class Review(models.Model):
     
     def get_sentiment_label(self):
      """Convert sentiment score to human-readable label"""
+     if self.sentiment_status == self.SentimentStatus.PENDING:
+         return "Pending"
      if self.sentiment_score is None:
          return "Not analyzed"
      elif self.sentiment_score>=0.1:
          return "Positive"
-     elif self.sentiment_score<=0.1:
+     elif self.sentiment_score<=-0.1:
          return "Negative"
      else:
          return "Neutral"
@@ -103,4 +155,295 @@ class ItemReview(models.Model):
     class Meta:
         db_table = 'item_reviews'
         ordering = ['-created_at']
-        indexes 
\ No newline at end of file
+        indexes = [
+            models.Index(fields=['menu_item_id', '-created_at']),
+        ]
+    
+    def __str__(self):
+        return f"Item review {self.menu_item_id} - Rating: {self.rating}/5"
+
+
+class ReviewTerm(models.Model):
+    """
+    Inverted index of review comments: one row per stemmed term per review,
+    with the term's frequency in the comment
+    """
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='search_terms')
+    restaurant_id = models.UUIDField()
+    term = models.CharField(max_length=64)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        db_table = 'review_terms'
+        indexes = [
+            models.Index(fields=['term', 'restaurant_id']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} in review {self.review_id}"
+
+
+class CommentFingerprint(models.Model):
+    """
+    Locality sensitive hash of a review comment: one row per band of the
+    comment's MinHash signature. Near-duplicate comments share at least one
+    (band, bucket) pair with high probability, so finding candidates is a
+    handful of index lookups.
+    """
+    review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='fingerprints')
+    band = models.PositiveSmallIntegerField()
+    bucket = models.BigIntegerField()
+    created_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'review_comment_fingerprints'
+        indexes = [
+            models.Index(fields=['band', 'bucket', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"Band {self.band} bucket {self.bucket} of review {self.review_id}"
+
+
+class ReviewAnalytics(models.Model):
+    """
+    Per-restaurant review aggregates kept as running sums and counts, so each
+    review write only applies a delta instead of re-aggregating every review.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    restaurant_id = models.UUIDField(unique=True)
+
+    total_reviews = models.PositiveIntegerField(default=0)
+
+    # Running rating sums; the specific ratings are optional so they keep their own counts
+    overall_rating_sum = models.BigIntegerField(default=0)
+    food_rating_sum = models.BigIntegerField(default=0)
+    food_rating_count = models.PositiveIntegerField(default=0)
+    service_rating_sum = models.BigIntegerField(default=0)
+    service_rating_count = models.PositiveIntegerField(default=0)
+    ambiance_rating_sum = models.BigIntegerField(default=0)
+    ambiance_rating_count = models.PositiveIntegerField(default=0)
+
+    # Rating histograms: reviews (or item reviews) per star for every dimension
+    overall_rating_1_count = models.PositiveIntegerField(default=0)
+    overall_rating_2_count = models.PositiveIntegerField(default=0)
+    overall_rating_3_count = models.PositiveIntegerField(default=0)
+    overall_rating_4_count = models.PositiveIntegerField(default=0)
+    overall_rating_5_count = models.PositiveIntegerField(default=0)
+    food_rating_1_count = models.PositiveIntegerField(default=0)
+    food_rating_2_count = models.PositiveIntegerField(default=0)
+    food_rating_3_count = models.PositiveIntegerField(default=0)
+    food_rating_4_count = models.PositiveIntegerField(default=0)
+    food_rating_5_count = models.PositiveIntegerField(default=0)
+    service_rating_1_count = models.PositiveIntegerField(default=0)
+    service_rating_2_count = models.PositiveIntegerField(default=0)
+    service_rating_3_count = models.PositiveIntegerField(default=0)
+    service_rating_4_count = models.PositiveIntegerField(default=0)
+    service_rating_5_count = models.PositiveIntegerField(default=0)
+    ambiance_rating_1_count = models.PositiveIntegerField(default=0)
+    ambiance_rating_2_count = models.PositiveIntegerField(default=0)
+    ambiance_rating_3_count = models.PositiveIntegerField(default=0)
+    ambiance_rating_4_count = models.PositiveIntegerField(default=0)
+    ambiance_rating_5_count = models.PositiveIntegerField(default=0)
+    item_rating_1_count = models.PositiveIntegerField(default=0)
+    item_rating_2_count = models.PositiveIntegerField(default=0)
+    item_rating_3_count = models.PositiveIntegerField(default=0)
+    item_rating_4_count = models.PositiveIntegerField(default=0)
+    item_rating_5_count = models.PositiveIntegerField(default=0)
+
+    # Sentiment buckets (positive >= 0.1, negative <= -0.1, neutral in between)
+    positive_sentiment_count = models.PositiveIntegerField(default=0)
+    neutral_sentiment_count = models.PositiveIntegerField(default=0)
+    negative_sentiment_count = models.PositiveIntegerField(default=0)
+
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'review_analytics'
+        verbose_name_plural = 'Review analytics'
+
+    def __str__(self):
+        return f"Analytics for restaurant {self.restaurant_id} ({self.total_reviews} reviews)"
+
+    HISTOGRAM_DIMENSIONS = ('overall', 'food', 'service', 'ambiance', 'item')
+
+    @property
+    def rating_distribution(self):
+        return {rating: getattr(self, f'overall_rating_{rating}_count') for rating in range(1, 6)}
+
+    def histogram(self, dimension):
+        """Counts for ratings 1..5 of a dimension, as a list"""
+        return [getattr(self, f'{dimension}_rating_{rating}_count') for rating in range(1, 6)]
+
+    @staticmethod
+    def _average(total, count):
+        if not count:
+            return None
+        return (Decimal(total) / Decimal(count)).quantize(Decimal('0.01'))
+
+    @property
+    def average_overall_rating(self):
+        return self._average(self.overall_rating_sum, self.total_reviews) or Decimal('0.00')
+
+    @property
+    def average_food_rating(self):
+        return self._average(self.food_rating_sum, self.food_rating_count)
+
+    @property
+    def average_service_rating(self):
+        return self._average(self.service_rating_sum, self.service_rating_count)
+
+    @property
+    def average_ambiance_rating(self):
+        return self._average(self.ambiance_rating_sum, self.ambiance_rating_count)
+
+
+class MenuItemRating(models.Model):
+    """
+    Running rating counters per menu item, updated with a delta on every
+    ItemReview write so menu pages never aggregate item reviews
+    """
+    menu_item_id = models.UUIDField(unique=True)
+    restaurant_id = models.UUIDField()
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
+    last_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'menu_item_ratings'
+        indexes = [
+            models.Index(fields=['restaurant_id', 'rating_count']),
+        ]
+
+    def __str__(self):
+        return f"Menu item {self.menu_item_id} ({self.rating_count} ratings)"
+
+    @property
+    def average_rating(self):
+        if not self.rating_count:
+            return None
+        return (Decimal(self.rating_sum) / Decimal(self.rating_count)).quantize(Decimal('0.01'))
+
+    @property
+    def rating_distribution(self):
+        return {rating: getattr(self, f'rating_{rating}_count') for rating in range(1, 6)}
+
+
+class RestaurantDailyStats(models.Model):
+    """
+    Per-restaurant review counters bucketed by the day the review was posted.
+    Rolling windows (trending) and rating trend charts sum a handful of these
+    rows instead of scanning reviews. Counter names match ReviewAnalytics.
+    """
+    restaurant_id = models.UUIDField()
+    day = models.DateField()
+    total_reviews = models.PositiveIntegerField(default=0)
+    overall_rating_sum = models.PositiveIntegerField(default=0)
+    food_rating_sum = models.PositiveIntegerField(default=0)
+    food_rating_count = models.PositiveIntegerField(default=0)
+    service_rating_sum = models.PositiveIntegerField(default=0)
+    service_rating_count = models.PositiveIntegerField(default=0)
+    ambiance_rating_sum = models.PositiveIntegerField(default=0)
+    ambiance_rating_count = models.PositiveIntegerField(default=0)
+    positive_sentiment_count = models.PositiveIntegerField(default=0)
+    neutral_sentiment_count = models.PositiveIntegerField(default=0)
+    negative_sentiment_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'restaurant_daily_stats'
+        verbose_name_plural = 'Restaurant daily stats'
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant_id', 'day'], name='unique_restaurant_day'),
+        ]
+        indexes = [
+            models.Index(fields=['day', 'restaurant_id']),
+        ]
+
+    def __str__(self):
+        return f"Restaurant {self.restaurant_id} on {self.day}: {self.total_reviews} reviews"
+
+
+class RestaurantKeyword(models.Model):
+    """
+    Most frequent comment words per restaurant, month and sentiment bucket,
+    precomputed by `manage.py extract_review_keywords`
+    """
+    class Bucket(models.TextChoices):
+        POSITIVE = 'positive', 'Positive'
+        NEUTRAL = 'neutral', 'Neutral'
+        NEGATIVE = 'negative', 'Negative'
+
+    restaurant_id = models.UUIDField()
+    month = models.DateField(help_text="First day of the month")
+    bucket = models.CharField(max_length=10, choices=Bucket.choices)
+    term = models.CharField(max_length=64)
+    count = models.PositiveIntegerField()
+    review_count = models.PositiveIntegerField(help_text="Reviews in the bucket that use the term")
+
+    class Meta:
+        db_table = 'restaurant_keywords'
+        ordering = ['restaurant_id', '-month', 'bucket', '-count']
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant_id', 'month', 'bucket', 'term'], name='unique_restaurant_keyword'),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.bucket}, {self.month:%Y-%m}) for restaurant {self.restaurant_id}"
+
+
+class DirtyRestaurant(models.Model):
+    """
+    Restaurants whose analytics must be recomputed by the analytics worker
+    (deferred mode). Re-marking a restaurant only bumps marked_at.
+    """
+    restaurant_id = models.UUIDField(unique=True)
+    marked_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'review_analytics_dirty'
+        indexes = [
+            models.Index(fields=['marked_at']),
+        ]
+
+    def __str__(self):
+        return f"Restaurant {self.restaurant_id} dirty since {self.marked_at}"
+
+
+class DirtyRestaurantDay(models.Model):
+    """
+    Daily buckets the analytics worker must rebuild (deferred mode), marked
+    alongside their restaurant so it never rescans a restaurant's history
+    """
+    restaurant_id = models.UUIDField()
+    day = models.DateField()
+    marked_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'review_daily_stats_dirty'
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant_id', 'day'], name='unique_dirty_restaurant_day'),
+        ]
+
+    def __str__(self):
+        return f"Restaurant {self.restaurant_id} on {self.day} dirty since {self.marked_at}"
+
+
+class JobCheckpoint(models.Model):
+    """
+    Resume position of a long-running batch job, keyed by job name
+    """
+    name = models.CharField(max_length=100, unique=True)
+    position = models.CharField(max_length=100, blank=True)
+    processed = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'job_checkpoints'
+
+    def __str__(self):
+        return f"{self.name} @ {self.position or 'start'}"
@@ -0,0 +1,194 @@
+"""
+Spam and duplicate screening for new reviews.
+
+Three checks run before a review is stored, each a bounded index lookup:
+the order must not have been reviewed already, the session must stay under
+its rate limit, and the comment must not be a near-duplicate of a recent
+one. Near-duplicates are found with MinHash over word shingles and
+locality sensitive hashing: the signature is cut into bands, every band is
+stored as a CommentFingerprint row, and comments sharing a band are
+compared exactly. Failing reviews are stored quarantined, which keeps them
+out of analytics until a moderator approves them.
+"""
+import hashlib
+import operator
+import random
+from functools import reduce
+from datetime import timedelta
+from django.conf import settings
+from django.db.models import Count, Q
+from django.utils import timezone
+from .analytics import record_item_rating
+from .item_ratings import rebuild_item_ratings
+from .models import Review, ItemReview, CommentFingerprint
+from .search import words
+
+
+SHINGLE_SIZE = 3
+# Comments with fewer shingles are too short to call duplicates
+MIN_SHINGLES = 4
+# 16 bands of 4 rows: comments with a Jaccard similarity of 0.5 collide in
+# some band about 64% of the time, at 0.8 over 99.9%
+BANDS = 16
+ROWS_PER_BAND = 4
+SIGNATURE_SIZE = BANDS * ROWS_PER_BAND
+# Candidates compared exactly per comment, most shared bands first
+MAX_CANDIDATES = 20
+
+MERSENNE_PRIME = (1 << 61) - 1
+_random = random.Random(20240601)
+HASH_PARAMETERS = [
+    (_random.randrange(1, MERSENNE_PRIME), _random.randrange(0, MERSENNE_PRIME))
+    for _ in range(SIGNATURE_SIZE)
+]
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big', signed=True)
+
+
+def shingles(text):
+    """Overlapping word n-grams of a comment, case and punctuation ignored"""
+    tokens = words(text)
+    return {' '.join(tokens[i:i + SHINGLE_SIZE]) for i in range(len(tokens) - SHINGLE_SIZE + 1)}
+
+
+def minhash(shingle_set):
+    """MinHash signature: the smallest value of each hash function over the shingles"""
+    hashed = [_hash64(shingle) & MERSENNE_PRIME for shingle in shingle_set]
+    return [
+        min((a * value + b) % MERSENNE_PRIME for value in hashed)
+        for a, b in HASH_PARAMETERS
+    ]
+
+
+def band_buckets(signature):
+    """One 64-bit bucket per band of the signature"""
+    return [
+        _hash64(','.join(map(str, signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND])))
+        for band in range(BANDS)
+    ]
+
+
+def lsh_buckets(shingle_set):
+    """LSH buckets of a comment's shingles, or none when it is too short to compare"""
+    return band_buckets(minhash(shingle_set)) if len(shingle_set) >= MIN_SHINGLES else []
+
+
+def jaccard(first, second):
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+class Screening:
+    """Outcome of screening one review"""
+
+    def __init__(self, reason='', buckets=None):
+        self.reason = reason
+        self.buckets = buckets or []
+
+    @property
+    def status(self):
+        return Review.ModerationStatus.QUARANTINED if self.reason else Review.ModerationStatus.APPROVED
+
+    def as_fields(self):
+        return {'moderation_status': self.status, 'moderation_reason': self.reason}
+
+
+def order_reviewed(order_id):
+    return Review.objects.filter(order_id=order_id).exclude(
+        moderation_status=Review.ModerationStatus.REJECTED
+    ).exists()
+
+
+def session_over_limit(session_id, now=None):
+    since = (now or timezone.now()) - timedelta(seconds=settings.REVIEW_SPAM_SESSION_WINDOW_SECONDS)
+    recent = Review.objects.filter(session_id=session_id, created_at__gte=since)
+    return recent[:settings.REVIEW_SPAM_SESSION_LIMIT].count() >= settings.REVIEW_SPAM_SESSION_LIMIT
+
+
+def near_duplicate_of(shingle_set, buckets, now=None):
+    """
+    Id of a recent review whose comment is a near-duplicate, or None.
+    Candidates share at least one LSH bucket; they are confirmed with the
+    exact shingle similarity.
+    """
+    since = (now or timezone.now()) - timedelta(days=settings.REVIEW_DUPLICATE_WINDOW_DAYS)
+    same_band = reduce(operator.or_, (Q(band=band, bucket=bucket) for band, bucket in enumerate(buckets)))
+    candidates = CommentFingerprint.objects.filter(same_band, created_at__gte=since).values(
+        'review_id'
+    ).annotate(shared=Count('id')).order_by('-shared')[:MAX_CANDIDATES]
+    comments = Review.objects.filter(
+        pk__in=[row['review_id'] for row in candidates]
+    ).exclude(moderation_status=Review.ModerationStatus.REJECTED).values_list('pk', 'comment')
+
+    for pk, comment in comments:
+        if jaccard(shingle_set, shingles(comment)) >= settings.REVIEW_DUPLICATE_SIMILARITY:
+            return pk
+    return None
+
+
+def screen_review(data):
+    """
+    Run the spam checks on validated review data (before it is saved); the
+    result carries the comment's LSH buckets for record_fingerprints
+    """
+    now = timezone.now()
+    shingle_set = shingles(data.get('comment'))
+    buckets = lsh_buckets(shingle_set)
+
+    if order_reviewed(data['order_id']):
+        return Screening(Review.ModerationReason.DUPLICATE_ORDER, buckets)
+    if session_over_limit(data['session_id'], now):
+        return Screening(Review.ModerationReason.SESSION_RATE, buckets)
+    if buckets and near_duplicate_of(shingle_set, buckets, now) is not None:
+        return Screening(Review.ModerationReason.NEAR_DUPLICATE, buckets)
+    return Screening(buckets=buckets)
+
+
+def fingerprints(review, buckets):
+    """Unsaved CommentFingerprint rows of a saved review, for bulk inserts"""
+    return [
+        CommentFingerprint(review=review, band=band, bucket=bucket, created_at=review.created_at)
+        for band, bucket in enumerate(buckets)
+    ]
+
+
+def record_fingerprints(review, buckets):
+    """Store a saved review's comment buckets so later comments are checked against it"""
+    CommentFingerprint.objects.bulk_create(fingerprints(review, buckets))
+
+
+def set_moderation_status(reviews, moderation_status):
+    """
+    Approve or reject reviews. Each review is saved individually so the
+    review signals add it to (or take it out of) analytics, daily buckets
+    and the comment index; its item ratings move into (or out of) the item
+    histogram and the affected menu item rollups are rebuilt. Returns the
+    number of reviews changed.
+    """
+    changed = 0
+    toggled = {}
+    for review in reviews.exclude(moderation_status=moderation_status):
+        was_approved = review.is_approved
+        review.moderation_status = moderation_status
+        if moderation_status == Review.ModerationStatus.APPROVED:
+            review.moderation_reason = ''
+        review.save(update_fields=['moderation_status', 'moderation_reason', 'updated_at'])
+        changed += 1
+        if review.is_approved != was_approved:
+            toggled[review.pk] = (review.restaurant_id, review.is_approved)
+
+    menu_item_ids = set()
+    item_reviews = ItemReview.objects.filter(review_id__in=list(toggled)).values_list('review_id', 'menu_item_id', 'rating')
+    for review_id, menu_item_id, rating in item_reviews:
+        restaurant_id, approved = toggled[review_id]
+        if approved:
+            record_item_rating(restaurant_id, added=rating)
+        else:
+            record_item_rating(restaurant_id, removed=rating)
+        menu_item_ids.add(menu_item_id)
+    if menu_item_ids:
+        rebuild_item_ratings(menu_item_ids)
+    return changed
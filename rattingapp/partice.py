@@ -3,7 +3,6 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 from django.db.models import Q, Avg, Count, Case, When, IntegerField
-from django.db.models.functions import Round
 from django_filters.rest_framework import DjangoFilterBackend
 from django.utils import timezone
 from datetime import timedelta
@@ -27,55 +26,9 @@ class ReviewCreateView(generics.CreateAPIView):
     
     def perform_create(self, serializer):
         """
-        Save review and update analytics
+        Save review; analytics are updated by the review signals
         """
-        review = serializer.save()
-        self.update_restaurant_analytics(review.restaurant_id)
-    
-    def update_restaurant_analytics(self, restaurant_id):
-        """
-        Update or create analytics for the restaurant
-        """
-        try:
-            reviews = Review.objects.filter(restaurant_id=restaurant_id)
-            
-            # Calculate aggregates
-            analytics_data = reviews.aggregate(
-                total_reviews=Count('id'),
-                avg_overall=Avg('overall_rating'),
-                avg_food=Avg('food_rating'),
-                avg_service=Avg('service_rating'),
-                avg_ambiance=Avg('ambiance_rating'),
-                positive_count=Count(Case(
-                    When(sentiment_score__gte=0.1, then=1),
-                    output_field=IntegerField()
-                )),
-                neutral_count=Count(Case(
-                    When(sentiment_score__lt=0.1, sentiment_score__gt=-0.1, then=1),
-                    output_field=IntegerField()
-                )),
-                negative_count=Count(Case(
-                    When(sentiment_score__lte=-0.1, then=1),
-                    output_field=IntegerField()
-                ))
-            )
-            
-            # Update or create analytics
-            analytics, created = ReviewAnalytics.objects.update_or_create(
-                restaurant_id=restaurant_id,
-                defaults={
-                    'total_reviews': analytics_data['total_reviews'],
-                    'average_overall_rating': Round(analytics_data['avg_overall'] or 0, 2),
-                    'average_food_rating': Round(analytics_data['avg_food'] or 0, 2) if analytics_data['avg_food'] else None,
-                    'average_service_rating': Round(analytics_data['avg_service'] or 0, 2) if analytics_data['avg_service'] else None,
-                    'average_ambiance_rating': Round(analytics_data['avg_ambiance'] or 0, 2) if analytics_data['avg_ambiance'] else None,
-                    'positive_sentiment_count': analytics_data['positive_count'],
-                    'neutral_sentiment_count': analytics_data['neutral_count'],
-                    'negative_sentiment_count': analytics_data['negative_count'],
-                }
-            )
-        except Exception as e:
-            print(f"Error updating analytics: {e}")
+        serializer.save()
 
 
 class ReviewListView(generics.ListAPIView):
@@ -148,64 +101,15 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def perform_update(self, serializer):
         """
-        Update review and refresh analytics
+        Update review; analytics are adjusted by the review signals
         """
-        review = serializer.save()
-        self.update_restaurant_analytics(review.restaurant_id)
+        serializer.save()
     
     def perform_destroy(self, instance):
         """
-        Delete review and refresh analytics
+        Delete review; analytics are adjusted by the review signals
         """
-        restaurant_id = instance.restaurant_id
         instance.delete()
-        self.update_restaurant_analytics(restaurant_id)
-    
-    def update_restaurant_analytics(self, restaurant_id):
-        """Same as in ReviewCreateView"""
-        try:
-            reviews = Review.objects.filter(restaurant_id=restaurant_id)
-            
-            if not reviews.exists():
-                # Delete analytics if no reviews left
-                ReviewAnalytics.objects.filter(restaurant_id=restaurant_id).delete()
-                return
-            
-            analytics_data = reviews.aggregate(
-                total_reviews=Count('id'),
-                avg_overall=Avg('overall_rating'),
-                avg_food=Avg('food_rating'),
-                avg_service=Avg('service_rating'),
-                avg_ambiance=Avg('ambiance_rating'),
-                positive_count=Count(Case(
-                    When(sentiment_score__gte=0.1, then=1),
-                    output_field=IntegerField()
-                )),
-                neutral_count=Count(Case(
-                    When(sentiment_score__lt=0.1, sentiment_score__gt=-0.1, then=1),
-                    output_field=IntegerField()
-                )),
-                negative_count=Count(Case(
-                    When(sentiment_score__lte=-0.1, then=1),
-                    output_field=IntegerField()
-                ))
-            )
-            
-            ReviewAnalytics.objects.update_or_create(
-                restaurant_id=restaurant_id,
-                defaults={
-                    'total_reviews': analytics_data['total_reviews'],
-                    'average_overall_rating': Round(analytics_data['avg_overall'] or 0, 2),
-                    'average_food_rating': Round(analytics_data['avg_food'] or 0, 2) if analytics_data['avg_food'] else None,
-                    'average_service_rating': Round(analytics_data['avg_service'] or 0, 2) if analytics_data['avg_service'] else None,
-                    'average_ambiance_rating': Round(analytics_data['avg_ambiance'] or 0, 2) if analytics_data['avg_ambiance'] else None,
-                    'positive_sentiment_count': analytics_data['positive_count'],
-                    'neutral_sentiment_count': analytics_data['neutral_count'],
-                    'negative_sentiment_count': analytics_data['negative_count'],
-                }
-            )
-        except Exception as e:
-            print(f"Error updating analytics: {e}")
 
 
 class ItemReviewListCreateView(generics.ListCreateAPIView):
@@ -0,0 +1,156 @@
+import math
+import re
+from collections import Counter
+from django.db import transaction
+from django.db.models import Count, Sum, Case, When, F, FloatField, Value
+from .lexicon import STOP_WORDS
+from .models import Review, ReviewAnalytics, ReviewTerm
+
+
+TERM_MAX_LENGTH = 64
+WORD_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+MIN_STEM_LENGTH = 3
+
+# Suffixes stripped by the stemmer, longest first, with their replacement
+SUFFIXES = [
+    ('ational', 'ate'), ('fulness', 'ful'), ('iveness', 'ive'), ('ousness', 'ous'),
+    ('ization', 'ize'), ('ations', 'ate'), ('ation', 'ate'), ('ments', ''), ('ment', ''),
+    ('iness', 'i'), ('ness', ''), ('ingly', ''), ('edly', ''), ('ing', ''), ('ies', 'i'),
+    ('ied', 'i'), ('ers', ''), ('er', ''), ('ed', ''), ('ly', ''), ('s', ''),
+]
+DOUBLED_ENDINGS = {'bb', 'dd', 'ff', 'gg', 'mm', 'nn', 'pp', 'rr', 'tt'}
+
+
+def stem(word):
+    """
+    Light suffix-stripping stemmer in the spirit of Porter's: 'waited',
+    'waiting' and 'waits' all index as 'wait', 'places' and 'place' as
+    'plac'. Stems shorter than MIN_STEM_LENGTH are left alone.
+    """
+    for suffix, replacement in SUFFIXES:
+        if word.endswith(suffix) and not (suffix == 's' and word.endswith('ss')):
+            stemmed = word[:-len(suffix)] + replacement
+            if len(stemmed) < MIN_STEM_LENGTH:
+                continue
+            if replacement == '' and stemmed[-2:] in DOUBLED_ENDINGS:
+                stemmed = stemmed[:-1]
+            word = stemmed
+            break
+
+    # Final e and y: 'rude'/'rudeness', 'tasty'/'tastier'
+    if len(word) > MIN_STEM_LENGTH and word[-1] == 'e':
+        word = word[:-1]
+    elif len(word) > MIN_STEM_LENGTH and word[-1] == 'y':
+        word = word[:-1] + 'i'
+    return word
+
+
+def words(text):
+    """Lowercase words of free text, apostrophes dropped ("didn't" -> "didnt")"""
+    return [word.replace("'", '') for word in WORD_RE.findall((text or '').lower())]
+
+
+def terms(text):
+    """Stemmed, stop-word free term frequencies of a comment"""
+    return Counter(stem(word)[:TERM_MAX_LENGTH] for word in words(text) if word not in STOP_WORDS)
+
+
+def review_terms(review):
+    if not review.is_approved:
+        return []
+    return [
+        ReviewTerm(review=review, restaurant_id=review.restaurant_id, term=term, weight=min(count, 32767))
+        for term, count in terms(review.comment).items()
+    ]
+
+
+def index_review(review):
+    with transaction.atomic():
+        ReviewTerm.objects.filter(review=review).delete()
+        ReviewTerm.objects.bulk_create(review_terms(review))
+
+
+def index_new_reviews(reviews, batch_size=1000):
+    """Index freshly bulk-created reviews (nothing to delete first)"""
+    ReviewTerm.objects.bulk_create(
+        [term for review in reviews for term in review_terms(review)], batch_size=batch_size
+    )
+
+
+def query_terms(query):
+    return set(terms(query))
+
+
+def _scoped(queryset, restaurant_id):
+    return queryset.filter(restaurant_id=restaurant_id) if restaurant_id else queryset
+
+
+def matching_review_ids(query, restaurant_id=None):
+    """
+    Subquery of reviews whose comments contain every term of the query
+    (None when the query has no searchable terms)
+    """
+    wanted = query_terms(query)
+    if not wanted:
+        return None
+    return _scoped(ReviewTerm.objects.filter(term__in=wanted), restaurant_id).values('review_id').annotate(
+        matched=Count('term', distinct=True)
+    ).filter(matched=len(wanted)).values('review_id')
+
+
+def _review_count(restaurant_id):
+    totals = _scoped(ReviewAnalytics.objects.all(), restaurant_id).aggregate(total=Sum('total_reviews'))
+    return totals['total'] or 0
+
+
+def ranked_review_ids(query, restaurant_id=None, limit=None):
+    """
+    (review_id, score) pairs for reviews containing every query term, best
+    first. Scores are tf-idf: rare terms count for more than common ones.
+    """
+    wanted = query_terms(query)
+    if not wanted:
+        return []
+
+    term_rows = _scoped(ReviewTerm.objects.filter(term__in=wanted), restaurant_id)
+    document_frequency = dict(term_rows.values('term').annotate(reviews=Count('id')).order_by().values_list('term', 'reviews'))
+    if set(document_frequency) != wanted:
+        return []
+
+    total = max(_review_count(restaurant_id), max(document_frequency.values()))
+    idf = {term: math.log(1 + total / reviews) for term, reviews in document_frequency.items()}
+
+    ranked = term_rows.values('review_id').annotate(
+        matched=Count('term', distinct=True),
+        score=Sum(Case(
+            *[When(term=term, then=F('weight') * Value(weight)) for term, weight in idf.items()],
+            output_field=FloatField()
+        )),
+    ).filter(matched=len(wanted)).order_by('-score', 'review_id').values_list('review_id', 'score')
+    return list(ranked[:limit] if limit else ranked)
+
+
+def rebuild_index(batch_size=1000):
+    """
+    Rebuild the comment index from scratch and resync the has_comment flags;
+    returns the number of reviews indexed
+    """
+    Review.objects.filter(has_comment=False).exclude(comment__isnull=True).exclude(comment__regex=r'^\s*$').update(has_comment=True)
+    Review.objects.filter(has_comment=True).filter(comment__regex=r'^\s*$').update(has_comment=False)
+    Review.objects.filter(has_comment=True, comment__isnull=True).update(has_comment=False)
+    ReviewTerm.objects.all().delete()
+
+    count = 0
+    batch = []
+    reviews = Review.objects.filter(
+        has_comment=True, moderation_status=Review.ModerationStatus.APPROVED
+    ).only('id', 'restaurant_id', 'comment', 'moderation_status')
+    for review in reviews.iterator(chunk_size=batch_size):
+        batch.extend(review_terms(review))
+        count += 1
+        if len(batch) >= batch_size:
+            ReviewTerm.objects.bulk_create(batch)
+            batch = []
+    if batch:
+        ReviewTerm.objects.bulk_create(batch)
+    return count
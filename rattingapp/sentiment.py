@@ -0,0 +1,399 @@
+import hashlib
+import re
+from collections import OrderedDict, defaultdict, deque
+from decimal import Decimal
+from threading import Lock
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from .models import Review, JobCheckpoint
+from .trending import apply_daily_delta
+from .analytics import (
+    apply_analytics_delta, mark_restaurants_dirty, analytics_deferred,
+    sentiment_bucket, invalidate_after_commit
+)
+
+
+BACKFILL_JOB = 'sentiment_backfill'
+
+TOKEN_RE = re.compile(r"[a-z]+(?:'[a-z]+)?")
+
+
+def normalize_comment(text):
+    """
+    Canonical form used as the cache key: lowercase words separated by single spaces
+    """
+    return ' '.join(TOKEN_RE.findall(text.lower()))
+
+
+class SentimentScorer:
+    """
+    Interface for sentiment scorers. `score` returns a polarity between -1
+    and 1, or None when the text cannot be scored.
+    """
+
+    def score(self, text):
+        raise NotImplementedError
+
+
+class LexiconScorer(SentimentScorer):
+    """
+    Fast dictionary scorer. The vocabulary is loaded once per process into
+    plain dicts and frozensets; scoring is a single pass over the words with
+    intensifiers and negations applied to the next sentiment word.
+    """
+
+    def __init__(self):
+        from .lexicon import POLARITY, INTENSIFIERS, NEGATIONS
+        self.polarity = dict(POLARITY)
+        self.intensifiers = dict(INTENSIFIERS)
+        self.negations = frozenset(NEGATIONS)
+
+    def score(self, text):
+        total = 0.0
+        hits = 0
+        multiplier = 1.0
+        negated = False
+
+        for word in normalize_comment(text).replace("'", '').split():
+            if word in self.negations:
+                negated = True
+                continue
+            intensity = self.intensifiers.get(word)
+            if intensity is not None:
+                multiplier *= intensity
+                continue
+            polarity = self.polarity.get(word)
+            if polarity is None:
+                continue
+
+            polarity = min(1.0, max(-1.0, polarity * multiplier))
+            if negated:
+                # Same damping TextBlob uses: "not good" is mildly negative, not the opposite of "good"
+                polarity *= -0.5
+            total += polarity
+            hits += 1
+            multiplier = 1.0
+            negated = False
+
+        if not hits:
+            return 0.0
+        return max(-1.0, min(1.0, total / hits))
+
+
+class TextBlobScorer(SentimentScorer):
+    """
+    TextBlob pattern analyzer; slower, kept for comparison and as an option
+    """
+
+    def __init__(self):
+        from textblob import TextBlob
+        self.blob_class = TextBlob
+
+    def score(self, text):
+        return self.blob_class(text).sentiment.polarity
+
+
+class LRUCache:
+    """
+    Small thread-safe LRU keyed by comment digest
+    """
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+
+_scorer = None
+_cache = None
+_MISSING = object()
+
+
+def get_scorer():
+    """
+    The configured scorer (REVIEW_SENTIMENT_SCORER), built once per process
+    """
+    global _scorer
+    if _scorer is None:
+        _scorer = import_string(settings.REVIEW_SENTIMENT_SCORER)()
+    return _scorer
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = LRUCache(settings.REVIEW_SENTIMENT_CACHE_SIZE)
+    return _cache
+
+
+def analyze_sentiment(text, scorer=None):
+    """
+    Score a comment with the configured scorer
+    Returns sentiment score between -1 and 1, cached by normalized comment
+    """
+    if not text or not text.strip():
+        return None
+
+    normalized = normalize_comment(text)
+    cache = get_cache() if scorer is None else None
+    if cache is not None:
+        key = hashlib.blake2b(normalized.encode(), digest_size=16).digest()
+        cached = cache.get(key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+
+    try:
+        polarity = (scorer or get_scorer()).score(text)
+        # Ensure the score is within bounds
+        polarity = max(-1.0, min(1.0, polarity)) if polarity is not None else None
+    except Exception:
+        return None
+
+    if cache is not None:
+        cache.set(key, polarity)
+    return polarity
+
+
+def initial_sentiment(comment):
+    """
+    Sentiment fields for a newly written comment: scored inline, or left
+    pending for the sentiment worker when REVIEW_SENTIMENT_ASYNC is on
+    """
+    if not comment or not comment.strip():
+        return {'sentiment_score': None, 'sentiment_status': Review.SentimentStatus.NONE}
+    if settings.REVIEW_SENTIMENT_ASYNC:
+        return {'sentiment_score': None, 'sentiment_status': Review.SentimentStatus.PENDING}
+
+    score = analyze_sentiment(comment)
+    if score is None:
+        return {'sentiment_score': None, 'sentiment_status': Review.SentimentStatus.FAILED}
+    return {'sentiment_score': to_score_field(score), 'sentiment_status': Review.SentimentStatus.SCORED}
+
+
+def score_batch(texts):
+    """
+    Score a list of comments; module-level so it can run in a worker process
+    """
+    return [analyze_sentiment(text) for text in texts]
+
+
+def to_score_field(score):
+    """
+    Fit a polarity into Review.sentiment_score (two decimal places)
+    """
+    if score is None:
+        return None
+    return Decimal(str(round(score, 2)))
+
+
+def _unscored_chunks(after_pk, chunk_size, limit):
+    """
+    Stream unscored reviews in primary key order so a stored pk is a resume
+    point. Reviews that failed to score, or wait for the sentiment worker,
+    are left out.
+    """
+    reviews = Review.objects.filter(
+        sentiment_score__isnull=True,
+        comment__isnull=False
+    ).exclude(comment='').exclude(
+        sentiment_status__in=[Review.SentimentStatus.FAILED, Review.SentimentStatus.PENDING]
+    ).order_by('pk')
+    if after_pk:
+        reviews = reviews.filter(pk__gt=after_pk)
+    if limit:
+        reviews = reviews[:limit]
+
+    chunk = []
+    rows = reviews.values_list('pk', 'restaurant_id', 'comment', 'created_at', 'moderation_status', 'updated_at')
+    for row in rows.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _apply_sentiment_deltas(restaurant_ids, bucket_deltas, day_deltas):
+    """
+    Add newly scored sentiment buckets to analytics (one delta per
+    restaurant) and the daily buckets (one delta per restaurant and day), or
+    only queue the restaurants in deferred mode
+    """
+    invalidate_after_commit(restaurant_ids)
+    if analytics_deferred():
+        mark_restaurants_dirty(bucket_deltas.keys(), day_deltas.keys())
+        return
+    for restaurant_id, delta in bucket_deltas.items():
+        apply_analytics_delta(restaurant_id, delta)
+    for (restaurant_id, day), delta in day_deltas.items():
+        apply_daily_delta(restaurant_id, day, delta)
+
+
+def _save_chunk(chunk, scores, checkpoint):
+    """
+    Write one chunk of scores, add the new sentiment buckets to the affected
+    restaurants' analytics and advance the checkpoint. Comments that cannot
+    be scored are marked failed so later runs skip them.
+
+    Each review is written with a conditional UPDATE that only succeeds if
+    it is still unscored and unchanged since the chunk was read, so a review
+    edited, rescored or deleted in the meantime is neither overwritten nor
+    counted again.
+    """
+    bucket_deltas = defaultdict(lambda: defaultdict(int))
+    day_deltas = defaultdict(lambda: defaultdict(int))
+    scored = 0
+    for (pk, restaurant_id, comment, created_at, moderation_status, updated_at), score in zip(chunk, scores):
+        score = to_score_field(score)
+        status = Review.SentimentStatus.SCORED if score is not None else Review.SentimentStatus.FAILED
+        # update() skips auto_now; incremental keyword runs find rescored reviews by updated_at
+        written = Review.objects.filter(
+            pk=pk,
+            sentiment_score__isnull=True,
+            updated_at=updated_at
+        ).update(sentiment_score=score, sentiment_status=status, updated_at=timezone.now())
+        if not written or score is None:
+            continue
+        scored += 1
+
+        bucket = sentiment_bucket(score)
+        if bucket and moderation_status == Review.ModerationStatus.APPROVED:
+            bucket_deltas[restaurant_id][f'{bucket}_sentiment_count'] += 1
+            day_deltas[restaurant_id, timezone.localdate(created_at)][f'{bucket}_sentiment_count'] += 1
+
+    # update() skips the review signals, so the counters are moved here;
+    # unscored reviews contributed no sentiment bucket before
+    _apply_sentiment_deltas({row[1] for row in chunk}, bucket_deltas, day_deltas)
+
+    if checkpoint is not None:
+        checkpoint.position = str(chunk[-1][0])
+        checkpoint.processed += scored
+        checkpoint.save(update_fields=['position', 'processed', 'updated_at'])
+    return scored
+
+
+def backfill_sentiment(workers=1, chunk_size=1000, limit=None, resume=True, progress=None):
+    """
+    Score every review that has a comment but no sentiment score.
+
+    Chunks are scored across a process pool (at most two chunks in flight per
+    worker) and written back in order, so after each chunk the checkpoint
+    marks everything before it as done. Returns the number of reviews scored.
+    """
+    checkpoint = None
+    after_pk = None
+    if resume:
+        checkpoint, _ = JobCheckpoint.objects.get_or_create(name=BACKFILL_JOB)
+        after_pk = checkpoint.position or None
+
+    updated = 0
+    seen = 0
+
+    def save(chunk, scores):
+        nonlocal updated, seen
+        updated += _save_chunk(chunk, scores, checkpoint)
+        seen += len(chunk)
+        if progress:
+            progress(updated)
+
+    chunks = _unscored_chunks(after_pk, chunk_size, limit)
+    if workers <= 1:
+        for chunk in chunks:
+            save(chunk, score_batch([row[2] for row in chunk]))
+    else:
+        # Imported here: multiprocessing is only needed by the backfill, not at worker boot
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Forked workers must not share the parent's database connections
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            in_flight = deque()
+            for chunk in chunks:
+                in_flight.append((chunk, executor.submit(score_batch, [row[2] for row in chunk])))
+                if len(in_flight) >= workers * 2:
+                    save(*_result(in_flight.popleft()))
+            while in_flight:
+                save(*_result(in_flight.popleft()))
+
+    if checkpoint is not None and (limit is None or seen < limit):
+        # The run reached the end; new reviews can sort anywhere by pk, so start over next time
+        checkpoint.position = ''
+        checkpoint.save(update_fields=['position', 'updated_at'])
+    return updated
+
+
+def _result(in_flight_item):
+    chunk, future = in_flight_item
+    return chunk, future.result()
+
+
+def reset_backfill_checkpoint():
+    JobCheckpoint.objects.filter(name=BACKFILL_JOB).delete()
+
+
+def score_pending_reviews(batch_size=500):
+    """
+    Score one batch of reviews left pending by async sentiment scoring.
+
+    Each review is written with a conditional UPDATE that only succeeds if it
+    is still pending and unchanged since it was read, so a comment edited
+    mid-flight is not overwritten with a stale score; updated_at is bumped
+    so incremental keyword runs pick the review up. The new sentiment
+    buckets of approved reviews are then added to analytics with one delta
+    per restaurant and to the daily buckets with one delta per restaurant
+    and day.
+    Returns the number of reviews processed.
+    """
+    batch = list(
+        Review.objects.filter(sentiment_status=Review.SentimentStatus.PENDING)
+        .order_by('updated_at')
+        .values_list('pk', 'restaurant_id', 'comment', 'updated_at', 'created_at', 'moderation_status')[:batch_size]
+    )
+    if not batch:
+        return 0
+
+    bucket_deltas = defaultdict(lambda: defaultdict(int))
+    day_deltas = defaultdict(lambda: defaultdict(int))
+    for pk, restaurant_id, comment, updated_at, created_at, moderation_status in batch:
+        score = to_score_field(analyze_sentiment(comment))
+        status = Review.SentimentStatus.SCORED if score is not None else Review.SentimentStatus.FAILED
+        written = Review.objects.filter(
+            pk=pk,
+            sentiment_status=Review.SentimentStatus.PENDING,
+            updated_at=updated_at
+        ).update(sentiment_score=score, sentiment_status=status, updated_at=timezone.now())
+
+        bucket = sentiment_bucket(score)
+        # Quarantined reviews are scored too but stay out of the counters
+        if written and bucket and moderation_status == Review.ModerationStatus.APPROVED:
+            bucket_deltas[restaurant_id][f'{bucket}_sentiment_count'] += 1
+            day_deltas[restaurant_id, timezone.localdate(created_at)][f'{bucket}_sentiment_count'] += 1
+
+    _apply_sentiment_deltas({row[1] for row in batch}, bucket_deltas, day_deltas)
+    return len(batch)
@@ -1,8 +1,9 @@
 from rest_framework import serializers
-from .models import Review, ItemReview, ReviewAnalytics
-import re
-from textblob import TextBlob  # For basic sentiment analysis
+from .models import Review, ItemReview, ReviewAnalytics, MenuItemRating
 from decimal import Decimal
+from .histograms import summarize
+from .moderation import screen_review, record_fingerprints
+from .sentiment import analyze_sentiment, initial_sentiment
 
 
 class ItemReviewSerializer(serializers.ModelSerializer):
@@ -65,39 +66,27 @@ class ReviewCreateSerializer(serializers.ModelSerializer):
     
     def analyze_sentiment(self, text):
         """
-        Simple AI sentiment analysis using TextBlob
+        Sentiment analysis with the configured scorer (cached per comment)
         Returns sentiment score between -1 and 1
         """
-        if not text or not text.strip():
-            return None
-        
-        try:
-            # Clean the text
-            cleaned_text = re.sub(r'[^\w\s]', '', text.lower())
-            
-            # Use TextBlob for sentiment analysis
-            blob = TextBlob(text)
-            polarity = blob.sentiment.polarity
-            
-            # Ensure the score is within bounds
-            return max(-1.0, min(1.0, polarity))
-        except Exception:
-            return None
+        return analyze_sentiment(text)
     
     def create(self, validated_data):
         """
-        Create review with nested item reviews and sentiment analysis
+        Create review with nested item reviews and sentiment analysis.
+        Reviews failing the spam checks are stored quarantined.
         """
         item_reviews_data = validated_data.pop('item_reviews', [])
         
-        # Analyze sentiment if comment is provided
-        comment = validated_data.get('comment')
-        if comment:
-            sentiment_score = self.analyze_sentiment(comment)
-            validated_data['sentiment_score'] = sentiment_score
+        # Analyze sentiment if comment is provided (or queue it when scoring is async)
+        validated_data.update(initial_sentiment(validated_data.get('comment')))
+
+        screening = screen_review(validated_data)
+        validated_data.update(screening.as_fields())
         
         # Create the main review
         review = Review.objects.create(**validated_data)
+        record_fingerprints(review, screening.buckets)
         
         # Create item reviews
         for item_review_data in item_reviews_data:
@@ -121,11 +110,16 @@ class ReviewListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'order_id', 'session_id', 'restaurant_id',
             'overall_rating', 'food_rating', 'service_rating', 'ambiance_rating',
-            'comment', 'is_anonymous', 'sentiment_score', 'sentiment_label',
-            'average_specific_rating', 'item_reviews',
+            'comment', 'has_comment', 'is_anonymous', 'sentiment_score', 'sentiment_status',
+            'sentiment_label', 'moderation_status', 'average_specific_rating', 'item_reviews',
             'created_at', 'updated_at'
         ]
 
+    def __init__(self, *args, include_item_reviews=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        if not include_item_reviews:
+            self.fields.pop('item_reviews')
+
 
 class ReviewUpdateSerializer(serializers.ModelSerializer):
     """
@@ -148,12 +142,9 @@ class ReviewUpdateSerializer(serializers.ModelSerializer):
         """
         Update review and re-analyze sentiment if comment changed
         """
-        comment = validated_data.get('comment')
-        
         # Re-analyze sentiment if comment is being updated
-        if comment and comment != instance.comment:
-            sentiment_score = self.analyze_sentiment(comment)
-            validated_data['sentiment_score'] = sentiment_score
+        if 'comment' in validated_data and validated_data['comment'] != instance.comment:
+            validated_data.update(initial_sentiment(validated_data['comment']))
         
         return super().update(instance, validated_data)
 
@@ -163,6 +154,7 @@ class ReviewAnalyticsSerializer(serializers.ModelSerializer):
     Serializer for review analytics
     """
     sentiment_distribution = serializers.SerializerMethodField()
+    rating_histograms = serializers.SerializerMethodField()
     
     class Meta:
         model = ReviewAnalytics
@@ -170,8 +162,18 @@ class ReviewAnalyticsSerializer(serializers.ModelSerializer):
             'restaurant_id', 'total_reviews',
             'average_overall_rating', 'average_food_rating',
             'average_service_rating', 'average_ambiance_rating',
-            'sentiment_distribution', 'last_updated'
+            'sentiment_distribution', 'rating_histograms', 'last_updated'
         ]
+
+    def get_rating_histograms(self, obj):
+        """
+        Star counts with median and percentiles for every rating dimension,
+        derived from the stored histogram counters
+        """
+        return {
+            dimension: summarize(obj.histogram(dimension))
+            for dimension in ReviewAnalytics.HISTOGRAM_DIMENSIONS
+        }
     
     def get_sentiment_distribution(self, obj):
         """
@@ -192,6 +194,21 @@ class ReviewAnalyticsSerializer(serializers.ModelSerializer):
         }
 
 
+class MenuItemRatingSerializer(serializers.ModelSerializer):
+    """
+    Serializer for menu item rating rollups
+    """
+    average_rating = serializers.DecimalField(max_digits=3, decimal_places=2, read_only=True)
+    rating_distribution = serializers.DictField(read_only=True)
+
+    class Meta:
+        model = MenuItemRating
+        fields = [
+            'menu_item_id', 'restaurant_id', 'rating_count', 'average_rating',
+            'rating_distribution', 'last_updated'
+        ]
+
+
 class RestaurantReviewSummarySerializer(serializers.Serializer):
     """
     Serializer for restaurant review summary with filters
@@ -213,7 +230,7 @@ class ReviewFilterSerializer(serializers.Serializer):
     min_rating = serializers.IntegerField(min_value=1, max_value=5, required=False)
     max_rating = serializers.IntegerField(min_value=1, max_value=5, required=False)
     sentiment = serializers.ChoiceField(
-        choices=['positive', 'neutral', 'negative'], 
+        choices=['positive', 'neutral', 'negative', 'pending'], 
         required=False
     )
     date_from = serializers.DateTimeField(required=False)
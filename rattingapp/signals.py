@@ -1,8 +1,25 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.db.models import Avg, Count, Case, When, IntegerField
-from django.db.models.functions import Round
-from .models import Review, ItemReview, ReviewAnalytics
+from .analytics import (
+    stored_contribution, record_review_saved, record_review_deleted, record_item_rating,
+    invalidate_after_commit, subtract
+)
+from .models import Review, ItemReview
+from .search import index_review
+from .item_ratings import ITEM_COUNTERS, item_contribution, apply_item_delta
+
+
+# Review fields the comment search index depends on (only approved reviews are indexed)
+COMMENT_INDEX_FIELDS = {'comment', 'restaurant_id', 'moderation_status'}
+
+
+@receiver(pre_save, sender=Review)
+def remember_previous_contribution(sender, instance, **kwargs):
+    """
+    Capture what the stored version of the review contributed, so the
+    post_save handler can apply only the difference
+    """
+    instance._previous_analytics = stored_contribution(instance)
 
 
 @receiver(post_save, sender=Review)
@@ -10,7 +27,15 @@ def update_analytics_on_review_save(sender, instance, created, **kwargs):
     """
     Update restaurant analytics when a review is saved
     """
-    update_restaurant_analytics(instance.restaurant_id)
+    record_review_saved(instance, getattr(instance, '_previous_analytics', None))
+
+
+@receiver(post_save, sender=Review)
+def update_comment_index(sender, instance, update_fields=None, **kwargs):
+    """Keep the comment search index in sync with the comment"""
+    if update_fields and not COMMENT_INDEX_FIELDS.intersection(update_fields):
+        return
+    index_review(instance)
 
 
 @receiver(post_delete, sender=Review)
@@ -18,62 +43,68 @@ def update_analytics_on_review_delete(sender, instance, **kwargs):
     """
     Update restaurant analytics when a review is deleted
     """
-    update_restaurant_analytics(instance.restaurant_id)
+    record_review_deleted(instance)
+
 
+def item_review_parent(item_review):
+    """(restaurant_id, moderation_status) of the review an item review belongs to"""
+    if 'review' in item_review._state.fields_cache:
+        return item_review.review.restaurant_id, item_review.review.moderation_status
+    return Review.objects.filter(pk=item_review.review_id).values_list(
+        'restaurant_id', 'moderation_status'
+    ).first() or (None, None)
 
-def update_restaurant_analytics(restaurant_id):
+
+@receiver(pre_save, sender=ItemReview)
+def remember_previous_item_rating(sender, instance, **kwargs):
+    instance._previous_item_rating = None
+    if not instance._state.adding:
+        instance._previous_item_rating = ItemReview.objects.filter(
+            pk=instance.pk
+        ).values_list('menu_item_id', 'rating').first()
+
+
+@receiver(post_save, sender=ItemReview)
+def update_item_rating_on_save(sender, instance, created, **kwargs):
     """
-    Update or create analytics for the specified restaurant
+    Apply the rating change to the menu item rollup and the restaurant's
+    item rating histogram, and drop the cached restaurant summary the item
+    review is part of. Items of reviews that are not approved stay out of
+    the rollups.
     """
-    try:
-        reviews = Review.objects.filter(restaurant_id=restaurant_id)
-        
-        if not reviews.exists():
-            # Delete analytics if no reviews left
-            ReviewAnalytics.objects.filter(restaurant_id=restaurant_id).delete()
-            return
-        
-        # Calculate aggregates
-        analytics_data = reviews.aggregate(
-            total_reviews=Count('id'),
-            avg_overall=Avg('overall_rating'),
-            avg_food=Avg('food_rating'),
-            avg_service=Avg('service_rating'),
-            avg_ambiance=Avg('ambiance_rating'),
-            positive_count=Count(Case(
-                When(sentiment_score__gte=0.1, then=1),
-                output_field=IntegerField()
-            )),
-            neutral_count=Count(Case(
-                When(sentiment_score__lt=0.1, sentiment_score__gt=-0.1, then=1),
-                output_field=IntegerField()
-            )),
-            negative_count=Count(Case(
-                When(sentiment_score__lte=-0.1, then=1),
-                output_field=IntegerField()
-            ))
-        )
-        
-        # Update or create analytics
-        analytics, created = ReviewAnalytics.objects.update_or_create(
-            restaurant_id=restaurant_id,
-            defaults={
-                'total_reviews': analytics_data['total_reviews'],
-                'average_overall_rating': Round(analytics_data['avg_overall'] or 0, 2),
-                'average_food_rating': Round(analytics_data['avg_food'] or 0, 2) if analytics_data['avg_food'] else None,
-                'average_service_rating': Round(analytics_data['avg_service'] or 0, 2) if analytics_data['avg_service'] else None,
-                'average_ambiance_rating': Round(analytics_data['avg_ambiance'] or 0, 2) if analytics_data['avg_ambiance'] else None,
-                'positive_sentiment_count': analytics_data['positive_count'],
-                'neutral_sentiment_count': analytics_data['neutral_count'],
-                'negative_sentiment_count': analytics_data['negative_count'],
-            }
-        )
-        
-        action = "Created" if created else "Updated"
-        print(f"{action} analytics for restaurant {restaurant_id}")
-        
-    except Exception as e:
-        print(f"Error updating analytics for restaurant {restaurant_id}: {e}")
+    restaurant_id, moderation_status = item_review_parent(instance)
+    invalidate_after_commit([restaurant_id])
+    if moderation_status != Review.ModerationStatus.APPROVED:
+        return
+
+    previous = getattr(instance, '_previous_item_rating', None)
+    record_item_rating(restaurant_id, added=instance.rating, removed=previous[1] if previous else None)
+    if previous is None:
+        apply_item_delta(instance.menu_item_id, restaurant_id, item_contribution(instance.rating))
+        return
+
+    previous_menu_item_id, previous_rating = previous
+    if previous_menu_item_id != instance.menu_item_id:
+        apply_item_delta(previous_menu_item_id, restaurant_id, subtract(item_contribution(previous_rating)))
+        apply_item_delta(instance.menu_item_id, restaurant_id, item_contribution(instance.rating))
+        return
+
+    current = item_contribution(instance.rating)
+    previous_contribution = item_contribution(previous_rating)
+    apply_item_delta(instance.menu_item_id, restaurant_id, {
+        field: current.get(field, 0) - previous_contribution.get(field, 0)
+        for field in ITEM_COUNTERS
+    })
+
+
+@receiver(post_delete, sender=ItemReview)
+def update_item_rating_on_delete(sender, instance, **kwargs):
+    restaurant_id, moderation_status = item_review_parent(instance)
+    invalidate_after_commit([restaurant_id])
+    if moderation_status != Review.ModerationStatus.APPROVED:
+        return
+    record_item_rating(restaurant_id, removed=instance.rating)
+    apply_item_delta(instance.menu_item_id, restaurant_id, subtract(item_contribution(instance.rating)))
 
 
 @receiver(post_save, sender=ItemReview)
@@ -90,4 +121,4 @@ def log_item_review_deletion(sender, instance, **kwargs):
     """
     Log when an item review is deleted (optional)
     """
-    print(f"Item review deleted for menu item {instance.menu_item_id}")
\ No newline at end of file
+    print(f"Item review deleted for menu item {instance.menu_item_id}")
@@ -1,3 +1,943 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import uuid
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+from rest_framework.test import APIClient
+from .analytics import (
+    stats, reset_stats, recompute_restaurant_analytics, process_dirty_restaurants, ANALYTICS_COUNTERS
+)
+from . import histograms
+from .importer import import_reviews
+from .item_ratings import ITEM_COUNTERS, rebuild_item_ratings
+from .management.commands.benchmark_boot import BOOT_SCRIPT
+from .keywords import extract_keywords, restaurant_keywords, _months_filter
+from .models import (
+    Review, ItemReview, MenuItemRating, RestaurantKeyword, ReviewAnalytics, RestaurantDailyStats,
+    DirtyRestaurant, DirtyRestaurantDay, CommentFingerprint
+)
+from .moderation import screen_review, set_moderation_status
+from .search import stem
+from .sentiment import (
+    LexiconScorer, LRUCache, analyze_sentiment, backfill_sentiment, get_cache, normalize_comment,
+    score_pending_reviews
+)
+from .trending import DAILY_COUNTERS
+from .views import BATCH_ANALYTICS_MAX_RESTAURANTS
 
-# Create your tests here.
+
+def make_review(restaurant_id, **fields):
+    fields.setdefault('overall_rating', 4)
+    return Review.objects.create(
+        order_id=uuid.uuid4(), session_id=uuid.uuid4(), restaurant_id=restaurant_id, **fields
+    )
+
+
+class AnalyticsTestMixin:
+    def snapshot(self, restaurant_id):
+        analytics = ReviewAnalytics.objects.filter(restaurant_id=restaurant_id).values(*ANALYTICS_COUNTERS).first()
+        daily = list(
+            RestaurantDailyStats.objects.filter(restaurant_id=restaurant_id)
+            .order_by('day').values('day', *DAILY_COUNTERS)
+        )
+        return analytics, daily
+
+    def assertMatchesRebuild(self, restaurant_id):
+        """The maintained counters equal a full rebuild from the reviews"""
+        maintained = self.snapshot(restaurant_id)
+        recompute_restaurant_analytics([restaurant_id])
+        self.assertEqual(maintained, self.snapshot(restaurant_id))
+
+
+class SentimentBackfillTests(AnalyticsTestMixin, TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+        for comment in ('great food', 'awful service', 'it was ok', 'lovely place'):
+            make_review(self.restaurant_id, comment=comment)
+        reset_stats()
+
+    def test_backfill_applies_deltas_without_recomputing(self):
+        scored = backfill_sentiment(chunk_size=2, resume=False)
+
+        self.assertEqual(scored, 4)
+        self.assertEqual(stats['recomputations'], 0)
+        analytics = ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id)
+        self.assertEqual(
+            analytics.positive_sentiment_count + analytics.neutral_sentiment_count
+            + analytics.negative_sentiment_count,
+            4
+        )
+        self.assertMatchesRebuild(self.restaurant_id)
+
+    @override_settings(REVIEW_ANALYTICS_MODE='deferred')
+    def test_deferred_backfill_only_marks_restaurants_dirty(self):
+        before = self.snapshot(self.restaurant_id)
+        backfill_sentiment(resume=False)
+
+        self.assertEqual(self.snapshot(self.restaurant_id), before)
+        self.assertTrue(DirtyRestaurant.objects.filter(restaurant_id=self.restaurant_id).exists())
+
+    def test_reviews_changed_mid_chunk_are_not_overwritten_or_counted_twice(self):
+        edited = Review.objects.get(comment='great food')
+        deleted = Review.objects.get(comment='awful service')
+
+        def change_then_score(text):
+            if text == 'great food':
+                edited.comment = 'awful food'
+                edited.sentiment_score = Decimal('-0.90')
+                edited.sentiment_status = Review.SentimentStatus.SCORED
+                edited.save()
+                deleted.delete()
+            return 0.5
+
+        with mock.patch('rattingapp.sentiment.analyze_sentiment', side_effect=change_then_score):
+            scored = backfill_sentiment(resume=False)
+
+        self.assertEqual(scored, 2)
+        edited.refresh_from_db()
+        self.assertEqual((edited.comment, edited.sentiment_score), ('awful food', Decimal('-0.90')))
+        analytics = ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id)
+        self.assertEqual((analytics.positive_sentiment_count, analytics.negative_sentiment_count), (2, 1))
+        self.assertMatchesRebuild(self.restaurant_id)
+
+    def test_unscorable_comments_are_marked_failed_and_not_retried(self):
+        with mock.patch('rattingapp.sentiment.analyze_sentiment', return_value=None):
+            self.assertEqual(backfill_sentiment(resume=False), 0)
+
+        self.assertEqual(
+            Review.objects.filter(sentiment_status=Review.SentimentStatus.FAILED).count(), 4
+        )
+        with mock.patch('rattingapp.sentiment.analyze_sentiment') as analyze:
+            backfill_sentiment(resume=False)
+        analyze.assert_not_called()
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+
+    def line(self, **fields):
+        payload = {
+            'order_id': str(uuid.uuid4()),
+            'session_id': str(uuid.uuid4()),
+            'restaurant_id': str(self.restaurant_id),
+            'overall_rating': 5,
+            **fields,
+        }
+        return json.dumps(payload)
+
+    def test_original_timestamps_are_kept(self):
+        result = import_reviews([
+            self.line(created_at='2023-03-04T10:00:00Z'),
+            self.line(created_at='2023-03-04T10:00:00Z', updated_at='2023-05-01T08:00:00Z'),
+        ])
+
+        self.assertEqual(result.imported, 2)
+        self.assertEqual(
+            sorted(Review.objects.values_list('created_at', 'updated_at')),
+            [
+                (datetime(2023, 3, 4, 10, tzinfo=dt_timezone.utc), datetime(2023, 3, 4, 10, tzinfo=dt_timezone.utc)),
+                (datetime(2023, 3, 4, 10, tzinfo=dt_timezone.utc), datetime(2023, 5, 1, 8, tzinfo=dt_timezone.utc)),
+            ]
+        )
+        daily = RestaurantDailyStats.objects.get(restaurant_id=self.restaurant_id)
+        self.assertEqual((daily.day, daily.total_reviews), (date(2023, 3, 4), 2))
+
+    def test_invalid_timestamps_reject_the_row(self):
+        result = import_reviews([
+            self.line(created_at='yesterday'),
+            self.line(created_at='2999-01-01T00:00:00Z'),
+            self.line(created_at='2023-03-04T10:00:00Z', updated_at='2023-03-01T10:00:00Z'),
+            self.line(updated_at='2023-03-01T10:00:00Z'),
+        ])
+
+        self.assertEqual((result.imported, result.rejected), (0, 4))
+        self.assertEqual([error['line'] for error in result.errors], [1, 2, 3, 4])
+
+    def test_imported_comments_are_fingerprinted(self):
+        comment = 'the pasta was cold and the waiter forgot our drinks twice'
+        import_reviews([self.line(comment=comment)])
+
+        self.assertTrue(CommentFingerprint.objects.exists())
+        screening = screen_review({
+            'order_id': uuid.uuid4(), 'session_id': uuid.uuid4(), 'comment': comment,
+        })
+        self.assertEqual(screening.reason, Review.ModerationReason.NEAR_DUPLICATE)
+
+    def test_endpoint_requires_staff(self):
+        url = reverse('review-bulk-import')
+        client = APIClient()
+        response = client.post(url, self.line(), content_type='application/x-ndjson')
+        self.assertIn(response.status_code, (401, 403))
+
+        client.force_authenticate(User.objects.create_user('importer', is_staff=True))
+        response = client.post(url, self.line(), content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 201)
+
+    def test_endpoint_reports_rejected_rows(self):
+        url = reverse('review-bulk-import')
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('importer', is_staff=True))
+
+        partial = '\n'.join([self.line(), self.line(overall_rating=9)])
+        response = client.post(url, partial, content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 207)
+        self.assertEqual((response.data['imported'], response.data['rejected']), (1, 1))
+
+        response = client.post(url, 'not json', content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 400)
+
+
+class IncrementalKeywordTests(TestCase):
+    """Reviews scored after they were written must reach incremental keyword runs"""
+
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+
+    def test_backfilled_reviews_reach_the_next_incremental_run(self):
+        make_review(self.restaurant_id, comment='delicious pizza')
+        extract_keywords(full=True)
+        self.assertEqual(restaurant_keywords(self.restaurant_id)['keywords'], {})
+
+        backfill_sentiment(resume=False)
+        extract_keywords()
+        terms = restaurant_keywords(self.restaurant_id)['keywords']['positive']
+        self.assertEqual(sorted(row['term'] for row in terms), ['delicious', 'pizza'])
+
+    def test_reviews_scored_by_the_worker_reach_the_next_incremental_run(self):
+        make_review(self.restaurant_id, comment='delicious pizza', sentiment_status=Review.SentimentStatus.PENDING)
+        extract_keywords(full=True)
+        self.assertEqual(restaurant_keywords(self.restaurant_id)['keywords'], {})
+
+        score_pending_reviews()
+        extract_keywords()
+        self.assertIn('positive', restaurant_keywords(self.restaurant_id)['keywords'])
+
+
+class AnalyticsDeltaTests(AnalyticsTestMixin, TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+
+    def test_reviews_keep_counters_in_step_with_a_rebuild(self):
+        first = make_review(self.restaurant_id, overall_rating=5, food_rating=4, comment='great')
+        second = make_review(self.restaurant_id, overall_rating=2)
+        second.overall_rating = 3
+        second.service_rating = 1
+        second.save()
+        first.delete()
+
+        analytics = ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id)
+        self.assertEqual((analytics.total_reviews, analytics.overall_rating_sum), (1, 3))
+        self.assertMatchesRebuild(self.restaurant_id)
+
+    def test_removing_from_a_missing_row_recomputes_instead_of_going_negative(self):
+        kept = make_review(self.restaurant_id, overall_rating=5)
+        removed = make_review(self.restaurant_id, overall_rating=3)
+        ReviewAnalytics.objects.all().delete()
+        RestaurantDailyStats.objects.all().delete()
+
+        removed.delete()
+
+        analytics = ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id)
+        self.assertEqual((analytics.total_reviews, analytics.overall_rating_sum), (1, 5))
+        daily = RestaurantDailyStats.objects.get(restaurant_id=self.restaurant_id)
+        self.assertEqual((daily.total_reviews, daily.overall_rating_sum), (1, 5))
+        self.assertMatchesRebuild(kept.restaurant_id)
+
+    def test_removing_the_last_review_from_a_missing_row_leaves_no_row(self):
+        review = make_review(self.restaurant_id)
+        ReviewAnalytics.objects.all().delete()
+        RestaurantDailyStats.objects.all().delete()
+
+        review.delete()
+
+        self.assertFalse(ReviewAnalytics.objects.filter(restaurant_id=self.restaurant_id).exists())
+        self.assertFalse(RestaurantDailyStats.objects.filter(restaurant_id=self.restaurant_id).exists())
+
+
+@override_settings(REVIEW_ANALYTICS_MODE='deferred')
+class DeferredAnalyticsTests(AnalyticsTestMixin, TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+        old = make_review(self.restaurant_id, overall_rating=4)
+        Review.objects.filter(pk=old.pk).update(created_at=datetime(2024, 1, 10, 12, tzinfo=dt_timezone.utc))
+        with override_settings(REVIEW_ANALYTICS_MODE='inline'):
+            recompute_restaurant_analytics([self.restaurant_id])
+        DirtyRestaurant.objects.all().delete()
+        DirtyRestaurantDay.objects.all().delete()
+
+    def test_writes_only_mark_the_restaurant_and_day(self):
+        review = make_review(self.restaurant_id, overall_rating=2)
+
+        self.assertEqual(ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id).total_reviews, 1)
+        self.assertEqual(
+            list(DirtyRestaurantDay.objects.values_list('restaurant_id', 'day')),
+            [(self.restaurant_id, review.created_at.date())]
+        )
+
+    def test_worker_rebuilds_only_the_marked_days(self):
+        make_review(self.restaurant_id, overall_rating=2)
+        # An untouched old bucket is left alone, not rescanned
+        RestaurantDailyStats.objects.filter(day=date(2024, 1, 10)).update(overall_rating_sum=40)
+
+        self.assertEqual(process_dirty_restaurants(), 1)
+
+        analytics = ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id)
+        self.assertEqual((analytics.total_reviews, analytics.overall_rating_sum), (2, 6))
+        self.assertEqual(RestaurantDailyStats.objects.get(day=date(2024, 1, 10)).overall_rating_sum, 40)
+        self.assertEqual(RestaurantDailyStats.objects.get(day=timezone.localdate()).overall_rating_sum, 2)
+        self.assertFalse(DirtyRestaurant.objects.exists())
+        self.assertFalse(DirtyRestaurantDay.objects.exists())
+
+    def test_worker_removes_the_bucket_of_a_deleted_review(self):
+        review = make_review(self.restaurant_id, overall_rating=2)
+        process_dirty_restaurants()
+        review.delete()
+        process_dirty_restaurants()
+
+        self.assertFalse(RestaurantDailyStats.objects.filter(day=timezone.localdate()).exists())
+        self.assertMatchesRebuild(self.restaurant_id)
+
+
+class SentimentScorerTests(TestCase):
+    def setUp(self):
+        get_cache().clear()
+
+    def test_normalize_comment(self):
+        self.assertEqual(normalize_comment("  The FOOD wasn't great!! "), "the food wasn't great")
+
+    def test_lexicon_scorer(self):
+        scorer = LexiconScorer()
+
+        self.assertGreater(scorer.score('great food'), 0)
+        self.assertLess(scorer.score('awful service'), 0)
+        self.assertGreater(scorer.score('very good'), scorer.score('good'))
+        # Negation softens as well as flips
+        self.assertAlmostEqual(scorer.score('not good'), -0.35)
+        self.assertEqual(scorer.score('we ordered at noon'), 0.0)
+
+    def test_equivalent_comments_are_scored_once(self):
+        with mock.patch.object(LexiconScorer, 'score', autospec=True, return_value=0.5) as score:
+            self.assertEqual(analyze_sentiment('Great food!'), 0.5)
+            self.assertEqual(analyze_sentiment('great   FOOD'), 0.5)
+        self.assertEqual(score.call_count, 1)
+        self.assertEqual((get_cache().hits, get_cache().misses), (1, 1))
+
+    def test_blank_comments_are_not_scored(self):
+        self.assertIsNone(analyze_sentiment('   '))
+
+    def test_lru_cache_evicts_the_least_recently_used_key(self):
+        cache = LRUCache(2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('c'), 3)
+
+
+@override_settings(REVIEW_SENTIMENT_ASYNC=True)
+class AsyncSentimentTests(AnalyticsTestMixin, TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+
+    def test_create_leaves_the_comment_pending(self):
+        with mock.patch('rattingapp.sentiment.analyze_sentiment') as analyze:
+            response = APIClient().post(reverse('review-create'), {
+                'order_id': str(uuid.uuid4()),
+                'session_id': str(uuid.uuid4()),
+                'restaurant_id': str(self.restaurant_id),
+                'overall_rating': 5,
+                'comment': 'great food',
+            }, format='json')
+
+        self.assertEqual(response.status_code, 201)
+        analyze.assert_not_called()
+        review = Review.objects.get()
+        self.assertEqual((review.sentiment_status, review.sentiment_score), (Review.SentimentStatus.PENDING, None))
+        self.assertEqual(review.get_sentiment_label(), 'Pending')
+
+    def test_worker_scores_pending_reviews_and_updates_analytics(self):
+        make_review(self.restaurant_id, comment='great food', sentiment_status=Review.SentimentStatus.PENDING)
+        make_review(self.restaurant_id, comment='awful service', sentiment_status=Review.SentimentStatus.PENDING)
+
+        self.assertEqual(score_pending_reviews(), 2)
+        self.assertFalse(Review.objects.filter(sentiment_status=Review.SentimentStatus.PENDING).exists())
+        analytics = ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id)
+        self.assertEqual((analytics.positive_sentiment_count, analytics.negative_sentiment_count), (1, 1))
+        self.assertMatchesRebuild(self.restaurant_id)
+
+    def test_worker_does_not_overwrite_a_comment_edited_mid_flight(self):
+        review = make_review(self.restaurant_id, comment='great food', sentiment_status=Review.SentimentStatus.PENDING)
+
+        def edit_then_score(text):
+            Review.objects.filter(pk=review.pk).update(comment='awful food', updated_at=timezone.now())
+            return 0.8
+
+        with mock.patch('rattingapp.sentiment.analyze_sentiment', side_effect=edit_then_score):
+            score_pending_reviews()
+
+        review.refresh_from_db()
+        self.assertEqual((review.sentiment_status, review.sentiment_score), (Review.SentimentStatus.PENDING, None))
+        self.assertEqual(ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id).positive_sentiment_count, 0)
+
+
+class RestaurantSummaryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant_id = uuid.uuid4()
+        self.url = reverse('restaurant-summary', args=[self.restaurant_id])
+
+    def test_summary_comes_from_the_counters_and_is_cached(self):
+        make_review(self.restaurant_id, overall_rating=5, sentiment_score=Decimal('0.80'))
+        make_review(self.restaurant_id, overall_rating=3)
+        client = APIClient()
+
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_reviews'], 2)
+        self.assertEqual(response.data['rating_distribution'], {1: 0, 2: 0, 3: 1, 4: 0, 5: 1})
+        self.assertEqual(response.data['sentiment_summary']['positive'], 1)
+
+        with self.assertNumQueries(0):
+            self.assertEqual(client.get(self.url).data, response.data)
+
+    def test_review_writes_drop_the_cached_summary(self):
+        client = APIClient()
+        self.assertEqual(client.get(self.url).data['total_reviews'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_review(self.restaurant_id)
+
+        self.assertEqual(client.get(self.url).data['total_reviews'], 1)
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.recent = uuid.uuid4()
+        self.older = uuid.uuid4()
+        for _ in range(5):
+            make_review(self.recent, overall_rating=5, sentiment_score=Decimal('0.80'))
+            make_review(self.older, overall_rating=5, sentiment_score=Decimal('0.80'))
+        Review.objects.filter(restaurant_id=self.older).update(created_at=timezone.now() - timedelta(days=40))
+        recompute_restaurant_analytics([self.older])
+
+    def trending(self, **params):
+        response = APIClient().get(reverse('trending-restaurants'), params)
+        self.assertEqual(response.status_code, 200)
+        return [row['restaurant_id'] for row in response.data]
+
+    def test_trending_sums_the_buckets_inside_the_window(self):
+        self.assertEqual(self.trending(days=30), [self.recent])
+        self.assertEqual(sorted(self.trending(days=90)), sorted([self.recent, self.older]))
+
+    def test_trending_is_cached_per_window(self):
+        self.trending(days=7)
+        with self.assertNumQueries(0):
+            self.trending(days=7)
+
+    def test_unknown_window_is_rejected(self):
+        response = APIClient().get(reverse('trending-restaurants'), {'days': 5})
+        self.assertEqual(response.status_code, 400)
+
+
+class MenuItemRatingTests(TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+        self.pasta = uuid.uuid4()
+        self.salad = uuid.uuid4()
+        self.review = make_review(self.restaurant_id)
+
+    def rollups(self):
+        return {
+            row['menu_item_id']: row
+            for row in MenuItemRating.objects.values('menu_item_id', *ITEM_COUNTERS)
+        }
+
+    def assertMatchesRebuild(self):
+        maintained = self.rollups()
+        rebuild_item_ratings()
+        self.assertEqual(maintained, self.rollups())
+
+    def test_item_review_writes_keep_the_rollups_in_step(self):
+        ItemReview.objects.create(review=self.review, menu_item_id=self.pasta, rating=5)
+        moved = ItemReview.objects.create(review=self.review, menu_item_id=self.pasta, rating=2)
+        removed = ItemReview.objects.create(review=self.review, menu_item_id=self.salad, rating=4)
+        moved.menu_item_id = self.salad
+        moved.rating = 3
+        moved.save()
+        removed.delete()
+
+        rollups = self.rollups()
+        self.assertEqual((rollups[self.pasta]['rating_count'], rollups[self.pasta]['rating_sum']), (1, 5))
+        self.assertEqual((rollups[self.salad]['rating_count'], rollups[self.salad]['rating_3_count']), (1, 1))
+        self.assertMatchesRebuild()
+
+    def test_endpoints_read_the_rollups(self):
+        for rating in (5, 4):
+            ItemReview.objects.create(review=self.review, menu_item_id=self.pasta, rating=rating)
+        for rating in (2, 3):
+            ItemReview.objects.create(review=self.review, menu_item_id=self.salad, rating=rating)
+        client = APIClient()
+
+        with self.assertNumQueries(1):
+            response = client.get(reverse('restaurant-top-items', args=[self.restaurant_id]))
+        self.assertEqual([row['menu_item_id'] for row in response.data], [str(self.pasta), str(self.salad)])
+        self.assertEqual(response.data[0]['average_rating'], '4.50')
+
+        response = client.get(reverse('menu-item-rating-list'), {'menu_item_ids': f'{self.salad},'})
+        self.assertEqual([row['rating_count'] for row in response.data], [2])
+
+
+class ReviewListTests(TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+        self.reviews = []
+        for day in range(1, 6):
+            review = make_review(self.restaurant_id)
+            Review.objects.filter(pk=review.pk).update(created_at=datetime(2024, 3, day, tzinfo=dt_timezone.utc))
+            self.reviews.append(review)
+        make_review(uuid.uuid4())
+
+    def test_cursor_pages_walk_every_review_once(self):
+        client = APIClient()
+        url = reverse('review-list') + f'?restaurant_id={self.restaurant_id}&page_size=2'
+        seen = []
+        while url:
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(response.data['results']), 2)
+            seen.extend(row['id'] for row in response.data['results'])
+            url = response.data['next']
+
+        self.assertEqual(seen, [str(review.pk) for review in reversed(self.reviews)])
+
+    def test_restaurant_scoped_route_filters_by_restaurant(self):
+        response = APIClient().get(reverse('api-restaurant-reviews', args=[self.restaurant_id]))
+        self.assertEqual(len(response.data['results']), 5)
+
+    def test_item_reviews_are_only_included_on_request(self):
+        ItemReview.objects.create(review=self.reviews[-1], menu_item_id=uuid.uuid4(), rating=4)
+        client = APIClient()
+        url = reverse('review-list')
+
+        response = client.get(url, {'restaurant_id': self.restaurant_id})
+        self.assertNotIn('item_reviews', response.data['results'][0])
+        response = client.get(url, {'restaurant_id': self.restaurant_id, 'include': 'item_reviews'})
+        self.assertEqual(len(response.data['results'][0]['item_reviews']), 1)
+
+
+class CommentSearchTests(TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+        self.slow = make_review(self.restaurant_id, comment='Slow, so slow. We waited an hour and the service was slow')
+        self.pizza = make_review(self.restaurant_id, comment='Lovely pizza, slow service, lovely staff')
+        self.quiet = make_review(self.restaurant_id, comment='A quiet lunch')
+        self.blank = make_review(self.restaurant_id, comment='   ')
+
+    def search(self, q, **params):
+        response = APIClient().get(reverse('review-search'), {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.data['results']]
+
+    def test_stemmer(self):
+        self.assertEqual({stem(word) for word in ('waited', 'waiting', 'waits')}, {'wait'})
+        self.assertEqual(stem('rudeness'), stem('rude'))
+
+    def test_search_requires_every_term_and_ranks_by_weight(self):
+        self.assertEqual(self.search('slow service'), [str(self.slow.pk), str(self.pizza.pk)])
+        self.assertEqual(self.search('waiting'), [str(self.slow.pk)])
+        self.assertEqual(self.search('lovely slow'), [str(self.pizza.pk)])
+        self.assertEqual(self.search('pizza', restaurant_id=str(uuid.uuid4())), [])
+
+    def test_edited_comments_are_reindexed(self):
+        self.quiet.comment = 'A quiet pizza lunch'
+        self.quiet.save()
+
+        self.assertEqual(set(self.search('pizza')), {str(self.pizza.pk), str(self.quiet.pk)})
+
+    def test_search_needs_a_query(self):
+        self.assertEqual(APIClient().get(reverse('review-search')).status_code, 400)
+
+    def test_has_comment_flag_backs_the_list_filter(self):
+        self.assertEqual(
+            dict(Review.objects.values_list('pk', 'has_comment')),
+            {self.slow.pk: True, self.pizza.pk: True, self.quiet.pk: True, self.blank.pk: False}
+        )
+        client = APIClient()
+        response = client.get(reverse('review-list'), {'restaurant_id': self.restaurant_id, 'has_comment': 'false'})
+        self.assertEqual([row['id'] for row in response.data['results']], [str(self.blank.pk)])
+        response = client.get(reverse('review-list'), {'restaurant_id': self.restaurant_id, 'search': 'waits'})
+        self.assertEqual([row['id'] for row in response.data['results']], [str(self.slow.pk)])
+
+
+class RestaurantKeywordTests(TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+        for comment, score, month in (
+            ('delicious pizza, delicious pasta', '0.80', 1),
+            ('delicious soup', '0.60', 1),
+            ('cold pizza', '-0.40', 1),
+            ('delicious cake', '0.90', 2),
+        ):
+            review = make_review(self.restaurant_id, comment=comment, sentiment_score=Decimal(score))
+            Review.objects.filter(pk=review.pk).update(created_at=datetime(2024, month, 10, tzinfo=dt_timezone.utc))
+        extract_keywords(full=True)
+
+    def test_keywords_are_counted_per_month_and_sentiment(self):
+        url = reverse('restaurant-keywords', args=[self.restaurant_id])
+        response = APIClient().get(url, {'month': '2024-01'})
+
+        self.assertEqual(response.status_code, 200)
+        positive = response.data['keywords']['positive']
+        self.assertEqual(positive[0], {'term': 'delicious', 'count': 3, 'review_count': 2})
+        self.assertEqual([row['term'] for row in response.data['keywords']['negative']], ['cold', 'pizza'])
+
+        response = APIClient().get(url, {'sentiment': 'positive'})
+        self.assertEqual(response.data['month'], date(2024, 2, 1))
+        self.assertEqual(list(response.data['keywords']), ['positive'])
+
+    def test_incremental_runs_only_read_the_changed_months(self):
+        january = Review.objects.filter(created_at__month=1).values_list('pk', flat=True)
+        boundary = make_review(self.restaurant_id, comment='late night snack', sentiment_score=Decimal('0.50'))
+        Review.objects.filter(pk=boundary.pk).update(created_at=datetime(2024, 2, 1, tzinfo=dt_timezone.utc))
+
+        february = Review.objects.filter(_months_filter({self.restaurant_id: {date(2024, 2, 1)}}))
+        self.assertEqual(february.count(), 2)
+        self.assertFalse(february.filter(pk__in=list(january)).exists())
+        self.assertFalse(Review.objects.filter(_months_filter({uuid.uuid4(): {date(2024, 2, 1)}})).exists())
+
+        # Only February is rewritten; January's rows are left as they were
+        RestaurantKeyword.objects.filter(month=date(2024, 1, 1), term='delicious').update(count=99)
+        extract_keywords()
+        terms = restaurant_keywords(self.restaurant_id, month=date(2024, 2, 1))['keywords']['positive']
+        self.assertIn('snack', [row['term'] for row in terms])
+        self.assertEqual(
+            RestaurantKeyword.objects.get(month=date(2024, 1, 1), bucket='positive', term='delicious').count, 99
+        )
+
+    def test_invalid_month_is_rejected(self):
+        response = APIClient().get(reverse('restaurant-keywords', args=[self.restaurant_id]), {'month': '2024-13'})
+        self.assertEqual(response.status_code, 400)
+
+
+class RatingTrendTests(TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+        self.url = reverse('restaurant-trends', args=[self.restaurant_id])
+        for rating, food, day in ((5, 4, 1), (3, None, 1), (2, None, 3)):
+            review = make_review(self.restaurant_id, overall_rating=rating, food_rating=food)
+            Review.objects.filter(pk=review.pk).update(created_at=datetime(2024, 3, day, 12, tzinfo=dt_timezone.utc))
+        recompute_restaurant_analytics([self.restaurant_id])
+
+    def test_daily_series_fills_gaps_and_averages_over_the_window(self):
+        response = APIClient().get(self.url, {'date_from': '2024-03-01', 'date_to': '2024-03-04', 'window': 2})
+
+        self.assertEqual(response.status_code, 200)
+        series = response.data['series']
+        self.assertEqual([row['period'] for row in series], [date(2024, 3, day) for day in range(1, 5)])
+        self.assertEqual([row['total_reviews'] for row in series], [2, 0, 1, 0])
+        self.assertEqual([row['average_overall_rating'] for row in series], [4.0, None, 2.0, None])
+        self.assertEqual(series[0]['average_food_rating'], 4.0)
+        self.assertEqual([row['overall_moving_average'] for row in series], [4.0, 4.0, 2.0, 2.0])
+
+    def test_weekly_series_groups_the_days(self):
+        response = APIClient().get(self.url, {'granularity': 'week', 'date_from': '2024-02-26', 'date_to': '2024-03-03'})
+
+        self.assertEqual(
+            [(row['period'], row['total_reviews'], row['average_overall_rating']) for row in response.data['series']],
+            [(date(2024, 2, 26), 3, 3.33)]
+        )
+
+    def test_invalid_parameters_are_rejected(self):
+        client = APIClient()
+        self.assertEqual(client.get(self.url, {'granularity': 'year'}).status_code, 400)
+        self.assertEqual(client.get(self.url, {'date_from': '03/01/2024'}).status_code, 400)
+
+
+class ReviewScreeningTests(AnalyticsTestMixin, TestCase):
+    comment = 'The pasta was cold and the waiter forgot our drinks twice before dessert'
+
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+
+    def post(self, **fields):
+        payload = {
+            'order_id': str(uuid.uuid4()),
+            'session_id': str(uuid.uuid4()),
+            'restaurant_id': str(self.restaurant_id),
+            'overall_rating': 2,
+            **fields,
+        }
+        response = APIClient().post(reverse('review-create'), payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Review.objects.get(order_id=payload['order_id'])
+
+    def test_near_duplicate_comments_are_quarantined(self):
+        original = self.post(comment=self.comment)
+        copy = self.post(comment=self.comment.upper() + '!')
+        different = self.post(comment='Friendly staff and the best tiramisu we have had in years')
+
+        self.assertEqual(original.moderation_status, Review.ModerationStatus.APPROVED)
+        self.assertEqual(
+            (copy.moderation_status, copy.moderation_reason),
+            (Review.ModerationStatus.QUARANTINED, Review.ModerationReason.NEAR_DUPLICATE)
+        )
+        self.assertEqual(different.moderation_status, Review.ModerationStatus.APPROVED)
+        self.assertEqual(ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id).total_reviews, 2)
+
+    def test_second_review_of_an_order_is_quarantined(self):
+        order_id = str(uuid.uuid4())
+        self.post(order_id=order_id)
+        screening = screen_review({'order_id': order_id, 'session_id': uuid.uuid4(), 'comment': ''})
+
+        self.assertEqual(screening.reason, Review.ModerationReason.DUPLICATE_ORDER)
+
+    @override_settings(REVIEW_SPAM_SESSION_LIMIT=2)
+    def test_sessions_over_the_rate_limit_are_quarantined(self):
+        session_id = str(uuid.uuid4())
+        reviews = [self.post(session_id=session_id) for _ in range(3)]
+
+        self.assertEqual(
+            [review.moderation_reason for review in reviews],
+            ['', '', Review.ModerationReason.SESSION_RATE]
+        )
+
+    def test_approving_and_rejecting_moves_reviews_in_and_out_of_analytics(self):
+        self.post(comment=self.comment)
+        copy = self.post(comment=self.comment + ' again')
+        ItemReview.objects.create(review=copy, menu_item_id=uuid.uuid4(), rating=1)
+        self.assertFalse(MenuItemRating.objects.exists())
+
+        self.assertEqual(set_moderation_status(Review.objects.filter(pk=copy.pk), Review.ModerationStatus.APPROVED), 1)
+        self.assertEqual(ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id).total_reviews, 2)
+        self.assertEqual(MenuItemRating.objects.get().rating_count, 1)
+        self.assertMatchesRebuild(self.restaurant_id)
+
+        set_moderation_status(Review.objects.filter(pk=copy.pk), Review.ModerationStatus.REJECTED)
+        self.assertEqual(ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id).total_reviews, 1)
+        self.assertFalse(MenuItemRating.objects.exists())
+        self.assertMatchesRebuild(self.restaurant_id)
+
+
+class AnalyticsConditionalTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.restaurant_id = uuid.uuid4()
+        make_review(self.restaurant_id)
+        self.url = reverse('restaurant-analytics', args=[self.restaurant_id])
+
+    def test_unchanged_analytics_revalidate_with_304_without_queries(self):
+        client = APIClient()
+        response = client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_reviews'], 1)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+        with self.assertNumQueries(0):
+            revalidated = client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, 304)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+
+        revalidated = client.get(self.url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_review_writes_change_the_etag(self):
+        client = APIClient()
+        etag = client.get(self.url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            make_review(self.restaurant_id)
+
+        response = client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['total_reviews'], 2)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_unknown_restaurant(self):
+        self.assertEqual(APIClient().get(reverse('restaurant-analytics', args=[uuid.uuid4()])).status_code, 404)
+
+
+class BatchAnalyticsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.first = uuid.uuid4()
+        self.second = uuid.uuid4()
+        make_review(self.first, overall_rating=5)
+        make_review(self.second, overall_rating=2)
+        make_review(self.second, overall_rating=4)
+        self.url = reverse('restaurant-analytics-batch')
+
+    def test_results_follow_the_requested_order(self):
+        unknown = uuid.uuid4()
+        ids = f'{self.second},{unknown},{self.first},{self.second}'
+        with self.assertNumQueries(1):
+            response = APIClient().get(self.url, {'restaurant_ids': ids})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [(row['restaurant_id'], row['total_reviews']) for row in response.data['results']],
+            [(str(self.second), 2), (str(unknown), 0), (str(self.first), 1)]
+        )
+
+    def test_cached_entries_are_reused(self):
+        client = APIClient()
+        client.post(self.url, {'restaurant_ids': [str(self.first), str(self.second)]}, format='json')
+
+        with self.assertNumQueries(0):
+            response = client.post(self.url, {'restaurant_ids': [str(self.first), str(self.second)]}, format='json')
+        self.assertEqual(response.data['count'], 2)
+
+    def test_invalid_requests_are_rejected(self):
+        client = APIClient()
+        too_many = [str(uuid.uuid4()) for _ in range(BATCH_ANALYTICS_MAX_RESTAURANTS + 1)]
+
+        self.assertEqual(client.get(self.url).status_code, 400)
+        self.assertEqual(client.get(self.url, {'restaurant_ids': 'abc'}).status_code, 400)
+        self.assertEqual(client.post(self.url, {'restaurant_ids': str(self.first)}, format='json').status_code, 400)
+        self.assertEqual(client.post(self.url, {'restaurant_ids': too_many}, format='json').status_code, 400)
+
+
+class AnalyticsServiceTests(AnalyticsTestMixin, TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+        reset_stats()
+
+    def test_each_review_write_applies_one_delta(self):
+        review = make_review(self.restaurant_id, overall_rating=4)
+        make_review(self.restaurant_id, overall_rating=5)
+        self.assertEqual((stats['deltas_applied'], stats['rows_created']), (2, 1))
+
+        # A save that changes no counter applies nothing
+        review.is_anonymous = True
+        review.save()
+        self.assertEqual(stats['deltas_applied'], 2)
+
+        review.overall_rating = 1
+        review.save()
+        self.assertEqual(stats['deltas_applied'], 3)
+        self.assertEqual(stats['recomputations'], 0)
+        self.assertMatchesRebuild(self.restaurant_id)
+        self.assertEqual((stats['recomputations'], stats['restaurants_recomputed']), (1, 1))
+
+    def test_moving_a_review_between_restaurants(self):
+        other = uuid.uuid4()
+        review = make_review(self.restaurant_id, overall_rating=4)
+        make_review(other, overall_rating=2)
+
+        review.restaurant_id = other
+        review.save()
+
+        self.assertEqual(ReviewAnalytics.objects.get(restaurant_id=self.restaurant_id).total_reviews, 0)
+        self.assertEqual(ReviewAnalytics.objects.get(restaurant_id=other).overall_rating_sum, 6)
+        self.assertMatchesRebuild(other)
+
+    @override_settings(REVIEW_ANALYTICS_MODE='deferred')
+    def test_deferred_writes_are_counted_as_dirty_marks(self):
+        make_review(self.restaurant_id)
+
+        self.assertEqual((stats['deltas_applied'], stats['restaurants_marked_dirty']), (0, 1))
+
+
+class RatingHistogramTests(AnalyticsTestMixin, TestCase):
+    def test_statistics_come_from_the_counts(self):
+        counts = [1, 0, 2, 0, 1]  # ratings 1, 3, 3, 5
+
+        self.assertEqual(histograms.mean(counts), Decimal('3.00'))
+        self.assertEqual(histograms.median(counts), Decimal('3'))
+        self.assertEqual(histograms.median([0, 1, 0, 0, 2]), Decimal('5'))
+        self.assertEqual(histograms.median([0, 1, 0, 1, 0]), Decimal('3'))
+        self.assertEqual(
+            [histograms.percentile(counts, q) for q in (0, 25, 75, 90, 100)],
+            [1, 1, 3, 5, 5]
+        )
+
+    def test_empty_histogram(self):
+        summary = histograms.summarize([0] * 5)
+        self.assertEqual(summary['total'], 0)
+        self.assertEqual(
+            [summary[key] for key in ('average', 'median', 'p25', 'p75', 'p90')],
+            [None] * 5
+        )
+
+    def test_every_dimension_is_kept_in_step_and_exposed(self):
+        restaurant_id = uuid.uuid4()
+        review = make_review(restaurant_id, overall_rating=5, food_rating=4, service_rating=2)
+        make_review(restaurant_id, overall_rating=3, food_rating=4)
+        item = ItemReview.objects.create(review=review, menu_item_id=uuid.uuid4(), rating=5)
+        item.rating = 2
+        item.save()
+        self.assertMatchesRebuild(restaurant_id)
+
+        cache.clear()
+        response = APIClient().get(reverse('restaurant-analytics', args=[restaurant_id]))
+        histogram = response.data['rating_histograms']
+        self.assertEqual(histogram['food']['counts'], {1: 0, 2: 0, 3: 0, 4: 2, 5: 0})
+        self.assertEqual(histogram['service']['total'], 1)
+        self.assertEqual(histogram['ambiance']['median'], None)
+        self.assertEqual(histogram['item']['counts'], {1: 0, 2: 1, 3: 0, 4: 0, 5: 0})
+        self.assertEqual(histogram['overall']['median'], Decimal('4'))
+
+
+class WiringTests(TestCase):
+    def test_urls_are_mounted_under_ratings(self):
+        self.assertEqual(reverse('review-list'), '/ratings/reviews/')
+        self.assertEqual(reverse('api-review-list'), '/ratings/api/v1/reviews/')
+        self.assertEqual(
+            reverse('api-restaurant-analytics', args=[uuid.UUID(int=1)]),
+            f'/ratings/api/v1/restaurants/{uuid.UUID(int=1)}/analytics/'
+        )
+
+    def test_worker_boot_does_not_load_heavy_modules(self):
+        output = subprocess.run(
+            [sys.executable, '-c', BOOT_SCRIPT], env=dict(os.environ), capture_output=True, text=True, check=True
+        ).stdout.split()
+        self.assertEqual(output[1], '-')
+
+
+class ModerationVisibilityTests(TestCase):
+    def setUp(self):
+        self.restaurant_id = uuid.uuid4()
+        make_review(self.restaurant_id)
+        self.quarantined = make_review(
+            self.restaurant_id, moderation_status=Review.ModerationStatus.QUARANTINED,
+            moderation_reason=Review.ModerationReason.NEAR_DUPLICATE
+        )
+        self.url = reverse('review-list')
+
+    def test_anonymous_requests_for_held_back_reviews_are_refused(self):
+        client = APIClient()
+        for moderation_status in ('quarantined', 'rejected'):
+            response = client.get(self.url, {'moderation_status': moderation_status})
+            self.assertEqual(response.status_code, 403)
+
+        response = client.get(self.url, {'restaurant_id': self.restaurant_id})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_authenticated_users_need_to_be_moderators(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user('diner'))
+        self.assertEqual(client.get(self.url, {'moderation_status': 'quarantined'}).status_code, 403)
+
+        client.force_authenticate(User.objects.create_user('staff', is_staff=True))
+        response = client.get(self.url, {'moderation_status': 'quarantined'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row['id'] for row in response.data['results']], [str(self.quarantined.pk)])
+
+        moderator = User.objects.create_user('moderator')
+        moderator.user_permissions.add(
+            Permission.objects.get(content_type__app_label='rattingapp', codename='change_review')
+        )
+        client.force_authenticate(moderator)
+        self.assertEqual(client.get(self.url, {'moderation_status': 'quarantined'}).status_code, 200)
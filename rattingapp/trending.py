@@ -0,0 +1,281 @@
+import operator
+from collections import deque
+from datetime import datetime, time, timedelta
+from functools import reduce
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum, Case, When, IntegerField, F, Q, FloatField, ExpressionWrapper
+from django.db.models.functions import Coalesce, TruncDate, TruncWeek, TruncMonth
+from django.utils import timezone
+from .models import Review, RestaurantDailyStats
+
+
+# Counters kept per day; a subset of the ReviewAnalytics counters with the same names
+DAILY_COUNTERS = [
+    'total_reviews',
+    'overall_rating_sum',
+    'food_rating_sum', 'food_rating_count',
+    'service_rating_sum', 'service_rating_count',
+    'ambiance_rating_sum', 'ambiance_rating_count',
+    'positive_sentiment_count', 'neutral_sentiment_count', 'negative_sentiment_count',
+]
+
+# Thresholds a restaurant has to meet within the window to be listed
+TRENDING_MIN_REVIEWS = 5
+TRENDING_MIN_AVERAGE = 4.0
+
+
+def review_day(review):
+    return timezone.localdate(review.created_at)
+
+
+def daily_contribution(contribution):
+    """
+    The part of a review's analytics contribution that goes into its
+    restaurant's bucket for the day it was posted
+    """
+    return {field: value for field, value in contribution.items() if field in DAILY_COUNTERS}
+
+
+def apply_daily_delta(restaurant_id, day, delta):
+    """
+    Add a counter delta to one (restaurant, day) bucket with a single
+    UPDATE ... SET x = x + n, creating the bucket on its first review (or
+    rebuilding it when the delta takes counts out of a missing bucket)
+    """
+    delta = {field: value for field, value in delta.items() if value}
+    if not delta:
+        return
+
+    updates = {field: F(field) + value for field, value in delta.items()}
+    buckets = RestaurantDailyStats.objects.filter(restaurant_id=restaurant_id, day=day)
+    if buckets.update(**updates):
+        return
+
+    if any(value < 0 for value in delta.values()):
+        # Taking a review out of a bucket that does not exist means the
+        # bucket drifted; creating it would store negative counters
+        rebuild_daily_buckets([(restaurant_id, day)])
+        return
+
+    try:
+        with transaction.atomic():
+            RestaurantDailyStats.objects.create(restaurant_id=restaurant_id, day=day, **delta)
+    except IntegrityError:
+        # Another writer created the bucket first
+        buckets.update(**updates)
+
+
+def _daily_rows(reviews):
+    """Daily bucket counters of a review queryset, one row per restaurant and day"""
+    return reviews.annotate(day=TruncDate('created_at')).values('restaurant_id', 'day').annotate(
+        total_reviews=Count('id'),
+        overall_rating_sum=Sum('overall_rating'),
+        food_rating_sum=Coalesce(Sum('food_rating'), 0),
+        food_rating_count=Count('food_rating'),
+        service_rating_sum=Coalesce(Sum('service_rating'), 0),
+        service_rating_count=Count('service_rating'),
+        ambiance_rating_sum=Coalesce(Sum('ambiance_rating'), 0),
+        ambiance_rating_count=Count('ambiance_rating'),
+        positive_sentiment_count=Count(Case(
+            When(sentiment_score__gte=0.1, then=1),
+            output_field=IntegerField()
+        )),
+        neutral_sentiment_count=Count(Case(
+            When(sentiment_score__lt=0.1, sentiment_score__gt=-0.1, then=1),
+            output_field=IntegerField()
+        )),
+        negative_sentiment_count=Count(Case(
+            When(sentiment_score__lte=-0.1, then=1),
+            output_field=IntegerField()
+        )),
+    ).order_by()
+
+
+def rebuild_daily_stats(restaurant_ids=None, batch_size=1000):
+    """
+    Rebuild daily buckets from the reviews themselves, for all restaurants
+    or only the given ones. Returns the number of buckets written.
+    """
+    reviews = Review.objects.filter(moderation_status=Review.ModerationStatus.APPROVED)
+    stale = RestaurantDailyStats.objects.all()
+    if restaurant_ids is not None:
+        reviews = reviews.filter(restaurant_id__in=restaurant_ids)
+        stale = stale.filter(restaurant_id__in=restaurant_ids)
+
+    rows = _daily_rows(reviews)
+    written = 0
+    with transaction.atomic():
+        stale.delete()
+        batch = []
+        for row in rows.iterator(chunk_size=batch_size):
+            batch.append(RestaurantDailyStats(**row))
+            if len(batch) >= batch_size:
+                RestaurantDailyStats.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            RestaurantDailyStats.objects.bulk_create(batch)
+            written += len(batch)
+    return written
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def rebuild_daily_buckets(buckets, batch_size=100):
+    """
+    Rebuild only the given (restaurant_id, day) buckets from their reviews,
+    `batch_size` buckets per query. Each bucket's reviews are read through
+    the (restaurant_id, -created_at) index. Returns the number of buckets
+    written.
+    """
+    buckets = sorted(set(buckets))
+    written = 0
+    for start in range(0, len(buckets), batch_size):
+        batch = buckets[start:start + batch_size]
+        reviews = Review.objects.filter(
+            reduce(operator.or_, (
+                Q(restaurant_id=restaurant_id, created_at__gte=_day_start(day),
+                  created_at__lt=_day_start(day + timedelta(days=1)))
+                for restaurant_id, day in batch
+            )),
+            moderation_status=Review.ModerationStatus.APPROVED
+        )
+        stale = RestaurantDailyStats.objects.filter(reduce(operator.or_, (
+            Q(restaurant_id=restaurant_id, day=day) for restaurant_id, day in batch
+        )))
+        rows = [RestaurantDailyStats(**row) for row in _daily_rows(reviews)]
+        with transaction.atomic():
+            stale.delete()
+            RestaurantDailyStats.objects.bulk_create(rows)
+        written += len(rows)
+    return written
+
+
+def trending_cache_key(days, limit):
+    return f'rattingapp:trending:{days}:{limit}'
+
+
+def compute_trending(days, limit):
+    """
+    Restaurants with the most positive reviews over the last `days` days
+    (today included), summed from the daily buckets
+    """
+    since = timezone.localdate() - timedelta(days=days - 1)
+    trending = RestaurantDailyStats.objects.filter(day__gte=since).values('restaurant_id').annotate(
+        recent_reviews=Sum('total_reviews'),
+        positive_sentiment=Sum('positive_sentiment_count'),
+        avg_rating=ExpressionWrapper(
+            Sum('overall_rating_sum') * 1.0 / Sum('total_reviews'), output_field=FloatField()
+        ),
+    ).filter(
+        recent_reviews__gte=TRENDING_MIN_REVIEWS,
+        avg_rating__gte=TRENDING_MIN_AVERAGE,
+    ).order_by('-positive_sentiment', '-avg_rating', 'restaurant_id')[:limit]
+    return list(trending)
+
+
+def cached_trending(days=None, limit=None):
+    """
+    Cached top-N trending restaurants for one of the configured windows.
+    The list is only refreshed when the cache entry expires.
+    """
+    days = days or settings.REVIEW_TRENDING_DEFAULT_DAYS
+    limit = limit or settings.REVIEW_TRENDING_DEFAULT_LIMIT
+    key = trending_cache_key(days, limit)
+    trending = cache.get(key)
+    if trending is None:
+        trending = compute_trending(days, limit)
+        cache.set(key, trending, settings.REVIEW_TRENDING_CACHE_SECONDS)
+    return trending
+
+
+# Bucket day -> period start, per granularity
+TREND_PERIODS = {
+    'day': F,
+    'week': TruncWeek,
+    'month': TruncMonth,
+}
+
+
+def _period_start(day, granularity):
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_period(start, granularity):
+    if granularity == 'week':
+        return start + timedelta(days=7)
+    if granularity == 'month':
+        return (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+def _average(total, count):
+    return round(total / count, 2) if count else None
+
+
+def rating_trends(restaurant_id, granularity='day', date_from=None, date_to=None, window=7):
+    """
+    Rating and sentiment series for a restaurant at day, week or month
+    granularity, read from the daily buckets (one grouped query; a year of
+    days is at most 365 rows).
+
+    Periods without reviews are filled in with zero counts so the series is
+    continuous, and `overall_moving_average` is the review-weighted average
+    of the last `window` periods, computed from running sums in one pass.
+    """
+    date_to = date_to or timezone.localdate()
+    buckets = RestaurantDailyStats.objects.filter(restaurant_id=restaurant_id, day__lte=date_to)
+    if date_from is not None:
+        buckets = buckets.filter(day__gte=date_from)
+
+    rows = {
+        row['period']: row
+        for row in buckets.annotate(period=TREND_PERIODS[granularity]('day')).values('period').annotate(
+            **{field: Sum(field) for field in DAILY_COUNTERS}
+        ).order_by()
+    }
+    if not rows:
+        return []
+
+    periods = sorted(rows)
+    current = _period_start(date_from, granularity) if date_from is not None else periods[0]
+    last = _period_start(date_to, granularity)
+    empty = dict.fromkeys(DAILY_COUNTERS, 0)
+
+    series = []
+    running_sum = running_count = 0
+    window_rows = deque()
+    while current <= last:
+        row = rows.get(current, empty)
+        window_rows.append(row)
+        running_sum += row['overall_rating_sum']
+        running_count += row['total_reviews']
+        if len(window_rows) > window:
+            dropped = window_rows.popleft()
+            running_sum -= dropped['overall_rating_sum']
+            running_count -= dropped['total_reviews']
+
+        series.append({
+            'period': current,
+            'total_reviews': row['total_reviews'],
+            'average_overall_rating': _average(row['overall_rating_sum'], row['total_reviews']),
+            'average_food_rating': _average(row['food_rating_sum'], row['food_rating_count']),
+            'average_service_rating': _average(row['service_rating_sum'], row['service_rating_count']),
+            'average_ambiance_rating': _average(row['ambiance_rating_sum'], row['ambiance_rating_count']),
+            'overall_moving_average': _average(running_sum, running_count),
+            'sentiment': {
+                'positive': row['positive_sentiment_count'],
+                'neutral': row['neutral_sentiment_count'],
+                'negative': row['negative_sentiment_count'],
+            },
+        })
+        current = _next_period(current, granularity)
+    return series
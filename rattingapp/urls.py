@@ -7,14 +7,22 @@ urlpatterns = [
     # Review endpoints
     path('reviews/', views.ReviewListView.as_view(), name='review-list'),
     path('reviews/create/', views.ReviewCreateView.as_view(), name='review-create'),
+    path('reviews/import/', views.bulk_import_reviews, name='review-bulk-import'),
+    path('reviews/search/', views.search_reviews, name='review-search'),
     path('reviews/<uuid:pk>/', views.ReviewDetailView.as_view(), name='review-detail'),
     
     # Item review endpoints
     path('item-reviews/', views.ItemReviewListCreateView.as_view(), name='item-review-list-create'),
+    path('menu-items/ratings/', views.MenuItemRatingListView.as_view(), name='menu-item-rating-list'),
+    path('menu-items/<uuid:menu_item_id>/rating/', views.MenuItemRatingDetailView.as_view(), name='menu-item-rating'),
     
     # Restaurant analytics and summary endpoints
+    path('restaurants/analytics/', views.batch_restaurant_analytics, name='restaurant-analytics-batch'),
     path('restaurants/<uuid:restaurant_id>/analytics/', views.RestaurantAnalyticsView.as_view(), name='restaurant-analytics'),
     path('restaurants/<uuid:restaurant_id>/summary/', views.restaurant_review_summary, name='restaurant-summary'),
+    path('restaurants/<uuid:restaurant_id>/top-items/', views.RestaurantTopItemsView.as_view(), name='restaurant-top-items'),
+    path('restaurants/<uuid:restaurant_id>/keywords/', views.restaurant_review_keywords, name='restaurant-keywords'),
+    path('restaurants/<uuid:restaurant_id>/trends/', views.restaurant_rating_trends, name='restaurant-trends'),
     
     # Utility endpoints
     path('trending-restaurants/', views.trending_restaurants, name='trending-restaurants'),
@@ -26,6 +34,8 @@ restful_urlpatterns = [
     # Review CRUD operations
     path('api/v1/reviews/', views.ReviewListView.as_view(), name='api-review-list'),
     path('api/v1/reviews/create/', views.ReviewCreateView.as_view(), name='api-review-create'),
+    path('api/v1/reviews/import/', views.bulk_import_reviews, name='api-review-bulk-import'),
+    path('api/v1/reviews/search/', views.search_reviews, name='api-review-search'),
     path('api/v1/reviews/<uuid:pk>/', views.ReviewDetailView.as_view(), name='api-review-detail'),
     path('api/v1/reviews/<uuid:pk>/update/', views.ReviewDetailView.as_view(), name='api-review-update'),
     path('api/v1/reviews/<uuid:pk>/delete/', views.ReviewDetailView.as_view(), name='api-review-delete'),
@@ -33,17 +43,23 @@ restful_urlpatterns = [
     # Item reviews
     path('api/v1/item-reviews/', views.ItemReviewListCreateView.as_view(), name='api-item-review-list'),
     path('api/v1/item-reviews/create/', views.ItemReviewListCreateView.as_view(), name='api-item-review-create'),
+    path('api/v1/menu-items/ratings/', views.MenuItemRatingListView.as_view(), name='api-menu-item-rating-list'),
+    path('api/v1/menu-items/<uuid:menu_item_id>/rating/', views.MenuItemRatingDetailView.as_view(), name='api-menu-item-rating'),
     
     # Restaurant-specific endpoints
+    path('api/v1/restaurants/analytics/', views.batch_restaurant_analytics, name='api-restaurant-analytics-batch'),
     path('api/v1/restaurants/<uuid:restaurant_id>/reviews/', views.ReviewListView.as_view(), name='api-restaurant-reviews'),
     path('api/v1/restaurants/<uuid:restaurant_id>/analytics/', views.RestaurantAnalyticsView.as_view(), name='api-restaurant-analytics'),
     path('api/v1/restaurants/<uuid:restaurant_id>/summary/', views.restaurant_review_summary, name='api-restaurant-summary'),
+    path('api/v1/restaurants/<uuid:restaurant_id>/top-items/', views.RestaurantTopItemsView.as_view(), name='api-restaurant-top-items'),
+    path('api/v1/restaurants/<uuid:restaurant_id>/keywords/', views.restaurant_review_keywords, name='api-restaurant-keywords'),
+    path('api/v1/restaurants/<uuid:restaurant_id>/trends/', views.restaurant_rating_trends, name='api-restaurant-trends'),
     
     # Analytics and reporting
     path('api/v1/analytics/trending-restaurants/', views.trending_restaurants, name='api-trending-restaurants'),
     path('api/v1/analytics/sentiment-analysis/', views.batch_sentiment_analysis, name='api-batch-sentiment'),
 ]
 
-# You can use either urlpatterns or restful_urlpatterns depending on your preference
-# For main app urls.py, include like this:
-# path('reviews/', include('reviews.urls')),
\ No newline at end of file
+# Both sets are mounted under the project's ratings/ prefix (crm_data_receiver/urls.py):
+# path('ratings/', include('rattingapp.urls')),
+# path('ratings/', include(restful_urlpatterns)),
\ No newline at end of file
@@ -1,22 +1,45 @@
 from rest_framework import generics, status, filters
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
-from rest_framework.permissions import AllowAny
-from django.db.models import Q, Avg, Count, Case, When, IntegerField
-from django.db.models.functions import Round
+from rest_framework.permissions import AllowAny, IsAdminUser
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.pagination import CursorPagination
+from django.conf import settings
 from django_filters.rest_framework import DjangoFilterBackend
-from django.utils import timezone
-from datetime import timedelta
 import uuid
+from datetime import datetime, timedelta
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.gzip import gzip_page
 
-from .models import Review, ItemReview, ReviewAnalytics
+from .cache import (
+    get_cached_summary, set_cached_summary, get_cached_analytics, set_cached_analytics,
+    get_many_cached_analytics, set_many_cached_analytics
+)
+from .filters import IndexedCommentSearchFilter
+from .importer import import_reviews
+from .item_ratings import top_items
+from .keywords import restaurant_keywords
+from .models import Review, ItemReview, ReviewAnalytics, MenuItemRating, RestaurantKeyword
+from .trending import cached_trending, rating_trends, TREND_PERIODS
+from .search import ranked_review_ids
+from .sentiment import backfill_sentiment
 from .serializers import (
     ReviewCreateSerializer, ReviewListSerializer, ReviewUpdateSerializer,
-    ItemReviewSerializer, ReviewAnalyticsSerializer,
+    ItemReviewSerializer, ReviewAnalyticsSerializer, MenuItemRatingSerializer,
     RestaurantReviewSummarySerializer, ReviewFilterSerializer
 )
 
 
+# Reviews scored per call of the synchronous batch sentiment endpoint
+BATCH_SENTIMENT_DEFAULT_LIMIT = 500
+BATCH_SENTIMENT_MAX_LIMIT = 5000
+
+# Restaurants accepted per call of the batch analytics endpoint
+BATCH_ANALYTICS_MAX_RESTAURANTS = 100
+
+
 class ReviewCreateView(generics.CreateAPIView):
     """
     Create a new review with optional item reviews
@@ -27,75 +50,66 @@ class ReviewCreateView(generics.CreateAPIView):
     
     def perform_create(self, serializer):
         """
-        Save review and update analytics
-        """
-        review = serializer.save()
-        self.update_restaurant_analytics(review.restaurant_id)
-    
-    def update_restaurant_analytics(self, restaurant_id):
+        Save review; analytics are updated incrementally by the post_save signal
         """
-        Update or create analytics for the restaurant
-        """
-        try:
-            reviews = Review.objects.filter(restaurant_id=restaurant_id)
-            
-            # Calculate aggregates
-            analytics_data = reviews.aggregate(
-                total_reviews=Count('id'),
-                avg_overall=Avg('overall_rating'),
-                avg_food=Avg('food_rating'),
-                avg_service=Avg('service_rating'),
-                avg_ambiance=Avg('ambiance_rating'),
-                positive_count=Count(Case(
-                    When(sentiment_score__gte=0.1, then=1),
-                    output_field=IntegerField()
-                )),
-                neutral_count=Count(Case(
-                    When(sentiment_score__lt=0.1, sentiment_score__gt=-0.1, then=1),
-                    output_field=IntegerField()
-                )),
-                negative_count=Count(Case(
-                    When(sentiment_score__lte=-0.1, then=1),
-                    output_field=IntegerField()
-                ))
-            )
-            
-            # Update or create analytics
-            analytics, created = ReviewAnalytics.objects.update_or_create(
-                restaurant_id=restaurant_id,
-                defaults={
-                    'total_reviews': analytics_data['total_reviews'],
-                    'average_overall_rating': Round(analytics_data['avg_overall'] or 0, 2),
-                    'average_food_rating': Round(analytics_data['avg_food'] or 0, 2) if analytics_data['avg_food'] else None,
-                    'average_service_rating': Round(analytics_data['avg_service'] or 0, 2) if analytics_data['avg_service'] else None,
-                    'average_ambiance_rating': Round(analytics_data['avg_ambiance'] or 0, 2) if analytics_data['avg_ambiance'] else None,
-                    'positive_sentiment_count': analytics_data['positive_count'],
-                    'neutral_sentiment_count': analytics_data['neutral_count'],
-                    'negative_sentiment_count': analytics_data['negative_count'],
-                }
-            )
-        except Exception as e:
-            print(f"Error updating analytics: {e}")
+        serializer.save()
+
+
+def can_moderate(user):
+    """Staff and users allowed to change reviews may see reviews held back by moderation"""
+    return user.is_authenticated and (user.is_staff or user.has_perm('rattingapp.change_review'))
+
+
+class ReviewCursorPagination(CursorPagination):
+    """
+    Keyset pagination: each page seeks past the last row of the previous
+    one through the (restaurant_id, created_at) index instead of counting
+    and skipping every earlier row
+    """
+    ordering = '-created_at'
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
 
 
 class ReviewListView(generics.ListAPIView):
     """
-    List reviews with filtering and searching capabilities
+    List reviews with filtering and searching capabilities.
+
+    Pages are cursor based (follow `next`/`previous`). Item reviews are only
+    loaded and returned with `include=item_reviews`. Only approved reviews
+    are listed unless a moderator (staff, or a user allowed to change
+    reviews) asks for quarantined or rejected ones with `moderation_status`.
     """
-    queryset = Review.objects.all().prefetch_related('item_reviews')
+    queryset = Review.objects.all()
     serializer_class = ReviewListSerializer
     permission_classes = [AllowAny]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    pagination_class = ReviewCursorPagination
+    filter_backends = [DjangoFilterBackend, IndexedCommentSearchFilter, filters.OrderingFilter]
     filterset_fields = ['restaurant_id', 'overall_rating', 'is_anonymous']
     search_fields = ['comment']
-    ordering_fields = ['created_at', 'overall_rating', 'sentiment_score']
+    # Cursor pagination needs non-null ordering columns
+    ordering_fields = ['created_at', 'overall_rating']
     ordering = ['-created_at']
+
+    def include_item_reviews(self):
+        return 'item_reviews' in self.request.query_params.get('include', '').split(',')
+
+    def get_serializer(self, *args, **kwargs):
+        kwargs.setdefault('include_item_reviews', self.include_item_reviews())
+        return super().get_serializer(*args, **kwargs)
     
     def get_queryset(self):
         """
         Filter queryset based on query parameters
         """
         queryset = super().get_queryset()
+        if self.include_item_reviews():
+            queryset = queryset.prefetch_related('item_reviews')
+
+        # Restaurant scoped route (api/v1/restaurants/<restaurant_id>/reviews/)
+        if 'restaurant_id' in self.kwargs:
+            queryset = queryset.filter(restaurant_id=self.kwargs['restaurant_id'])
         
         # Custom filtering
         min_rating = self.request.query_params.get('min_rating')
@@ -104,6 +118,13 @@ class ReviewListView(generics.ListAPIView):
         date_from = self.request.query_params.get('date_from')
         date_to = self.request.query_params.get('date_to')
         has_comment = self.request.query_params.get('has_comment')
+        moderation_status = self.request.query_params.get('moderation_status', Review.ModerationStatus.APPROVED)
+
+        if moderation_status not in Review.ModerationStatus.values:
+            raise ValidationError({'error': f'moderation_status must be one of {Review.ModerationStatus.values}'})
+        if moderation_status != Review.ModerationStatus.APPROVED and not can_moderate(self.request.user):
+            raise PermissionDenied('Only moderators can list quarantined or rejected reviews')
+        queryset = queryset.filter(moderation_status=moderation_status)
         
         if min_rating:
             queryset = queryset.filter(overall_rating__gte=min_rating)
@@ -118,6 +139,8 @@ class ReviewListView(generics.ListAPIView):
                 queryset = queryset.filter(sentiment_score__lte=-0.1)
             elif sentiment == 'neutral':
                 queryset = queryset.filter(sentiment_score__lt=0.1, sentiment_score__gt=-0.1)
+            elif sentiment == 'pending':
+                queryset = queryset.filter(sentiment_status=Review.SentimentStatus.PENDING)
         
         if date_from:
             queryset = queryset.filter(created_at__gte=date_from)
@@ -126,14 +149,42 @@ class ReviewListView(generics.ListAPIView):
             queryset = queryset.filter(created_at__lte=date_to)
         
         if has_comment is not None:
-            if has_comment.lower() == 'true':
-                queryset = queryset.exclude(Q(comment__isnull=True) | Q(comment=''))
-            else:
-                queryset = queryset.filter(Q(comment__isnull=True) | Q(comment=''))
+            queryset = queryset.filter(has_comment=has_comment.lower() == 'true')
         
         return queryset
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def search_reviews(request):
+    """
+    Relevance ranked search over review comments, served from the comment
+    index: ?q= plus optional ?restaurant_id= and ?limit= (max 100)
+    """
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        restaurant_id = request.query_params.get('restaurant_id')
+        if restaurant_id:
+            restaurant_id = uuid.UUID(restaurant_id)
+    except ValueError:
+        return Response(
+            {'error': 'limit must be an integer and restaurant_id a UUID'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    ranked = ranked_review_ids(query, restaurant_id=restaurant_id, limit=limit)
+    reviews = Review.objects.in_bulk([pk for pk, score in ranked])
+    results = []
+    for pk, score in ranked:
+        if pk in reviews:
+            data = ReviewListSerializer(reviews[pk], include_item_reviews=False).data
+            results.append(dict(data, score=round(score, 4)))
+    return Response({'query': query, 'count': len(results), 'results': results})
+
+
 class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     """
     Retrieve, update, or delete a specific review
@@ -148,64 +199,15 @@ class ReviewDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def perform_update(self, serializer):
         """
-        Update review and refresh analytics
+        Update review; analytics are adjusted by the review signals
         """
-        review = serializer.save()
-        self.update_restaurant_analytics(review.restaurant_id)
+        serializer.save()
     
     def perform_destroy(self, instance):
         """
-        Delete review and refresh analytics
+        Delete review; analytics are adjusted by the review signals
         """
-        restaurant_id = instance.restaurant_id
         instance.delete()
-        self.update_restaurant_analytics(restaurant_id)
-    
-    def update_restaurant_analytics(self, restaurant_id):
-        """Same as in ReviewCreateView"""
-        try:
-            reviews = Review.objects.filter(restaurant_id=restaurant_id)
-            
-            if not reviews.exists():
-                # Delete analytics if no reviews left
-                ReviewAnalytics.objects.filter(restaurant_id=restaurant_id).delete()
-                return
-            
-            analytics_data = reviews.aggregate(
-                total_reviews=Count('id'),
-                avg_overall=Avg('overall_rating'),
-                avg_food=Avg('food_rating'),
-                avg_service=Avg('service_rating'),
-                avg_ambiance=Avg('ambiance_rating'),
-                positive_count=Count(Case(
-                    When(sentiment_score__gte=0.1, then=1),
-                    output_field=IntegerField()
-                )),
-                neutral_count=Count(Case(
-                    When(sentiment_score__lt=0.1, sentiment_score__gt=-0.1, then=1),
-                    output_field=IntegerField()
-                )),
-                negative_count=Count(Case(
-                    When(sentiment_score__lte=-0.1, then=1),
-                    output_field=IntegerField()
-                ))
-            )
-            
-            ReviewAnalytics.objects.update_or_create(
-                restaurant_id=restaurant_id,
-                defaults={
-                    'total_reviews': analytics_data['total_reviews'],
-                    'average_overall_rating': Round(analytics_data['avg_overall'] or 0, 2),
-                    'average_food_rating': Round(analytics_data['avg_food'] or 0, 2) if analytics_data['avg_food'] else None,
-                    'average_service_rating': Round(analytics_data['avg_service'] or 0, 2) if analytics_data['avg_service'] else None,
-                    'average_ambiance_rating': Round(analytics_data['avg_ambiance'] or 0, 2) if analytics_data['avg_ambiance'] else None,
-                    'positive_sentiment_count': analytics_data['positive_count'],
-                    'neutral_sentiment_count': analytics_data['neutral_count'],
-                    'negative_sentiment_count': analytics_data['negative_count'],
-                }
-            )
-        except Exception as e:
-            print(f"Error updating analytics: {e}")
 
 
 class ItemReviewListCreateView(generics.ListCreateAPIView):
@@ -232,30 +234,170 @@ class ItemReviewListCreateView(generics.ListCreateAPIView):
         return queryset.order_by('-created_at')
 
 
+class MenuItemRatingListView(generics.ListAPIView):
+    """
+    Rating rollups for many menu items at once, by restaurant_id and/or a
+    comma separated menu_item_ids list
+    """
+    serializer_class = MenuItemRatingSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        queryset = MenuItemRating.objects.all()
+        restaurant_id = self.request.query_params.get('restaurant_id')
+        menu_item_ids = self.request.query_params.get('menu_item_ids')
+
+        if restaurant_id:
+            queryset = queryset.filter(restaurant_id=restaurant_id)
+
+        if menu_item_ids:
+            queryset = queryset.filter(menu_item_id__in=[value for value in menu_item_ids.split(',') if value])
+
+        return queryset.order_by('menu_item_id')
+
+
+class MenuItemRatingDetailView(generics.RetrieveAPIView):
+    """
+    Rating rollup for a single menu item
+    """
+    queryset = MenuItemRating.objects.all()
+    serializer_class = MenuItemRatingSerializer
+    permission_classes = [AllowAny]
+    lookup_field = 'menu_item_id'
+
+
+class RestaurantTopItemsView(generics.ListAPIView):
+    """
+    Best rated menu items of a restaurant (optional `limit` and `min_ratings`)
+    """
+    serializer_class = MenuItemRatingSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        try:
+            limit = max(1, min(int(self.request.query_params.get('limit', 10)), 100))
+            min_ratings = int(self.request.query_params.get('min_ratings', 2))
+        except ValueError:
+            raise ValidationError({'error': 'limit and min_ratings must be integers'})
+        return top_items(self.kwargs['restaurant_id'], limit=limit, min_ratings=min_ratings)
+
+
+def analytics_etag(restaurant_id, last_updated):
+    return quote_etag(f'{restaurant_id}-{last_updated.timestamp():.6f}')
+
+
 class RestaurantAnalyticsView(generics.RetrieveAPIView):
     """
-    Get analytics for a specific restaurant
+    Get analytics for a specific restaurant.
+
+    The serialized payload is cached per restaurant until the next review
+    write. Responses carry an ETag and Last-Modified taken from
+    `last_updated`, so polling clients revalidate with If-None-Match /
+    If-Modified-Since and get a 304 while nothing changed.
     """
     queryset = ReviewAnalytics.objects.all()
     serializer_class = ReviewAnalyticsSerializer
     permission_classes = [AllowAny]
     lookup_field = 'restaurant_id'
 
+    def retrieve(self, request, *args, **kwargs):
+        restaurant_id = str(self.kwargs['restaurant_id'])
+        entry = get_cached_analytics(restaurant_id)
+        if entry is None:
+            instance = self.get_object()
+            entry = {'data': dict(self.get_serializer(instance).data), 'last_updated': instance.last_updated}
+            set_cached_analytics(restaurant_id, entry)
+
+        etag = analytics_etag(restaurant_id, entry['last_updated'])
+        last_modified = int(entry['last_updated'].timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = Response(entry['data'])
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(last_modified)
+        # Clients may keep the body but must revalidate before reusing it
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+def batch_restaurant_ids(request):
+    """Requested restaurant ids in order, without duplicates (raises ValidationError)"""
+    if request.method == 'POST':
+        values = request.data.get('restaurant_ids') if hasattr(request.data, 'get') else None
+    else:
+        values = request.query_params.get('restaurant_ids', '').split(',')
+    if not isinstance(values, list):
+        raise ValidationError({'error': 'restaurant_ids must be a list of UUIDs'})
+
+    values = [str(value).strip() for value in values]
+    try:
+        restaurant_ids = list(dict.fromkeys(str(uuid.UUID(value)) for value in values if value))
+    except ValueError:
+        raise ValidationError({'error': 'restaurant_ids must be a list of UUIDs'})
+    if not restaurant_ids:
+        raise ValidationError({'error': 'restaurant_ids is required'})
+    if len(restaurant_ids) > BATCH_ANALYTICS_MAX_RESTAURANTS:
+        raise ValidationError({'error': f'At most {BATCH_ANALYTICS_MAX_RESTAURANTS} restaurant_ids per request'})
+    return restaurant_ids
+
+
+@gzip_page
+@api_view(['GET', 'POST'])
+@permission_classes([AllowAny])
+def batch_restaurant_analytics(request):
+    """
+    Analytics for many restaurants in one call: ?restaurant_ids=<id>,<id>
+    or a POST body {"restaurant_ids": [...]}, at most
+    BATCH_ANALYTICS_MAX_RESTAURANTS. Cached entries are reused, the rest
+    are read with one query; restaurants without reviews come back with
+    empty analytics. Results follow the requested order.
+    """
+    restaurant_ids = batch_restaurant_ids(request)
+
+    entries = get_many_cached_analytics(restaurant_ids)
+    missing = [restaurant_id for restaurant_id in restaurant_ids if restaurant_id not in entries]
+    if missing:
+        fetched = {
+            str(analytics.restaurant_id): {
+                'data': dict(ReviewAnalyticsSerializer(analytics).data),
+                'last_updated': analytics.last_updated,
+            }
+            for analytics in ReviewAnalytics.objects.filter(restaurant_id__in=missing)
+        }
+        set_many_cached_analytics(fetched)
+        entries.update(fetched)
+
+    results = [
+        entries[restaurant_id]['data'] if restaurant_id in entries
+        else ReviewAnalyticsSerializer(ReviewAnalytics(restaurant_id=restaurant_id)).data
+        for restaurant_id in restaurant_ids
+    ]
+    return Response({'count': len(results), 'results': results})
+
 
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def restaurant_review_summary(request, restaurant_id):
     """
-    Get comprehensive review summary for a restaurant
+    Get comprehensive review summary for a restaurant.
+
+    Totals, distribution and sentiment come from the maintained analytics
+    row; only the recent reviews (with their items) and the top items are
+    queried. The whole payload is cached per restaurant and dropped on
+    review writes.
     """
     try:
         # Validate restaurant_id
-        uuid.UUID(restaurant_id)  # This will raise ValueError if invalid
-        
-        reviews = Review.objects.filter(restaurant_id=restaurant_id).prefetch_related('item_reviews')
-        
-        if not reviews.exists():
-            return Response({
+        restaurant_id = str(uuid.UUID(str(restaurant_id)))  # This will raise ValueError if invalid
+
+        data = get_cached_summary(restaurant_id)
+        if data is not None:
+            return Response(data)
+
+        analytics = ReviewAnalytics.objects.filter(restaurant_id=restaurant_id).first()
+
+        if analytics is None or not analytics.total_reviews:
+            data = {
                 'restaurant_id': restaurant_id,
                 'total_reviews': 0,
                 'average_overall_rating': 0,
@@ -263,49 +405,37 @@ def restaurant_review_summary(request, restaurant_id):
                 'recent_reviews': [],
                 'top_rated_items': [],
                 'sentiment_summary': {'positive': 0, 'neutral': 0, 'negative': 0}
-            })
-        
-        # Basic stats
-        total_reviews = reviews.count()
-        average_rating = reviews.aggregate(avg=Avg('overall_rating'))['avg']
-        
-        # Rating distribution
-        rating_dist = reviews.values('overall_rating').annotate(
-            count=Count('overall_rating')
-        ).order_by('overall_rating')
-        rating_distribution = {i: 0 for i in range(1, 6)}
-        for item in rating_dist:
-            rating_distribution[item['overall_rating']] = item['count']
-        
+            }
+            set_cached_summary(restaurant_id, data)
+            return Response(data)
+
         # Recent reviews (last 10)
-        recent_reviews = reviews.order_by('-created_at')[:10]
+        recent_reviews = Review.objects.filter(
+            restaurant_id=restaurant_id, moderation_status=Review.ModerationStatus.APPROVED
+        ).prefetch_related('item_reviews').order_by('-created_at')[:10]
         recent_serializer = ReviewListSerializer(recent_reviews, many=True)
-        
+
         # Top rated items
-        top_items = ItemReview.objects.filter(
-            review__restaurant_id=restaurant_id
-        ).values('menu_item_id').annotate(
-            avg_rating=Avg('rating'),
-            review_count=Count('id')
-        ).filter(review_count__gte=2).order_by('-avg_rating')[:5]
-        
-        # Sentiment summary
-        sentiment_counts = reviews.aggregate(
-            positive=Count(Case(When(sentiment_score__gte=0.1, then=1), output_field=IntegerField())),
-            neutral=Count(Case(When(sentiment_score__lt=0.1, sentiment_score__gt=-0.1, then=1), output_field=IntegerField())),
-            negative=Count(Case(When(sentiment_score__lte=-0.1, then=1), output_field=IntegerField()))
-        )
-        
+        top_rated_items = [
+            {'menu_item_id': item.menu_item_id, 'avg_rating': item.avg_rating, 'review_count': item.rating_count}
+            for item in top_items(restaurant_id)
+        ]
+
         data = {
             'restaurant_id': restaurant_id,
-            'total_reviews': total_reviews,
-            'average_overall_rating': round(average_rating, 2) if average_rating else 0,
-            'rating_distribution': rating_distribution,
+            'total_reviews': analytics.total_reviews,
+            'average_overall_rating': analytics.average_overall_rating,
+            'rating_distribution': analytics.rating_distribution,
             'recent_reviews': recent_serializer.data,
-            'top_rated_items': list(top_items),
-            'sentiment_summary': sentiment_counts
+            'top_rated_items': top_rated_items,
+            'sentiment_summary': {
+                'positive': analytics.positive_sentiment_count,
+                'neutral': analytics.neutral_sentiment_count,
+                'negative': analytics.negative_sentiment_count,
+            }
         }
-        
+        set_cached_summary(restaurant_id, data)
+
         return Response(data)
         
     except ValueError:
@@ -320,31 +450,108 @@ def restaurant_review_summary(request, restaurant_id):
         )
 
 
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def restaurant_review_keywords(request, restaurant_id):
+    """
+    Precomputed top comment keywords per sentiment bucket for a month
+    (?month=YYYY-MM, latest month by default; optional ?sentiment=)
+    """
+    month = request.query_params.get('month')
+    sentiment = request.query_params.get('sentiment')
+    if month:
+        try:
+            month = datetime.strptime(month, '%Y-%m').date()
+        except ValueError:
+            return Response(
+                {'error': 'month must be in YYYY-MM format'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+    if sentiment and sentiment not in RestaurantKeyword.Bucket.values:
+        return Response(
+            {'error': f'sentiment must be one of {RestaurantKeyword.Bucket.values}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    data = restaurant_keywords(restaurant_id, month=month or None, bucket=sentiment)
+    return Response({'restaurant_id': restaurant_id, **data})
+
+
+# Default span and moving average window per trend granularity
+TREND_DEFAULTS = {
+    'day': (timedelta(days=89), 7),
+    'week': (timedelta(weeks=51), 4),
+    'month': (None, 3),
+}
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def restaurant_rating_trends(request, restaurant_id):
+    """
+    Rating and sentiment time series from the daily rollups:
+    ?granularity=day|week|month, optional ?date_from=, ?date_to= (YYYY-MM-DD)
+    and ?window= (periods in the moving average)
+    """
+    granularity = request.query_params.get('granularity', 'day')
+    if granularity not in TREND_PERIODS:
+        return Response(
+            {'error': f'granularity must be one of {list(TREND_PERIODS)}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    span, default_window = TREND_DEFAULTS[granularity]
+
+    try:
+        date_from, date_to = [
+            datetime.strptime(value, '%Y-%m-%d').date() if value else None
+            for value in (request.query_params.get('date_from'), request.query_params.get('date_to'))
+        ]
+        window = max(1, int(request.query_params.get('window', default_window)))
+    except ValueError:
+        return Response(
+            {'error': 'Dates must be YYYY-MM-DD and window an integer'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    date_to = date_to or timezone.localdate()
+    if date_from is None and span is not None:
+        date_from = date_to - span
+
+    series = rating_trends(restaurant_id, granularity, date_from, date_to, window)
+    return Response({
+        'restaurant_id': restaurant_id,
+        'granularity': granularity,
+        'window': window,
+        'series': series,
+    })
+
+
 @api_view(['GET'])
 @permission_classes([AllowAny])
 def trending_restaurants(request):
     """
-    Get trending restaurants based on recent positive reviews
+    Get trending restaurants based on recent positive reviews.
+
+    Optional `days` (one of REVIEW_TRENDING_WINDOWS) and `limit` query
+    parameters; results come from the daily buckets and are cached.
     """
     try:
-        # Get restaurants with reviews in the last 30 days
-        thirty_days_ago = timezone.now() - timedelta(days=30)
-        
-        trending = Review.objects.filter(
-            created_at__gte=thirty_days_ago
-        ).values('restaurant_id').annotate(
-            recent_reviews=Count('id'),
-            avg_rating=Avg('overall_rating'),
-            positive_sentiment=Count(Case(
-                When(sentiment_score__gte=0.1, then=1),
-                output_field=IntegerField()
-            ))
-        ).filter(
-            recent_reviews__gte=5,  # At least 5 reviews
-            avg_rating__gte=4.0     # Average rating >= 4.0
-        ).order_by('-positive_sentiment', '-avg_rating')[:10]
-        
-        return Response(list(trending))
+        try:
+            days = int(request.query_params.get('days', settings.REVIEW_TRENDING_DEFAULT_DAYS))
+            limit = int(request.query_params.get('limit', settings.REVIEW_TRENDING_DEFAULT_LIMIT))
+        except ValueError:
+            return Response(
+                {'error': 'days and limit must be integers'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if days not in settings.REVIEW_TRENDING_WINDOWS:
+            return Response(
+                {'error': f'days must be one of {list(settings.REVIEW_TRENDING_WINDOWS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        limit = max(1, min(limit, settings.REVIEW_TRENDING_MAX_LIMIT))
+
+        return Response(cached_trending(days, limit))
         
     except Exception as e:
         return Response(
@@ -357,23 +564,20 @@ def trending_restaurants(request):
 @permission_classes([AllowAny])
 def batch_sentiment_analysis(request):
     """
-    Run sentiment analysis on reviews that don't have sentiment scores
+    Run sentiment analysis on a bounded batch of reviews that don't have
+    sentiment scores. Large backfills belong in `manage.py backfill_sentiment`,
+    which streams, parallelises and checkpoints the work.
     """
     try:
-        reviews_without_sentiment = Review.objects.filter(
-            sentiment_score__isnull=True,
-            comment__isnull=False
-        ).exclude(comment='')
-        
-        updated_count = 0
-        serializer = ReviewCreateSerializer()
-        
-        for review in reviews_without_sentiment:
-            sentiment_score = serializer.analyze_sentiment(review.comment)
-            if sentiment_score is not None:
-                review.sentiment_score = sentiment_score
-                review.save(update_fields=['sentiment_score'])
-                updated_count += 1
+        limit = min(int(request.data.get('limit', BATCH_SENTIMENT_DEFAULT_LIMIT)), BATCH_SENTIMENT_MAX_LIMIT)
+    except (TypeError, ValueError):
+        return Response(
+            {'error': 'limit must be an integer'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    
+    try:
+        updated_count = backfill_sentiment(limit=limit, resume=False)
         
         return Response({
             'message': f'Updated sentiment analysis for {updated_count} reviews',
@@ -384,4 +588,34 @@ def batch_sentiment_analysis(request):
         return Response(
             {'error': str(e)}, 
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
-        )
\ No newline at end of file
+        )
+
+
+@api_view(['POST'])
+@permission_classes([IsAdminUser])
+def bulk_import_reviews(request):
+    """
+    Bulk import reviews from an NDJSON body (one review with optional nested
+    item_reviews per line); staff only. Set `defer_sentiment=true` to leave
+    comments for the sentiment worker. Very large migrations should use
+    `manage.py import_reviews`, which reads the file directly.
+
+    Responds 201 when every row was imported, 207 when some rows were
+    rejected and 400 when none were imported; the body lists the errors.
+    """
+    stream = request.stream
+    if stream is None:
+        return Response(
+            {'error': 'Request body must contain NDJSON review lines'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    defer_sentiment = request.query_params.get('defer_sentiment', '').lower() in ('1', 'true', 'yes')
+    result = import_reviews(iter(stream.readline, b''), defer_sentiment=defer_sentiment)
+    if not result.rejected:
+        response_status = status.HTTP_201_CREATED
+    elif result.imported:
+        response_status = status.HTTP_207_MULTI_STATUS
+    else:
+        response_status = status.HTTP_400_BAD_REQUEST
+    return Response(result.as_dict(), status=response_status)
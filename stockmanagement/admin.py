@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.utils.html import format_html
 from django.urls import reverse
-from .models import Category, Supplier, Product, StockEntry, StockMovement
+from .models import Category, Supplier, Product, StockEntry, StockMovement, ArchivedStockMovement, InventorySnapshot
 
 
 @admin.register(Category)
@@ -157,3 +157,34 @@ class StockMovementAdmin(admin.ModelAdmin):
 
     def has_change_permission(self, request, obj=None):
         return False
+
+
+@admin.register(ArchivedStockMovement)
+class ArchivedStockMovementAdmin(admin.ModelAdmin):
+    list_display = [
+        'stock_entry', 'movement_type', 'quantity_changed',
+        'archive_month', 'created_at', 'archived_at'
+    ]
+    list_filter = ['movement_type', 'archive_month']
+    search_fields = ['stock_entry__product__name', 'reason', 'performed_by']
+    readonly_fields = ['archived_at']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(InventorySnapshot)
+class InventorySnapshotAdmin(admin.ModelAdmin):
+    list_display = ['product', 'snapshot_date', 'quantity', 'total_value', 'taken_at']
+    list_filter = ['snapshot_date']
+    search_fields = ['product__name', 'product__sku']
+    date_hierarchy = 'snapshot_date'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
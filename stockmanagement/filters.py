@@ -1,5 +1,6 @@
 import django_filters
 from django import forms
+from rest_framework import filters
 from .models import Product, StockEntry, Category, Supplier
 
 
@@ -74,3 +75,18 @@ class StockEntryFilter(django_filters.FilterSet):
     class Meta:
         model = StockEntry
         fields = ['status', 'entry_type']
+
+
+class IndexedSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter that resolves ?search= through the SearchTerm index instead
+    of LIKE '%term%' over joined columns. Views set `search_ranker` to one of
+    the ranking functions in stockmanagement.search.
+    """
+    
+    def filter_queryset(self, request, queryset, view):
+        query = ' '.join(self.get_search_terms(request))
+        if not query:
+            return queryset
+        ranked = view.search_ranker(query)
+        return queryset.filter(pk__in=[pk for pk, score in ranked])
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+from stockmanagement.models import StockMovement, ArchivedStockMovement
+
+
+class Command(BaseCommand):
+    help = 'Move stock movements older than the hot window into the monthly archive in bounded batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=settings.STOCK_MOVEMENT_HOT_DAYS,
+            help='Keep movements from the last N days in the hot table',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.STOCK_MOVEMENT_ARCHIVE_BATCH_SIZE,
+            help='Number of movements moved per transaction',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            default=None,
+            help='Stop after this many batches (useful for throttled runs)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report how many movements would be archived',
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        batch_size = options['batch_size']
+        max_batches = options['max_batches']
+
+        old_movements = StockMovement.objects.filter(created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f'{old_movements.count()} movements older than {cutoff:%Y-%m-%d} would be archived')
+            return
+
+        archived_total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = self._archive_batch(cutoff, batch_size)
+            if not moved:
+                break
+            archived_total += moved
+            batches += 1
+            self.stdout.write(f'Archived batch {batches} ({moved} movements)')
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Archived {archived_total} movements older than {cutoff:%Y-%m-%d}')
+        )
+
+    def _archive_batch(self, cutoff, batch_size):
+        """Copy one batch into the archive and delete it from the hot table atomically"""
+        with transaction.atomic():
+            batch = list(
+                StockMovement.objects.filter(created_at__lt=cutoff)
+                .order_by('created_at', 'pk')[:batch_size]
+            )
+            if not batch:
+                return 0
+
+            ArchivedStockMovement.objects.bulk_create(
+                [ArchivedStockMovement.from_movement(movement) for movement in batch],
+                ignore_conflicts=True,
+            )
+            StockMovement.objects.filter(pk__in=[movement.pk for movement in batch]).delete()
+        return len(batch)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from stockmanagement.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the product and stock entry search index from scratch'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of index rows inserted per query',
+        )
+
+    def handle(self, *args, **options):
+        product_count, entry_count = rebuild_index(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Indexed {product_count} products and {entry_count} stock entries')
+        )
@@ -0,0 +1,52 @@
+import calendar
+from datetime import datetime, time
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from stockmanagement.models import ValuationCheckpoint
+from stockmanagement.valuation import value_inventory, by_category
+
+
+class Command(BaseCommand):
+    help = 'Run month-end stock valuation (FIFO or weighted average) and store a checkpoint for the next run'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--month',
+            type=str,
+            required=True,
+            help='Month to close, as YYYY-MM',
+        )
+        parser.add_argument(
+            '--method',
+            type=str,
+            choices=ValuationCheckpoint.CostMethod.values,
+            default=ValuationCheckpoint.CostMethod.FIFO,
+            help='Cost flow method',
+        )
+        parser.add_argument(
+            '--no-checkpoint',
+            action='store_true',
+            help='Report only, do not store the closing state',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            period = datetime.strptime(options['month'], '%Y-%m')
+        except ValueError:
+            raise CommandError('Please provide --month as YYYY-MM')
+
+        last_day = calendar.monthrange(period.year, period.month)[1]
+        start = timezone.make_aware(datetime.combine(period.date(), time.min))
+        end = timezone.make_aware(datetime.combine(period.date().replace(day=last_day), time.max))
+
+        results = value_inventory(
+            start, end, method=options['method'], save_checkpoint=not options['no_checkpoint']
+        )
+
+        for row in by_category(results):
+            self.stdout.write(
+                f"{row['category']}: COGS {row['cost_of_goods_sold']}, closing value {row['closing_value']}"
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"Valued {len(results)} products for {options['month']} using {options['method']}")
+        )
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from stockmanagement.snapshots import take_snapshot
+
+
+class Command(BaseCommand):
+    help = 'Capture per-product on-hand quantity and value (run nightly)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--date',
+            type=str,
+            help='Snapshot date (YYYY-MM-DD), defaults to today; a past date is rebuilt as of the end of that day',
+        )
+
+    def handle(self, *args, **options):
+        snapshot_date = None
+        if options.get('date'):
+            snapshot_date = parse_date(options['date'])
+            if snapshot_date is None:
+                raise CommandError('Please provide --date as YYYY-MM-DD')
+
+        try:
+            count = take_snapshot(snapshot_date)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        self.stdout.write(
+            self.style.SUCCESS(f'Captured inventory snapshot for {count} products')
+        )
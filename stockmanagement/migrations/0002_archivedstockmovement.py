@@ -0,0 +1,37 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stockmanagement', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedStockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField(help_text='Primary key the movement had in the hot table', unique=True)),
+                ('archive_month', models.DateField(help_text='First day of the month the movement was created in')),
+                ('movement_type', models.CharField(choices=[('in', 'Stock In'), ('out', 'Stock Out'), ('adjustment', 'Adjustment'), ('transfer', 'Transfer'), ('waste', 'Waste')], max_length=20)),
+                ('quantity_changed', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('previous_quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('new_quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('reason', models.CharField(blank=True, max_length=200)),
+                ('performed_by', models.CharField(blank=True, max_length=100)),
+                ('reference_document', models.CharField(blank=True, max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('stock_entry', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_movements', to='stockmanagement.stockentry')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['archive_month', 'created_at'], name='stockmanage_archive_42b4b1_idx'), models.Index(fields=['stock_entry', 'created_at'], name='stockmanage_stock_e_7b7393_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stockmanagement', '0002_archivedstockmovement'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventorySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('taken_at', models.DateTimeField(help_text='Movements after this instant are not reflected in the snapshot')),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('total_value', models.DecimalField(decimal_places=2, max_digits=16)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='inventory_snapshots', to='stockmanagement.product')),
+            ],
+            options={
+                'ordering': ['-snapshot_date', 'product'],
+                'indexes': [models.Index(fields=['taken_at'], name='stockmanage_taken_a_450df8_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'snapshot_date'), name='unique_product_snapshot_date')],
+            },
+        ),
+    ]
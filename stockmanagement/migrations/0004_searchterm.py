@@ -0,0 +1,28 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stockmanagement', '0003_inventorysnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('kind', models.CharField(choices=[('word', 'Word'), ('code', 'Code'), ('gram', 'Trigram')], max_length=10)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+                ('product', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='stockmanagement.product')),
+                ('stock_entry', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='stockmanagement.stockentry')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['kind', 'term'], name='stockmanage_kind_78a516_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stockmanagement', '0004_searchterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stockentry',
+            name='version',
+            field=models.PositiveIntegerField(default=0, help_text='Incremented on every write, used for optimistic locking'),
+        ),
+    ]
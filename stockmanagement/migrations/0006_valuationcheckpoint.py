@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-18 22:19
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stockmanagement', '0005_stockentry_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ValuationCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('fifo', 'FIFO'), ('weighted_average', 'Weighted Average')], max_length=20)),
+                ('period_end', models.DateTimeField(help_text='Movements up to and including this instant are reflected')),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('value', models.DecimalField(decimal_places=4, max_digits=16)),
+                ('layers', models.JSONField(blank=True, default=list, help_text='Open FIFO cost layers as [quantity, unit_cost] pairs')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuation_checkpoints', to='stockmanagement.product')),
+            ],
+            options={
+                'ordering': ['-period_end'],
+                'indexes': [models.Index(fields=['method', 'period_end'], name='stockmanage_method_3d2361_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'method', 'period_end'), name='unique_valuation_checkpoint')],
+            },
+        ),
+    ]
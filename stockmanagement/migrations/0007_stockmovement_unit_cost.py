@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 23:06
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def copy_entry_costs(apps, schema_editor):
+    """Existing movements get their entry's current cost, the best value still known"""
+    StockEntry = apps.get_model('stockmanagement', 'StockEntry')
+    entry_cost = Subquery(StockEntry.objects.filter(pk=OuterRef('stock_entry_id')).values('cost_per_unit')[:1])
+    for model_name in ('StockMovement', 'ArchivedStockMovement'):
+        apps.get_model('stockmanagement', model_name).objects.filter(unit_cost__isnull=True).update(unit_cost=entry_cost)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('stockmanagement', '0006_valuationcheckpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivedstockmovement',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Stock entry cost per unit when the movement happened', max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='stockmovement',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Stock entry cost per unit when the movement happened', max_digits=10, null=True),
+        ),
+        migrations.RunPython(copy_entry_costs, migrations.RunPython.noop),
+    ]
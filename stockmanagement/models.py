@@ -148,6 +148,7 @@ class StockEntry(TimestampedModel):
     cost_per_unit = models.DecimalField(max_digits=10, decimal_places=2, help_text="Cost per unit for this specific entry")
     reference_number = models.CharField(max_length=100, blank=True, help_text="Invoice number, PO number, etc.")
     notes = models.TextField(blank=True)
+    version = models.PositiveIntegerField(default=0, help_text="Incremented on every write, used for optimistic locking")
     
     class Meta:
         verbose_name_plural = "Stock Entries"
@@ -161,6 +162,18 @@ class StockEntry(TimestampedModel):
     def __str__(self):
         return f"{self.product.name} - {self.quantity} {self.product.unit_of_measure}"
     
+    def save(self, *args, **kwargs):
+        """Bump `version` in the database on every update, whoever saves the entry"""
+        if self._state.adding:
+            super().save(*args, **kwargs)
+            return
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version'}
+        self.version = models.F('version') + 1
+        super().save(*args, **kwargs)
+        self.refresh_from_db(fields=['version'])
+    
     @property
     def total_cost(self):
         if self.quantity is None or self.cost_per_unit is None:
@@ -199,6 +212,7 @@ class StockMovement(TimestampedModel):
     reason = models.CharField(max_length=200, blank=True)
     performed_by = models.CharField(max_length=100, blank=True)
     reference_document = models.CharField(max_length=100, blank=True)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Stock entry cost per unit when the movement happened")
     
     class Meta:
         ordering = ['-created_at']
@@ -209,3 +223,125 @@ class StockMovement(TimestampedModel):
     
     def __str__(self):
         return f"{self.stock_entry.product.name} - {self.movement_type} - {self.quantity_changed}"
+    
+    def save(self, *args, **kwargs):
+        # Freeze the cost so later edits of the entry's cost don't revalue history
+        if self.unit_cost is None:
+            self.unit_cost = self.stock_entry.cost_per_unit
+        super().save(*args, **kwargs)
+
+
+class ArchivedStockMovement(models.Model):
+    """Cold storage for stock movements older than the hot window, bucketed by month"""
+    original_id = models.BigIntegerField(unique=True, help_text="Primary key the movement had in the hot table")
+    archive_month = models.DateField(help_text="First day of the month the movement was created in")
+    stock_entry = models.ForeignKey(StockEntry, on_delete=models.CASCADE, related_name='archived_movements')
+    movement_type = models.CharField(max_length=20, choices=StockMovement.MovementType.choices)
+    quantity_changed = models.DecimalField(max_digits=10, decimal_places=2)
+    previous_quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    new_quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    reason = models.CharField(max_length=200, blank=True)
+    performed_by = models.CharField(max_length=100, blank=True)
+    reference_document = models.CharField(max_length=100, blank=True)
+    unit_cost = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True, help_text="Stock entry cost per unit when the movement happened")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['archive_month', 'created_at']),
+            models.Index(fields=['stock_entry', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.stock_entry.product.name} - {self.movement_type} - {self.quantity_changed} (archived)"
+    
+    @classmethod
+    def from_movement(cls, movement):
+        return cls(
+            original_id=movement.pk,
+            archive_month=movement.created_at.date().replace(day=1),
+            stock_entry_id=movement.stock_entry_id,
+            movement_type=movement.movement_type,
+            quantity_changed=movement.quantity_changed,
+            previous_quantity=movement.previous_quantity,
+            new_quantity=movement.new_quantity,
+            reason=movement.reason,
+            performed_by=movement.performed_by,
+            reference_document=movement.reference_document,
+            unit_cost=movement.unit_cost,
+            created_at=movement.created_at,
+            updated_at=movement.updated_at,
+        )
+
+
+class InventorySnapshot(models.Model):
+    """Per-product on-hand quantity and value captured by the nightly snapshot job"""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='inventory_snapshots')
+    snapshot_date = models.DateField()
+    taken_at = models.DateTimeField(help_text="Movements after this instant are not reflected in the snapshot")
+    quantity = models.DecimalField(max_digits=14, decimal_places=2)
+    total_value = models.DecimalField(max_digits=16, decimal_places=2)
+    
+    class Meta:
+        ordering = ['-snapshot_date', 'product']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'snapshot_date'], name='unique_product_snapshot_date'),
+        ]
+        indexes = [
+            models.Index(fields=['taken_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product.name} @ {self.snapshot_date}: {self.quantity}"
+
+
+class SearchTerm(models.Model):
+    """Inverted index rows backing product and stock entry search"""
+    class TermKind(models.TextChoices):
+        WORD = 'word', 'Word'
+        CODE = 'code', 'Code'
+        GRAM = 'gram', 'Trigram'
+    
+    term = models.CharField(max_length=64)
+    kind = models.CharField(max_length=10, choices=TermKind.choices)
+    weight = models.PositiveSmallIntegerField(default=1)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, null=True, blank=True, related_name='search_terms')
+    stock_entry = models.ForeignKey(StockEntry, on_delete=models.CASCADE, null=True, blank=True, related_name='search_terms')
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['kind', 'term']),
+        ]
+    
+    def __str__(self):
+        return f"{self.kind}:{self.term}"
+
+
+class ValuationCheckpoint(models.Model):
+    """Running cost state of a product at the end of a valuation period, used to resume valuation incrementally"""
+    class CostMethod(models.TextChoices):
+        FIFO = 'fifo', 'FIFO'
+        WEIGHTED_AVERAGE = 'weighted_average', 'Weighted Average'
+    
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='valuation_checkpoints')
+    method = models.CharField(max_length=20, choices=CostMethod.choices)
+    period_end = models.DateTimeField(help_text="Movements up to and including this instant are reflected")
+    quantity = models.DecimalField(max_digits=14, decimal_places=2)
+    value = models.DecimalField(max_digits=16, decimal_places=4)
+    layers = models.JSONField(default=list, blank=True, help_text="Open FIFO cost layers as [quantity, unit_cost] pairs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-period_end']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'method', 'period_end'], name='unique_valuation_checkpoint'),
+        ]
+        indexes = [
+            models.Index(fields=['method', 'period_end']),
+        ]
+    
+    def __str__(self):
+        return f"{self.product.name} {self.method} @ {self.period_end}: {self.value}"
@@ -0,0 +1,195 @@
+import operator
+import re
+from functools import reduce
+from django.db import transaction
+from django.db.models import Q, Sum, Count
+from .models import Product, StockEntry, SearchTerm
+
+
+TERM_MAX_LENGTH = 64
+WORD_RE = re.compile(r'\w+')
+CODE_STRIP_RE = re.compile(r'[^0-9a-z]')
+
+# Field weights used when ranking results
+NAME_WEIGHT = 5
+DESCRIPTION_WEIGHT = 1
+CODE_WEIGHT = 10
+GRAM_WEIGHT = 1
+
+
+def words(text):
+    """Lowercase word tokens of free text"""
+    return [word[:TERM_MAX_LENGTH] for word in WORD_RE.findall((text or '').lower())]
+
+
+def normalize_code(code):
+    """SKUs, batch and reference numbers match regardless of case and punctuation"""
+    return CODE_STRIP_RE.sub('', (code or '').lower())[:TERM_MAX_LENGTH]
+
+
+def query_tokens(query):
+    """
+    Search tokens of a query, split on whitespace like DRF's SearchFilter.
+    A token with punctuation inside (VEG-TOM-01, 2024/77) stays whole so it
+    can match a code; plain tokens are single words.
+    """
+    tokens = set()
+    for chunk in (query or '').lower().split():
+        chunk_words = words(chunk)
+        if len(chunk_words) == 1:
+            tokens.add(chunk_words[0])
+        elif chunk_words:
+            tokens.add(chunk)
+    return tokens
+
+
+def trigrams(token):
+    return {token[i:i + 3] for i in range(len(token) - 2)}
+
+
+def _code_terms(code, **owner):
+    code = normalize_code(code)
+    if not code:
+        return []
+    terms = [SearchTerm(term=code, kind=SearchTerm.TermKind.CODE, weight=CODE_WEIGHT, **owner)]
+    terms += [
+        SearchTerm(term=gram, kind=SearchTerm.TermKind.GRAM, weight=GRAM_WEIGHT, **owner)
+        for gram in trigrams(code)
+    ]
+    return terms
+
+
+def _word_terms(text, weight, **owner):
+    return [
+        SearchTerm(term=word, kind=SearchTerm.TermKind.WORD, weight=weight, **owner)
+        for word in set(words(text))
+    ]
+
+
+def product_terms(product):
+    return (
+        _word_terms(product.name, NAME_WEIGHT, product=product)
+        + _word_terms(product.description, DESCRIPTION_WEIGHT, product=product)
+        + _code_terms(product.sku, product=product)
+    )
+
+
+def stock_entry_terms(entry):
+    return (
+        _code_terms(entry.batch_number, stock_entry=entry)
+        + _code_terms(entry.reference_number, stock_entry=entry)
+    )
+
+
+def index_product(product):
+    with transaction.atomic():
+        SearchTerm.objects.filter(product=product).delete()
+        SearchTerm.objects.bulk_create(product_terms(product))
+
+
+def index_stock_entry(entry):
+    with transaction.atomic():
+        SearchTerm.objects.filter(stock_entry=entry).delete()
+        SearchTerm.objects.bulk_create(stock_entry_terms(entry))
+
+
+def _token_condition(token):
+    """
+    Index lookup for one search token. The token is matched as a prefix of
+    words (single-word tokens only) and codes (an index range scan); tokens
+    of three or more characters also match code trigrams so partial SKUs and
+    batch numbers hit.
+    """
+    conditions = []
+    if WORD_RE.fullmatch(token):
+        conditions.append(Q(kind=SearchTerm.TermKind.WORD, term__startswith=token))
+    code = normalize_code(token)
+    grams = trigrams(code)
+    if code:
+        conditions.append(Q(kind=SearchTerm.TermKind.CODE, term__startswith=code))
+    if grams:
+        conditions.append(Q(kind=SearchTerm.TermKind.GRAM, term__in=grams))
+    return reduce(operator.or_, conditions), len(grams)
+
+
+def _token_scores(owner_field, token):
+    """Score owners (products or stock entries) matching a single token"""
+    condition, gram_count = _token_condition(token)
+    rows = SearchTerm.objects.filter(condition, **{f'{owner_field}__isnull': False}).values(owner_field).annotate(
+        score=Sum('weight'),
+        direct_hits=Count('id', filter=~Q(kind=SearchTerm.TermKind.GRAM)),
+        gram_hits=Count('term', filter=Q(kind=SearchTerm.TermKind.GRAM), distinct=True),
+    ).order_by()
+
+    # A trigram-only hit counts when all of the token's trigrams are present
+    return {
+        row[owner_field]: row['score']
+        for row in rows
+        if row['direct_hits'] or (gram_count and row['gram_hits'] >= gram_count)
+    }
+
+
+def _combine(per_token_scores):
+    """Like DRF's SearchFilter every token has to match; scores add up across tokens"""
+    scores = None
+    for token_scores in per_token_scores:
+        if scores is None:
+            scores = dict(token_scores)
+        else:
+            scores = {pk: score + token_scores[pk] for pk, score in scores.items() if pk in token_scores}
+        if not scores:
+            return {}
+    return scores or {}
+
+
+def _sorted(scores, limit=None):
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+    return ranked[:limit] if limit else ranked
+
+
+def ranked_product_ids(query, limit=None):
+    """(product_id, score) pairs matching the query, best match first"""
+    return _sorted(_combine(_token_scores('product_id', token) for token in query_tokens(query)), limit)
+
+
+def _stock_entry_token_scores(token):
+    scores = _token_scores('stock_entry_id', token)
+    product_scores = _token_scores('product_id', token)
+    if product_scores:
+        product_entries = StockEntry.objects.filter(product_id__in=product_scores.keys()).values_list('id', 'product_id')
+        for entry_id, product_id in product_entries:
+            scores[entry_id] = scores.get(entry_id, 0) + product_scores[product_id]
+    return scores
+
+
+def ranked_stock_entry_ids(query, limit=None):
+    """
+    (stock_entry_id, score) pairs matching the query on batch/reference codes
+    or on their product, best match first
+    """
+    return _sorted(_combine(_stock_entry_token_scores(token) for token in query_tokens(query)), limit)
+
+
+def rebuild_index(batch_size=1000):
+    """Rebuild the whole index from scratch; returns (products, stock entries) indexed"""
+    SearchTerm.objects.all().delete()
+    product_count = entry_count = 0
+
+    batch = []
+    for product in Product.objects.only('id', 'name', 'description', 'sku').iterator(chunk_size=batch_size):
+        batch.extend(product_terms(product))
+        product_count += 1
+        if len(batch) >= batch_size:
+            SearchTerm.objects.bulk_create(batch)
+            batch = []
+
+    for entry in StockEntry.objects.only('id', 'batch_number', 'reference_number').iterator(chunk_size=batch_size):
+        batch.extend(stock_entry_terms(entry))
+        entry_count += 1
+        if len(batch) >= batch_size:
+            SearchTerm.objects.bulk_create(batch)
+            batch = []
+
+    if batch:
+        SearchTerm.objects.bulk_create(batch)
+    return product_count, entry_count
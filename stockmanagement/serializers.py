@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Category, Supplier, Product, StockEntry, StockMovement
+from .models import Category, Supplier, Product, StockEntry, StockMovement, ArchivedStockMovement
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -94,6 +94,10 @@ class StockEntrySerializer(serializers.ModelSerializer):
     total_cost = serializers.ReadOnlyField()
     is_expired = serializers.ReadOnlyField()
     days_until_expiry = serializers.ReadOnlyField()
+    version = serializers.IntegerField(
+        required=False, min_value=0,
+        help_text="Version the client last read; required on update (or send it as If-Match)"
+    )
     
     class Meta:
         model = StockEntry
@@ -102,9 +106,31 @@ class StockEntrySerializer(serializers.ModelSerializer):
             'quantity', 'unit_of_measure', 'entry_type', 'status',
             'received_date', 'expiry_date', 'cost_per_unit', 'total_cost',
             'reference_number', 'notes', 'is_expired', 'days_until_expiry',
-            'created_at', 'updated_at'
+            'version', 'created_at', 'updated_at'
         ]
         read_only_fields = ['created_at', 'updated_at']
+    
+    def create(self, validated_data):
+        # New entries always start at version 0
+        validated_data.pop('version', None)
+        return super().create(validated_data)
+
+
+class StockAdjustmentSerializer(serializers.Serializer):
+    """Input for the atomic stock entry `adjust` action"""
+    delta = serializers.DecimalField(max_digits=10, decimal_places=2, help_text="Positive to add stock, negative to remove")
+    movement_type = serializers.ChoiceField(
+        choices=StockMovement.MovementType.choices,
+        default=StockMovement.MovementType.ADJUSTMENT
+    )
+    reason = serializers.CharField(max_length=200, required=False, allow_blank=True, default='')
+    performed_by = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    reference_document = serializers.CharField(max_length=100, required=False, allow_blank=True, default='')
+    
+    def validate_delta(self, value):
+        if value == 0:
+            raise serializers.ValidationError("Delta must not be zero")
+        return value
 
 
 class StockMovementSerializer(serializers.ModelSerializer):
@@ -116,7 +142,23 @@ class StockMovementSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'stock_entry', 'product_name', 'product_sku',
             'movement_type', 'quantity_changed', 'previous_quantity',
-            'new_quantity', 'reason', 'performed_by', 'reference_document',
+            'new_quantity', 'unit_cost', 'reason', 'performed_by', 'reference_document',
             'created_at'
         ]
-        read_only_fields = ['created_at']
+        read_only_fields = ['unit_cost', 'created_at']
+
+
+
+class ArchivedStockMovementSerializer(serializers.ModelSerializer):
+    product_name = serializers.CharField(source='stock_entry.product.name', read_only=True)
+    product_sku = serializers.CharField(source='stock_entry.product.sku', read_only=True)
+    
+    class Meta:
+        model = ArchivedStockMovement
+        fields = [
+            'id', 'original_id', 'archive_month', 'stock_entry', 'product_name',
+            'product_sku', 'movement_type', 'quantity_changed', 'previous_quantity',
+            'new_quantity', 'unit_cost', 'reason', 'performed_by', 'reference_document',
+            'created_at', 'archived_at'
+        ]
+        read_only_fields = fields
@@ -1,6 +1,11 @@
 from django.db.models.signals import post_save, pre_save
 from django.dispatch import receiver
 from .models import StockEntry, StockMovement, Product
+from .search import index_product, index_stock_entry
+
+
+PRODUCT_SEARCH_FIELDS = {'name', 'sku', 'description'}
+STOCK_ENTRY_SEARCH_FIELDS = {'batch_number', 'reference_number'}
 
 
 @receiver(pre_save, sender=StockEntry)
@@ -46,7 +51,11 @@ def create_initial_stock_movement(sender, instance, created, **kwargs):
 @receiver(post_save, sender=StockEntry)
 def update_product_status(sender, instance, **kwargs):
     """Update product status based on current stock levels"""
-    product = instance.product
+    sync_product_status(instance.product)
+
+
+def sync_product_status(product):
+    """Flip a product between active and out of stock; also used after queryset updates that bypass signals"""
     current_stock = product.current_stock
     
     # Update product status if out of stock
@@ -57,3 +66,18 @@ def update_product_status(sender, instance, **kwargs):
         product.status = Product.ProductStatus.ACTIVE
         product.save(update_fields=['status'])
 
+
+@receiver(post_save, sender=Product)
+def update_product_search_index(sender, instance, update_fields=None, **kwargs):
+    """Keep the product search index in sync with searchable fields"""
+    if update_fields and not PRODUCT_SEARCH_FIELDS.intersection(update_fields):
+        return
+    index_product(instance)
+
+
+@receiver(post_save, sender=StockEntry)
+def update_stock_entry_search_index(sender, instance, update_fields=None, **kwargs):
+    """Keep the stock entry search index in sync with batch and reference numbers"""
+    if update_fields and not STOCK_ENTRY_SEARCH_FIELDS.intersection(update_fields):
+        return
+    index_stock_entry(instance)
@@ -0,0 +1,149 @@
+from collections import defaultdict
+from datetime import datetime, time
+from decimal import Decimal
+from django.db import transaction
+from django.db.models import Sum, F, Max, Min, DecimalField, ExpressionWrapper
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from .models import StockEntry, StockMovement, ArchivedStockMovement, InventorySnapshot
+
+
+LINE_VALUE = ExpressionWrapper(F('quantity') * F('cost_per_unit'), output_field=DecimalField(max_digits=16, decimal_places=2))
+
+# Snapshots and movement replays count the same stock: entries that are available
+COUNTED_STATUS = StockEntry.StockStatus.AVAILABLE
+
+# Cost a movement happened at; movements without one fall back to the entry's cost
+MOVEMENT_UNIT_COST = Coalesce('unit_cost', 'stock_entry__cost_per_unit')
+
+
+def _day_end(day):
+    """Last instant of a local calendar day"""
+    return timezone.make_aware(datetime.combine(day, time.max))
+
+
+def take_snapshot(snapshot_date=None):
+    """
+    Capture on-hand quantity and value for every product in one grouped query.
+    A past date is rebuilt as of the end of that day by taking the movements
+    recorded since then back out of current stock; future dates are rejected
+    (ValueError). Re-running for the same date replaces that day's snapshot.
+    """
+    now = timezone.now()
+    today = timezone.localdate(now)
+    snapshot_date = snapshot_date or today
+    if snapshot_date > today:
+        raise ValueError('Snapshots cannot be taken for a future date')
+
+    totals = StockEntry.objects.filter(
+        status=COUNTED_STATUS
+    ).values('product_id').annotate(
+        total_quantity=Sum('quantity'),
+        value=Sum(LINE_VALUE),
+    ).order_by()
+    balances = {
+        row['product_id']: {
+            'quantity': row['total_quantity'] or Decimal('0.00'),
+            'value': row['value'] or Decimal('0.00'),
+        }
+        for row in totals
+    }
+
+    taken_at = now
+    if snapshot_date < today:
+        taken_at = _day_end(snapshot_date)
+        for product_id, delta in _movement_deltas(taken_at, now).items():
+            balance = balances.setdefault(product_id, {'quantity': Decimal('0.00'), 'value': Decimal('0.00')})
+            balance['quantity'] -= delta['quantity']
+            balance['value'] -= delta['value']
+
+    snapshots = [
+        InventorySnapshot(
+            product_id=product_id,
+            snapshot_date=snapshot_date,
+            taken_at=taken_at,
+            quantity=balance['quantity'],
+            total_value=balance['value'],
+        )
+        for product_id, balance in balances.items()
+    ]
+
+    with transaction.atomic():
+        InventorySnapshot.objects.filter(snapshot_date=snapshot_date).delete()
+        InventorySnapshot.objects.bulk_create(snapshots, batch_size=1000)
+
+    return len(snapshots)
+
+
+def _movement_deltas(start, end, product_ids=None):
+    """
+    Sum quantity and value changes per product for movements in (start, end],
+    hot and archived, of the entries snapshots count, valued at the cost each
+    movement happened at
+    """
+    deltas = defaultdict(lambda: {'quantity': Decimal('0.00'), 'value': Decimal('0.00')})
+    delta_value = ExpressionWrapper(
+        F('quantity_changed') * MOVEMENT_UNIT_COST,
+        output_field=DecimalField(max_digits=16, decimal_places=2)
+    )
+
+    for model in (StockMovement, ArchivedStockMovement):
+        movements = model.objects.filter(stock_entry__status=COUNTED_STATUS)
+        if start is not None:
+            movements = movements.filter(created_at__gt=start)
+        movements = movements.filter(created_at__lte=end)
+        if product_ids:
+            movements = movements.filter(stock_entry__product_id__in=product_ids)
+
+        rows = movements.values('stock_entry__product_id').annotate(
+            quantity=Sum('quantity_changed'),
+            value=Sum(delta_value),
+        ).order_by()
+        for row in rows:
+            delta = deltas[row['stock_entry__product_id']]
+            delta['quantity'] += row['quantity'] or 0
+            delta['value'] += row['value'] or 0
+
+    return deltas
+
+
+def stock_as_of(at, product_ids=None):
+    """
+    Return {product_id: {'quantity', 'value'}} as of the given instant.
+
+    Starts from the nearest snapshot and only replays the movements between
+    the snapshot and `at` (backwards when the nearest snapshot is later).
+    Both only count available entries. Entry status is not historised, so
+    replays use each entry's current status, and a status change that does
+    not touch quantity is only exact at snapshot boundaries; the same goes
+    for edits of an entry's cost, as movements keep the cost they happened at.
+    """
+    before = InventorySnapshot.objects.filter(taken_at__lte=at).aggregate(taken_at=Max('taken_at'))['taken_at']
+    after = InventorySnapshot.objects.filter(taken_at__gt=at).aggregate(taken_at=Min('taken_at'))['taken_at']
+
+    if before is not None and (after is None or at - before <= after - at):
+        base_taken_at, direction = before, 1
+    elif after is not None:
+        base_taken_at, direction = after, -1
+    else:
+        base_taken_at, direction = None, 1
+
+    balances = defaultdict(lambda: {'quantity': Decimal('0.00'), 'value': Decimal('0.00')})
+    if base_taken_at is not None:
+        snapshots = InventorySnapshot.objects.filter(taken_at=base_taken_at)
+        if product_ids:
+            snapshots = snapshots.filter(product_id__in=product_ids)
+        for product_id, quantity, value in snapshots.values_list('product_id', 'quantity', 'total_value'):
+            balances[product_id] = {'quantity': quantity, 'value': value}
+
+    if direction == 1:
+        deltas = _movement_deltas(base_taken_at, at, product_ids)
+    else:
+        deltas = _movement_deltas(at, base_taken_at, product_ids)
+
+    for product_id, delta in deltas.items():
+        balance = balances[product_id]
+        balance['quantity'] += direction * delta['quantity']
+        balance['value'] += direction * delta['value']
+
+    return dict(balances)
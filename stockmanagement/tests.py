@@ -1,3 +1,306 @@
+from datetime import datetime, timedelta
+from decimal import Decimal
+from io import StringIO
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from .models import (
+    Category, Product, StockEntry, StockMovement, ArchivedStockMovement, InventorySnapshot, ValuationCheckpoint
+)
+from .search import ranked_product_ids, ranked_stock_entry_ids, rebuild_index
+from .snapshots import stock_as_of, take_snapshot
+from .valuation import value_inventory
 
-# Create your tests here.
+
+def make_product(sku='SKU-1', cost='2.00'):
+    category, _ = Category.objects.get_or_create(name='Dry goods')
+    return Product.objects.create(name=f'Product {sku}', sku=sku, category=category, cost_per_unit=Decimal(cost))
+
+
+def make_entry(product, quantity='10.00', cost='2.00', **fields):
+    return StockEntry.objects.create(
+        product=product, quantity=Decimal(quantity), cost_per_unit=Decimal(cost), **fields
+    )
+
+
+def at(year, month, day, hour=0, minute=0):
+    return timezone.make_aware(datetime(year, month, day, hour, minute))
+
+
+class StockMovementListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.entry = make_entry(make_product())
+        self.entry.movements.all().delete()
+
+    def movement(self, created_at):
+        movement = StockMovement.objects.create(
+            stock_entry=self.entry, movement_type=StockMovement.MovementType.OUT,
+            quantity_changed=Decimal('-1.00'), previous_quantity=Decimal('10.00'), new_quantity=Decimal('9.00')
+        )
+        StockMovement.objects.filter(pk=movement.pk).update(created_at=created_at)
+        return movement.pk
+
+    def test_date_range_is_inclusive_and_uses_datetime_bounds(self):
+        today = timezone.localdate()
+        first = self.movement(timezone.make_aware(datetime.combine(today - timedelta(days=2), datetime.min.time())))
+        last = self.movement(timezone.make_aware(datetime.combine(today - timedelta(days=1), datetime.max.time())))
+        self.movement(timezone.make_aware(datetime.combine(today, datetime.min.time())))
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/v1/stock-movements/', {
+                'date_from': str(today - timedelta(days=2)), 'date_to': str(today - timedelta(days=1)),
+            })
+        self.assertEqual(sorted(row['id'] for row in response.data), sorted([first, last]))
+        self.assertNotIn('cast_date', queries.captured_queries[0]['sql'])
+        self.assertNotIn('Link', response)
+
+    def test_range_before_the_hot_window_points_to_the_archive(self):
+        response = self.client.get('/api/v1/stock-movements/', {'date_from': '2020-01-01'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('/api/v1/stock-movement-archive/?date_from=2020-01-01', response['Link'])
+        self.assertIn('rel="archive"', response['Link'])
+
+
+class ArchiveStockMovementsTests(TestCase):
+    def test_old_movements_move_to_their_month_in_the_archive(self):
+        entry = make_entry(make_product())
+        old = entry.movements.get()
+        StockMovement.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=400))
+        entry.quantity = Decimal('8.00')
+        entry.save()
+
+        call_command('archive_stock_movements', batch_size=1, stdout=StringIO())
+
+        self.assertEqual(list(StockMovement.objects.values_list('quantity_changed', flat=True)), [Decimal('-2.00')])
+        archived = ArchivedStockMovement.objects.get()
+        self.assertEqual((archived.original_id, archived.quantity_changed), (old.pk, Decimal('10.00')))
+        self.assertEqual(archived.archive_month, archived.created_at.date().replace(day=1))
+
+    def test_archive_listing_requires_a_start_date(self):
+        response = APIClient().get('/api/v1/stock-movement-archive/')
+        self.assertEqual(response.status_code, 400)
+
+
+class StockAsOfTests(TestCase):
+    def setUp(self):
+        self.product = make_product()
+
+    def test_replay_matches_snapshots_when_entries_leave_the_available_status(self):
+        make_entry(self.product, quantity='10.00', cost='2.00')
+        damaged = make_entry(self.product, quantity='5.00', cost='2.00')
+        damaged.status = StockEntry.StockStatus.DAMAGED
+        damaged.save()
+
+        balance = stock_as_of(timezone.now())[self.product.pk]
+        take_snapshot()
+        snapshot = InventorySnapshot.objects.get(product=self.product)
+        self.assertEqual((balance['quantity'], balance['value']), (snapshot.quantity, snapshot.total_value))
+        self.assertEqual(balance['quantity'], Decimal('10.00'))
+
+    def test_past_snapshots_are_rebuilt_as_of_the_end_of_that_day(self):
+        entry = make_entry(self.product, quantity='10.00', cost='2.00')
+        three_days_ago = timezone.localdate() - timedelta(days=3)
+        entry.movements.update(created_at=timezone.make_aware(datetime.combine(three_days_ago, datetime.min.time())))
+        entry.quantity = Decimal('4.00')
+        entry.save()
+        make_entry(self.product, quantity='1.00', cost='2.00')
+
+        call_command('take_inventory_snapshot', date=str(three_days_ago - timedelta(days=1)), stdout=StringIO())
+        call_command('take_inventory_snapshot', date=str(three_days_ago), stdout=StringIO())
+
+        snapshots = InventorySnapshot.objects.filter(product=self.product).order_by('snapshot_date')
+        self.assertEqual(
+            [(snapshot.quantity, snapshot.total_value) for snapshot in snapshots],
+            [(Decimal('0.00'), Decimal('0.00')), (Decimal('10.00'), Decimal('20.00'))]
+        )
+        day_end = snapshots[1].taken_at
+        self.assertEqual(timezone.localdate(day_end), three_days_ago)
+        self.assertEqual(stock_as_of(day_end + timedelta(hours=1))[self.product.pk]['quantity'], Decimal('10.00'))
+
+    def test_future_snapshots_are_rejected(self):
+        tomorrow = timezone.localdate() + timedelta(days=1)
+        with self.assertRaises(CommandError):
+            call_command('take_inventory_snapshot', date=str(tomorrow), stdout=StringIO())
+        self.assertFalse(InventorySnapshot.objects.exists())
+
+    def test_movements_keep_the_cost_they_happened_at(self):
+        entry = make_entry(self.product, quantity='10.00', cost='2.00')
+        before_edit = timezone.now()
+        entry.cost_per_unit = Decimal('5.00')
+        entry.save()
+
+        self.assertEqual(stock_as_of(before_edit)[self.product.pk]['value'], Decimal('20.00'))
+        rows = value_inventory(before_edit - timedelta(days=1), timezone.now())
+        self.assertEqual(rows[0]['received_value'], Decimal('20.00'))
+
+    def test_archived_movements_keep_their_cost(self):
+        entry = make_entry(self.product, quantity='10.00', cost='2.00')
+        archived = ArchivedStockMovement.from_movement(entry.movements.get())
+        self.assertEqual(archived.unit_cost, Decimal('2.00'))
+
+    def test_non_numeric_product_is_rejected(self):
+        client = APIClient()
+        response = client.get('/api/v1/products/as_of/', {'at': '2024-01-01', 'product': 'abc'})
+        self.assertEqual(response.status_code, 400)
+        response = client.get('/api/v1/products/valuation/', {
+            'date_from': '2024-01-01', 'date_to': '2024-01-31', 'product': 'abc',
+        })
+        self.assertEqual(response.status_code, 400)
+
+        response = client.get('/api/v1/products/as_of/', {'at': '2024-01-01', 'product': str(self.product.pk)})
+        self.assertEqual(response.status_code, 200)
+
+
+class StockEntryVersionTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.entry = make_entry(make_product(), quantity='10.00')
+        self.url = f'/api/v1/stock-entries/{self.entry.pk}/'
+
+    def test_every_save_bumps_the_version(self):
+        self.entry.notes = 'Edited in the admin'
+        self.entry.save()
+        self.assertEqual(self.entry.version, 1)
+        self.entry.save(update_fields=['notes'])
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.version, 2)
+
+    def test_update_with_the_current_version_succeeds(self):
+        response = self.client.patch(self.url, {'notes': 'Checked', 'version': 0}, format='json')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['version'], 1)
+
+    def test_update_over_an_unseen_change_conflicts(self):
+        # Saved elsewhere (admin, shell) after the client read version 0
+        self.entry.notes = 'Edited in the admin'
+        self.entry.save()
+
+        response = self.client.patch(self.url, {'quantity': '5.00', 'version': 0}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.quantity, Decimal('10.00'))
+
+        response = self.client.patch(self.url, {'quantity': '5.00'}, format='json', HTTP_IF_MATCH='"1"')
+        self.assertEqual(response.status_code, 200)
+
+    def test_update_without_a_version_is_rejected(self):
+        response = self.client.patch(self.url, {'notes': 'Checked'}, format='json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_adjust_is_atomic_and_never_goes_negative(self):
+        response = self.client.post(f'{self.url}adjust/', {'delta': '-4.00'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((Decimal(response.data['quantity']), response.data['version']), (Decimal('6.00'), 1))
+
+        response = self.client.post(f'{self.url}adjust/', {'delta': '-7.00'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.quantity, Decimal('6.00'))
+        self.assertEqual(
+            list(self.entry.movements.order_by('pk').values_list('quantity_changed', flat=True)),
+            [Decimal('10.00'), Decimal('-4.00')]
+        )
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.tomatoes = make_product('VEG-TOM-01')
+        self.tomatoes.name = 'Cherry Tomatoes'
+        self.tomatoes.save()
+        self.paste = make_product('CND-TP-02')
+        self.paste.name = 'Tomato Paste'
+        self.paste.description = 'Double concentrated'
+        self.paste.save()
+
+    def test_name_prefixes_rank_name_matches_first(self):
+        self.assertEqual([pk for pk, score in ranked_product_ids('tomato')], [self.tomatoes.pk, self.paste.pk])
+        self.assertEqual([pk for pk, score in ranked_product_ids('tomato conc')], [self.paste.pk])
+
+    def test_partial_codes_match_by_trigram(self):
+        self.assertEqual([pk for pk, score in ranked_product_ids('tom01')], [self.tomatoes.pk])
+        self.assertEqual([pk for pk, score in ranked_product_ids('veg-tom-01')], [self.tomatoes.pk])
+
+    def test_renamed_products_are_reindexed(self):
+        self.tomatoes.name = 'Plum Tomatoes'
+        self.tomatoes.save()
+        self.assertEqual([pk for pk, score in ranked_product_ids('plum')], [self.tomatoes.pk])
+        self.assertEqual(ranked_product_ids('cherry'), [])
+
+    def test_stock_entries_match_batch_numbers_and_products(self):
+        entry = make_entry(self.paste, batch_number='LOT-2024-77')
+        self.assertEqual([pk for pk, score in ranked_stock_entry_ids('2024-77')], [entry.pk])
+        self.assertEqual([pk for pk, score in ranked_stock_entry_ids('paste')], [entry.pk])
+
+    def test_rebuild_matches_the_incremental_index(self):
+        make_entry(self.paste, batch_number='LOT-2024-77')
+        before = ranked_product_ids('tomato')
+        self.assertEqual(rebuild_index(), (2, 1))
+        self.assertEqual(ranked_product_ids('tomato'), before)
+
+    def test_search_action_and_filter(self):
+        client = APIClient()
+        response = client.get('/api/v1/products/search/', {'q': 'paste'})
+        self.assertEqual([row['id'] for row in response.data['results']], [self.paste.pk])
+        self.assertEqual(client.get('/api/v1/products/search/').status_code, 400)
+
+        response = client.get('/api/v1/products/', {'search': 'cherry'})
+        self.assertEqual([row['id'] for row in response.data], [self.tomatoes.pk])
+
+
+class ValuationTests(TestCase):
+    """Two receipts (10 @ 2.00, then 10 @ 3.00) and one issue of 15 in January"""
+
+    def setUp(self):
+        self.product = make_product()
+        first = make_entry(self.product, quantity='10.00', cost='2.00')
+        second = make_entry(self.product, quantity='10.00', cost='3.00')
+        self.dated(first.movements.get(), day=2)
+        self.dated(second.movements.get(), day=5)
+        issue = StockMovement.objects.create(
+            stock_entry=first, movement_type=StockMovement.MovementType.OUT,
+            quantity_changed=Decimal('-15.00'), previous_quantity=Decimal('20.00'), new_quantity=Decimal('5.00')
+        )
+        self.dated(issue, day=20)
+
+    def dated(self, movement, day, month=1):
+        StockMovement.objects.filter(pk=movement.pk).update(created_at=at(2024, month, day))
+
+    def value(self, method, start=None, end=None, **kwargs):
+        rows = value_inventory(start or at(2024, 1, 1), end or at(2024, 1, 31, 23, 59), method=method, **kwargs)
+        return rows[0]
+
+    def test_fifo_issues_the_oldest_layers_first(self):
+        row = self.value(ValuationCheckpoint.CostMethod.FIFO)
+        self.assertEqual(row['cost_of_goods_sold'], Decimal('35.00'))
+        self.assertEqual((row['closing_quantity'], row['closing_value']), (Decimal('5.00'), Decimal('15.00')))
+
+    def test_weighted_average_issues_at_the_running_average(self):
+        row = self.value(ValuationCheckpoint.CostMethod.WEIGHTED_AVERAGE)
+        self.assertEqual(row['cost_of_goods_sold'], Decimal('37.50'))
+        self.assertEqual((row['closing_quantity'], row['closing_value']), (Decimal('5.00'), Decimal('12.50')))
+
+    def test_period_split_at_a_checkpoint_matches_a_single_run(self):
+        for method in ValuationCheckpoint.CostMethod.values:
+            with self.subTest(method=method):
+                self.value(method, end=at(2024, 1, 10), save_checkpoint=True)
+                resumed = self.value(method, start=at(2024, 1, 11))
+                ValuationCheckpoint.objects.all().delete()
+                single = self.value(method, start=at(2024, 1, 11))
+
+                self.assertEqual(resumed, single)
+                self.assertEqual(resumed['opening_quantity'], Decimal('20.00'))
+
+    def test_opening_balance_comes_from_earlier_movements(self):
+        row = self.value(ValuationCheckpoint.CostMethod.FIFO, start=at(2024, 1, 10))
+        self.assertEqual((row['opening_quantity'], row['opening_value']), (Decimal('20.00'), Decimal('50.00')))
+        self.assertEqual((row['received_quantity'], row['issued_quantity']), (Decimal('0.00'), Decimal('15.00')))
+
+    def test_filtered_runs_cannot_save_checkpoints(self):
+        with self.assertRaises(ValueError):
+            self.value(ValuationCheckpoint.CostMethod.FIFO, product_ids=[self.product.pk], save_checkpoint=True)
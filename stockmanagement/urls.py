@@ -2,7 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     CategoryViewSet, SupplierViewSet, ProductViewSet,
-    StockEntryViewSet, StockMovementViewSet
+    StockEntryViewSet, StockMovementViewSet, ArchivedStockMovementViewSet
 )
 
 # Create router and register viewsets
@@ -12,6 +12,7 @@ router.register(r'suppliers', SupplierViewSet)
 router.register(r'products', ProductViewSet)
 router.register(r'stock-entries', StockEntryViewSet)
 router.register(r'stock-movements', StockMovementViewSet)
+router.register(r'stock-movement-archive', ArchivedStockMovementViewSet)
 
 
 
@@ -1,26 +1,25 @@
 from decimal import Decimal
-from django.db.models import Sum, Avg
+from django.db.models import Sum, Avg, F, DecimalField, ExpressionWrapper
 from django.utils import timezone
 from datetime import timedelta
 from .models import Product, StockEntry, StockMovement
 
 
+ENTRY_VALUE = ExpressionWrapper(F('quantity') * F('cost_per_unit'), output_field=DecimalField(max_digits=16, decimal_places=2))
+
+
 class InventoryAnalytics:
     """Utility class for inventory analytics and reporting"""
     
     @staticmethod
     def get_inventory_value():
-        """Calculate total inventory value"""
-        total_value = Decimal('0.00')
-        
-        for product in Product.objects.filter(status=Product.ProductStatus.ACTIVE):
-            available_entries = product.stock_entries.filter(
-                status=StockEntry.StockStatus.AVAILABLE
-            )
-            for entry in available_entries:
-                total_value += entry.total_cost
+        """Calculate total inventory value (at each entry's purchase cost; see valuation.py for FIFO/average)"""
+        total_value = StockEntry.objects.filter(
+            status=StockEntry.StockStatus.AVAILABLE,
+            product__status=Product.ProductStatus.ACTIVE
+        ).aggregate(total=Sum(ENTRY_VALUE))['total']
         
-        return total_value
+        return total_value or Decimal('0.00')
     
     @staticmethod
     def get_category_breakdown():
@@ -31,14 +30,10 @@ class InventoryAnalytics:
         for category in Category.objects.filter(status=Category.CategoryStatus.ACTIVE):
             products = category.products.filter(status=Product.ProductStatus.ACTIVE)
             total_products = products.count()
-            total_value = Decimal('0.00')
-            
-            for product in products:
-                available_entries = product.stock_entries.filter(
-                    status=StockEntry.StockStatus.AVAILABLE
-                )
-                for entry in available_entries:
-                    total_value += entry.total_cost
+            total_value = StockEntry.objects.filter(
+                status=StockEntry.StockStatus.AVAILABLE,
+                product__in=products
+            ).aggregate(total=Sum(ENTRY_VALUE))['total'] or Decimal('0.00')
             
             breakdown.append({
                 'category': category.name,
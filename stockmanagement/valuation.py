@@ -0,0 +1,217 @@
+import heapq
+from collections import deque, defaultdict
+from decimal import Decimal
+from itertools import groupby
+from django.db import transaction
+from django.db.models import Max
+from .models import Product, StockMovement, ArchivedStockMovement, ValuationCheckpoint
+from .snapshots import MOVEMENT_UNIT_COST
+
+
+ZERO = Decimal('0')
+CENT = Decimal('0.01')
+
+
+class FifoCost:
+    """Cost layers consumed oldest first"""
+    method = ValuationCheckpoint.CostMethod.FIFO
+
+    def __init__(self, checkpoint=None):
+        self.layers = deque()
+        if checkpoint is not None:
+            self.layers.extend([Decimal(quantity), Decimal(unit_cost)] for quantity, unit_cost in checkpoint.layers)
+
+    @property
+    def quantity(self):
+        return sum((layer[0] for layer in self.layers), ZERO)
+
+    @property
+    def value(self):
+        return sum((layer[0] * layer[1] for layer in self.layers), ZERO)
+
+    def receive(self, quantity, unit_cost):
+        self.layers.append([quantity, unit_cost])
+
+    def issue(self, quantity):
+        """Consume `quantity` from the oldest layers and return its cost"""
+        cost = ZERO
+        while quantity > 0 and self.layers:
+            layer = self.layers[0]
+            taken = min(quantity, layer[0])
+            cost += taken * layer[1]
+            layer[0] -= taken
+            quantity -= taken
+            if layer[0] <= 0:
+                self.layers.popleft()
+        # Issues beyond what was ever received carry no cost
+        return cost
+
+    def dump(self):
+        return [[str(quantity), str(unit_cost)] for quantity, unit_cost in self.layers]
+
+
+class WeightedAverageCost:
+    """Single running pool valued at its moving average cost"""
+    method = ValuationCheckpoint.CostMethod.WEIGHTED_AVERAGE
+
+    def __init__(self, checkpoint=None):
+        self.quantity = checkpoint.quantity if checkpoint is not None else ZERO
+        self.value = checkpoint.value if checkpoint is not None else ZERO
+
+    def receive(self, quantity, unit_cost):
+        self.quantity += quantity
+        self.value += quantity * unit_cost
+
+    def issue(self, quantity):
+        if self.quantity <= 0:
+            return ZERO
+        taken = min(quantity, self.quantity)
+        cost = self.value * taken / self.quantity
+        self.quantity -= taken
+        self.value -= cost
+        return cost
+
+    def dump(self):
+        return []
+
+
+COST_METHODS = {
+    ValuationCheckpoint.CostMethod.FIFO: FifoCost,
+    ValuationCheckpoint.CostMethod.WEIGHTED_AVERAGE: WeightedAverageCost,
+}
+
+
+def _movement_stream(after, until, product_ids=None):
+    """
+    Hot and archived movements in (after, until] as one stream sorted by
+    product then time, read with server-side iterators and merged lazily.
+    """
+    streams = []
+    for model in (StockMovement, ArchivedStockMovement):
+        movements = model.objects.filter(created_at__lte=until)
+        if after is not None:
+            movements = movements.filter(created_at__gt=after)
+        if product_ids:
+            movements = movements.filter(stock_entry__product_id__in=product_ids)
+        streams.append(
+            movements.annotate(movement_unit_cost=MOVEMENT_UNIT_COST).order_by('stock_entry__product_id', 'created_at').values_list(
+                'stock_entry__product_id', 'created_at', 'quantity_changed', 'movement_unit_cost'
+            ).iterator(chunk_size=2000)
+        )
+    return heapq.merge(*streams, key=lambda row: (row[0], row[1]))
+
+
+def _base_checkpoint_time(method, start):
+    return ValuationCheckpoint.objects.filter(
+        method=method, period_end__lt=start
+    ).aggregate(period_end=Max('period_end'))['period_end']
+
+
+def _result_row(product_id, opening, state, received, issued):
+    return {
+        'product': product_id,
+        'opening_quantity': opening[0].quantize(CENT),
+        'opening_value': opening[1].quantize(CENT),
+        'received_quantity': received[0].quantize(CENT),
+        'received_value': received[1].quantize(CENT),
+        'issued_quantity': issued[0].quantize(CENT),
+        'cost_of_goods_sold': issued[1].quantize(CENT),
+        'closing_quantity': state.quantity.quantize(CENT),
+        'closing_value': state.value.quantize(CENT),
+    }
+
+
+def value_inventory(start, end, method=ValuationCheckpoint.CostMethod.FIFO, product_ids=None, save_checkpoint=False):
+    """
+    Cost of goods sold and closing inventory value per product for movements
+    in [start, end].
+
+    Resumes from the latest checkpoint before `start` and walks the movement
+    stream once. Increases are received at the unit cost recorded on the movement,
+    decreases are issued with the chosen cost method. With save_checkpoint
+    the closing state is stored at `end` so the next period resumes from it;
+    only full (unfiltered) runs may save checkpoints.
+    """
+    if save_checkpoint and product_ids:
+        raise ValueError("Checkpoints can only be saved for runs covering every product")
+
+    cost_class = COST_METHODS[method]
+    base_time = _base_checkpoint_time(method, start)
+
+    base_states = {}
+    if base_time is not None:
+        checkpoints = ValuationCheckpoint.objects.filter(method=method, period_end=base_time)
+        if product_ids:
+            checkpoints = checkpoints.filter(product_id__in=product_ids)
+        base_states = {checkpoint.product_id: checkpoint for checkpoint in checkpoints}
+
+    results = []
+    states = {}
+    stream = _movement_stream(base_time, end, product_ids)
+    for product_id, movements in groupby(stream, key=lambda row: row[0]):
+        state = cost_class(base_states.get(product_id))
+        opening = None
+        received = [ZERO, ZERO]
+        issued = [ZERO, ZERO]
+
+        for _, created_at, quantity_changed, unit_cost in movements:
+            in_period = created_at >= start
+            if in_period and opening is None:
+                opening = (state.quantity, state.value)
+
+            if quantity_changed > 0:
+                state.receive(quantity_changed, unit_cost)
+                if in_period:
+                    received[0] += quantity_changed
+                    received[1] += quantity_changed * unit_cost
+            elif quantity_changed < 0:
+                cost = state.issue(-quantity_changed)
+                if in_period:
+                    issued[0] += -quantity_changed
+                    issued[1] += cost
+
+        if opening is None:
+            opening = (state.quantity, state.value)
+        results.append(_result_row(product_id, opening, state, received, issued))
+        states[product_id] = state
+
+    # Products carried over from the checkpoint without movements since
+    for product_id, checkpoint in base_states.items():
+        if product_id in states:
+            continue
+        state = cost_class(checkpoint)
+        results.append(_result_row(product_id, (state.quantity, state.value), state, [ZERO, ZERO], [ZERO, ZERO]))
+        states[product_id] = state
+
+    if save_checkpoint:
+        with transaction.atomic():
+            ValuationCheckpoint.objects.filter(method=method, period_end=end).delete()
+            ValuationCheckpoint.objects.bulk_create([
+                ValuationCheckpoint(
+                    product_id=product_id,
+                    method=method,
+                    period_end=end,
+                    quantity=state.quantity,
+                    value=state.value.quantize(Decimal('0.0001')),
+                    layers=state.dump(),
+                )
+                for product_id, state in states.items()
+                if state.quantity or state.value
+            ], batch_size=1000)
+
+    results.sort(key=lambda row: row['product'])
+    return results
+
+
+def by_category(results):
+    """Roll product valuation rows up to their categories"""
+    categories = dict(
+        Product.objects.filter(pk__in=[row['product'] for row in results]).values_list('id', 'category__name')
+    )
+    totals = defaultdict(lambda: defaultdict(lambda: ZERO))
+    for row in results:
+        category_totals = totals[categories.get(row['product'])]
+        for key, amount in row.items():
+            if key != 'product':
+                category_totals[key] += amount
+    return [{'category': category, **dict(values)} for category, values in sorted(totals.items(), key=lambda item: item[0] or '')]
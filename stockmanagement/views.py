@@ -1,16 +1,95 @@
 from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from rest_framework.exceptions import APIException, ValidationError
 from django_filters.rest_framework import DjangoFilterBackend
-from django.db.models import Q, Sum, Count
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q, Sum, Count, F
+from django.urls import reverse
 from django.utils import timezone
-from .models import Category, Supplier, Product, StockEntry, StockMovement
+from django.utils.dateparse import parse_date, parse_datetime
+from datetime import datetime, time, timedelta
+from .models import Category, Supplier, Product, StockEntry, StockMovement, ArchivedStockMovement, ValuationCheckpoint
+from .snapshots import stock_as_of
+from .valuation import value_inventory, by_category
+from .search import ranked_product_ids, ranked_stock_entry_ids
+from .filters import IndexedSearchFilter
+from .signals import sync_product_status
 from .serializers import (
     CategorySerializer, SupplierSerializer, ProductListSerializer,
-    ProductDetailSerializer, StockEntrySerializer, StockMovementSerializer,ProductCreateUpdateSerializer
+    ProductDetailSerializer, StockEntrySerializer, StockMovementSerializer,ProductCreateUpdateSerializer,
+    ArchivedStockMovementSerializer, StockAdjustmentSerializer
 )
 
 
+class VersionConflict(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'Stock entry was modified by someone else; reload it and retry.'
+    default_code = 'version_conflict'
+
+
+
+def parse_date_range(request):
+    """Read optional date_from/date_to query params, raising ValueError on bad input"""
+    date_from = request.query_params.get('date_from')
+    date_to = request.query_params.get('date_to')
+    parsed = []
+    for value in (date_from, date_to):
+        if value:
+            parsed_value = parse_date(value)
+            if parsed_value is None:
+                raise ValueError(f"Invalid date '{value}', expected YYYY-MM-DD")
+            parsed.append(parsed_value)
+        else:
+            parsed.append(None)
+    return parsed
+
+
+def parse_product_ids(request):
+    """Optional repeated ?product= ids, raising ValueError on non-numeric values"""
+    product_ids = []
+    for value in request.query_params.getlist('product'):
+        try:
+            product_ids.append(int(value))
+        except ValueError:
+            raise ValueError(f"Invalid product '{value}', expected a numeric id")
+    return product_ids
+
+
+def day_start(day):
+    """Aware start of a local calendar day, for index-friendly created_at bounds"""
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def filter_created_range(queryset, date_from, date_to):
+    """
+    created_at within date_from..date_to (inclusive days) as plain datetime
+    bounds; created_at__date would wrap the column in DATE() and skip its index
+    """
+    if date_from:
+        queryset = queryset.filter(created_at__gte=day_start(date_from))
+    if date_to:
+        queryset = queryset.filter(created_at__lt=day_start(date_to + timedelta(days=1)))
+    return queryset
+
+
+def ranked_search_response(request, ranker, queryset, fields):
+    """Shared body of the ranked `search` actions: ?q= plus optional ?limit= (max 100)"""
+    query = request.query_params.get('q', '').strip()
+    if not query:
+        return Response({'error': 'q query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        limit = min(int(request.query_params.get('limit', 20)), 100)
+    except ValueError:
+        return Response({'error': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    ranked = ranker(query, limit=limit)
+    rows = {row['id']: row for row in queryset.filter(pk__in=[pk for pk, score in ranked]).values(*fields)}
+    results = [dict(rows[pk], score=score) for pk, score in ranked if pk in rows]
+    return Response({'query': query, 'count': len(results), 'results': results})
+
+
 class CategoryViewSet(viewsets.ModelViewSet):
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
@@ -48,9 +127,10 @@ class SupplierViewSet(viewsets.ModelViewSet):
 
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.select_related('category', 'supplier')
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['category', 'supplier', 'product_type', 'status']
     search_fields = ['name', 'sku', 'description']
+    search_ranker = staticmethod(ranked_product_ids)
     ordering_fields = ['name', 'sku', 'created_at', 'cost_per_unit']
     ordering = ['name']
     
@@ -99,6 +179,77 @@ class ProductViewSet(viewsets.ModelViewSet):
             'out_of_stock_count': out_of_stock_count,
             'healthy_stock_count': total_products - low_stock_count - overstocked_count
         })
+    
+    @action(detail=False, methods=['get'])
+    def as_of(self, request):
+        """On-hand quantity and value per product at a point in time (?at=ISO datetime or date)"""
+        at_param = request.query_params.get('at')
+        if not at_param:
+            return Response({'error': 'at query parameter is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        at_date = parse_date(at_param)
+        if at_date is not None:
+            # A bare date means "at the end of that day"
+            at = datetime.combine(at_date, time.max)
+        else:
+            at = parse_datetime(at_param)
+            if at is None:
+                return Response({'error': 'Invalid at, expected ISO date or datetime'}, status=status.HTTP_400_BAD_REQUEST)
+        if timezone.is_naive(at):
+            at = timezone.make_aware(at)
+        
+        try:
+            product_ids = parse_product_ids(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        balances = stock_as_of(at, product_ids or None)
+        
+        products = Product.objects.filter(pk__in=balances.keys()).values('id', 'name', 'sku')
+        results = [
+            {
+                'product': product['id'],
+                'name': product['name'],
+                'sku': product['sku'],
+                'quantity': balances[product['id']]['quantity'],
+                'value': balances[product['id']]['value'],
+            }
+            for product in products
+        ]
+        return Response({'at': at, 'results': results})
+    
+    @action(detail=False, methods=['get'])
+    def valuation(self, request):
+        """
+        COGS and closing value for date_from..date_to (?method=fifo|weighted_average,
+        ?group_by=category). Resumes from the latest stored month-end checkpoint.
+        """
+        try:
+            date_from, date_to = parse_date_range(request)
+            product_ids = parse_product_ids(request)
+        except ValueError as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if date_from is None or date_to is None:
+            return Response({'error': 'date_from and date_to are required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        method = request.query_params.get('method', ValuationCheckpoint.CostMethod.FIFO)
+        if method not in ValuationCheckpoint.CostMethod.values:
+            return Response({'error': f'method must be one of {ValuationCheckpoint.CostMethod.values}'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        start = timezone.make_aware(datetime.combine(date_from, time.min))
+        end = timezone.make_aware(datetime.combine(date_to, time.max))
+        results = value_inventory(start, end, method=method, product_ids=product_ids or None)
+        
+        if request.query_params.get('group_by') == 'category':
+            results = by_category(results)
+        return Response({'method': method, 'date_from': date_from, 'date_to': date_to, 'results': results})
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked name/SKU lookup for POS terminals, served from the search index"""
+        return ranked_search_response(
+            request, ranked_product_ids, Product.objects.all(),
+            ['id', 'name', 'sku', 'unit_of_measure', 'cost_per_unit', 'status']
+        )
         
         
         
@@ -108,12 +259,78 @@ class ProductViewSet(viewsets.ModelViewSet):
 class StockEntryViewSet(viewsets.ModelViewSet):
     queryset = StockEntry.objects.select_related('product', 'product__category')
     serializer_class = StockEntrySerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     filterset_fields = ['product', 'status', 'entry_type']
     search_fields = ['product__name', 'product__sku', 'batch_number', 'reference_number']
+    search_ranker = staticmethod(ranked_stock_entry_ids)
     ordering_fields = ['received_date', 'expiry_date', 'quantity', 'created_at']
     ordering = ['-received_date']
     
+    def perform_update(self, serializer):
+        """
+        Compare-and-swap on `version`: lock the row only if it still has the
+        version the client read, then save (StockEntry.save() bumps the
+        version). The lock is held until commit, so the movement logged by the
+        pre_save signal sees the true previous quantity.
+        """
+        expected = serializer.validated_data.pop('version', None)
+        if expected is None:
+            expected = self.request.headers.get('If-Match', '').strip('"')
+        try:
+            expected = int(expected)
+        except (TypeError, ValueError):
+            raise ValidationError({'version': 'Send the version you last read, in the body or as If-Match'})
+        
+        with transaction.atomic():
+            claimed = StockEntry.objects.select_for_update().filter(
+                pk=serializer.instance.pk, version=expected
+            ).exists()
+            if not claimed:
+                raise VersionConflict()
+            serializer.save()
+    
+    @action(detail=True, methods=['post'])
+    def adjust(self, request, pk=None):
+        """Atomically add or remove stock without a read-modify-write round trip"""
+        adjustment = StockAdjustmentSerializer(data=request.data)
+        adjustment.is_valid(raise_exception=True)
+        delta = adjustment.validated_data['delta']
+        
+        entry_filter = Q(pk=pk)
+        if delta < 0:
+            # Never let concurrent removals drive the quantity below zero
+            entry_filter &= Q(quantity__gte=-delta)
+        
+        with transaction.atomic():
+            updated = StockEntry.objects.filter(entry_filter).update(
+                quantity=F('quantity') + delta,
+                version=F('version') + 1,
+                updated_at=timezone.now()
+            )
+            if not updated:
+                entry = self.get_object()
+                return Response(
+                    {'error': f'Insufficient stock: {entry.quantity} available'},
+                    status=status.HTTP_409_CONFLICT
+                )
+            
+            # The row stays locked until commit, so this read is the post-update state
+            entry = StockEntry.objects.select_related('product').get(pk=pk)
+            StockMovement.objects.create(
+                stock_entry=entry,
+                movement_type=adjustment.validated_data['movement_type'],
+                quantity_changed=delta,
+                previous_quantity=entry.quantity - delta,
+                new_quantity=entry.quantity,
+                reason=adjustment.validated_data['reason'] or "Stock quantity adjusted",
+                performed_by=adjustment.validated_data['performed_by'],
+                reference_document=adjustment.validated_data['reference_document']
+            )
+            sync_product_status(entry.product)
+        
+        serializer = self.get_serializer(entry)
+        return Response(serializer.data)
+    
     @action(detail=False, methods=['get'])
     def expiring_soon(self, request):
         """Get stock entries expiring within 7 days"""
@@ -134,6 +351,14 @@ class StockEntryViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(expiring_entries, many=True)
         return Response(serializer.data)
     
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ranked lookup by batch number, reference number or product, served from the search index"""
+        return ranked_search_response(
+            request, ranked_stock_entry_ids, StockEntry.objects.all(),
+            ['id', 'product', 'product__name', 'batch_number', 'reference_number', 'quantity', 'status', 'expiry_date']
+        )
+    
     @action(detail=False, methods=['get'])
     def expired(self, request):
         """Get expired stock entries"""
@@ -158,3 +383,68 @@ class StockMovementViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ['stock_entry__product__name', 'reason', 'performed_by']
     ordering_fields = ['created_at']
     ordering = ['-created_at']
+    
+    def get_queryset(self):
+        """
+        Only scan the hot window unless the client asks for an explicit date range.
+        
+        Movements older than STOCK_MOVEMENT_HOT_DAYS are moved to the archive
+        by `manage.py archive_stock_movements`, so a range reaching back past
+        the hot window only returns the movements not archived yet; the
+        response then carries a `Link: <...>; rel="archive"` header pointing
+        at the archive endpoint with the same query.
+        """
+        queryset = super().get_queryset()
+        self.reaches_archive = False
+        if self.action != 'list':
+            return queryset
+        
+        try:
+            date_from, date_to = parse_date_range(self.request)
+        except ValueError as e:
+            raise ValidationError({'date_range': str(e)})
+        
+        hot_since = timezone.now() - timedelta(days=settings.STOCK_MOVEMENT_HOT_DAYS)
+        if date_from is None and date_to is None:
+            return queryset.filter(created_at__gte=hot_since)
+        
+        self.reaches_archive = date_from is None or day_start(date_from) < hot_since
+        return filter_created_range(queryset, date_from, date_to)
+    
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if self.reaches_archive:
+            archive_url = request.build_absolute_uri(reverse('archivedstockmovement-list'))
+            query = request.GET.urlencode()
+            response['Link'] = f'<{archive_url}?{query}>; rel="archive"' if query else f'<{archive_url}>; rel="archive"'
+        return response
+
+
+class ArchivedStockMovementViewSet(viewsets.ReadOnlyModelViewSet):
+    """Read archived movements; listing requires a date range so only the matching months are scanned"""
+    queryset = ArchivedStockMovement.objects.select_related('stock_entry', 'stock_entry__product')
+    serializer_class = ArchivedStockMovementSerializer
+    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filterset_fields = ['movement_type', 'stock_entry__product']
+    search_fields = ['stock_entry__product__name', 'reason', 'performed_by']
+    ordering_fields = ['created_at']
+    ordering = ['-created_at']
+    
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action != 'list':
+            return queryset
+        
+        try:
+            date_from, date_to = parse_date_range(self.request)
+        except ValueError as e:
+            raise ValidationError({'date_range': str(e)})
+        
+        if date_from is None:
+            raise ValidationError({'date_from': 'date_from is required when browsing archived movements'})
+        
+        # archive_month narrows the scan to the relevant monthly buckets first
+        queryset = queryset.filter(archive_month__gte=date_from.replace(day=1))
+        if date_to:
+            queryset = queryset.filter(archive_month__lte=date_to.replace(day=1))
+        return filter_created_range(queryset, date_from, date_to)